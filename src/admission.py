@@ -0,0 +1,210 @@
+import heapq
+import math
+import os
+import threading
+import time
+
+from audio_mixer import MIX_SAMPLE_RATE
+
+# --- Admission Settings (override with environment variables) ---
+MEMORY_BUDGET_FRACTION = float(os.getenv("REELIT_MEMORY_BUDGET_FRACTION", 0.75)) # Share of RAM jobs may reserve
+CPU_BUDGET = float(os.getenv("REELIT_CPU_BUDGET", os.cpu_count() or 1)) # Cores jobs may reserve
+MAX_QUEUED_JOBS = int(os.getenv("REELIT_MAX_QUEUED_JOBS", 8)) # Requests beyond this many waiting jobs are rejected
+DEFAULT_STORY_WORDS = int(os.getenv("REELIT_DEFAULT_STORY_WORDS", 350)) # Assumed length of a story not fetched yet
+MEMORY_HEADROOM_BYTES = 256 * 1024 ** 2 # Left free beyond a job's estimate when checking actual free memory
+RECHECK_SECONDS = 5 # Queued jobs re-check free memory this often (other processes may have released some)
+
+# --- Cost Model (rough upper bounds, per render) ---
+PROCESS_MEMORY_BYTES = 900 * 1024 ** 2 # A part-render process: interpreter, torch, Whisper model, fonts
+WORKING_MEMORY_BYTES = 300 * 1024 ** 2 # Alignment activations, caption rasters, MoviePy/Pillow state
+FRAME_BYTES_PER_PIXEL = 3 + 2 * 6 # Frame sink: rgb24 frame plus two 3-channel uint16 blend scratch frames
+ENCODER_FRAMES_IN_FLIGHT = 60 # x264 lookahead and reference frames held per encoded framing (yuv420p)
+AUDIO_BUFFERS = 4 # Narration, music, mix and resampled copies, float32 at MIX_SAMPLE_RATE
+CORES_PER_RENDER = 2.0 # Background decoder, compositor and encoder of one render
+RENDER_SECONDS_PER_VIDEO_SECOND = float(os.getenv("REELIT_RENDER_SECONDS_PER_VIDEO_SECOND", 1.5)) # TTS to encode
+
+def total_memory_bytes():
+    """Physical memory of this host, or None if it can't be read."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def available_memory_bytes():
+    """Memory the host can still hand out (MemAvailable on Linux), or None if it can't be read."""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def estimate_job_cost(part_seconds, profile, parts=1, parallel_parts=1, framings=1):
+    """Estimates the peak memory, cores and wall time of one job.
+
+    Args:
+        part_seconds (float): Narration length of each rendered video (the whole story if not split).
+        profile (dict): Render profile ("width", "height"; see video_creator.RENDER_PROFILES).
+        parts (int): Videos the story is split into.
+        parallel_parts (int): Parts rendered at the same time. Parts run in their own processes;
+            a single video renders in the calling process.
+        framings (int): Framings encoded per video (1 + extra framings).
+
+    Returns:
+        dict: {"memory_bytes", "cpu_cores", "seconds"}
+    """
+    pixels = profile["width"] * profile["height"]
+    render_bytes = (WORKING_MEMORY_BYTES
+                    + pixels * FRAME_BYTES_PER_PIXEL
+                    + int(pixels * 1.5) * ENCODER_FRAMES_IN_FLIGHT * framings
+                    + int(part_seconds * MIX_SAMPLE_RATE * 4 * AUDIO_BUFFERS))
+    if parts > 1:
+        render_bytes += PROCESS_MEMORY_BYTES
+    rounds = math.ceil(parts / parallel_parts)
+    return {"memory_bytes": render_bytes * parallel_parts,
+            "cpu_cores": min(CPU_BUDGET, CORES_PER_RENDER * parallel_parts),
+            "seconds": rounds * part_seconds * RENDER_SECONDS_PER_VIDEO_SECOND}
+
+class AdmissionController:
+    """Admits jobs while their estimated memory and cores fit the host, queueing the rest.
+
+    Each job declares a cost (estimate_job_cost) when submitted. It is admitted if its memory
+    fits both the reservation budget and the memory the host actually has free, and its cores
+    fit the CPU budget; otherwise it waits in a FIFO queue and is admitted as running jobs
+    release their reservations. Jobs that could never fit, or arrive when the queue is full,
+    are rejected. A job that fits the budget is always admitted when nothing else is running.
+    """
+
+    def __init__(self, memory_budget_bytes=None, cpu_budget=CPU_BUDGET, max_queued=MAX_QUEUED_JOBS):
+        if memory_budget_bytes is None:
+            total = total_memory_bytes()
+            memory_budget_bytes = int(total * MEMORY_BUDGET_FRACTION) if total else None
+        self.memory_budget = memory_budget_bytes # None: unknown, only the CPU budget applies
+        self.cpu_budget = cpu_budget
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._running = {} # job id -> {"cost", "admitted"}
+        self._queue = [] # [(job id, cost)], oldest first
+
+    def submit(self, job_id, cost):
+        """Admits, queues or rejects a job.
+
+        Returns:
+            dict: {"decision": "admitted" | "queued" | "rejected", "queue_position" (queued jobs),
+                "retry_after" (seconds until a queued job is expected to start, or until a
+                rejected one could be queued; None if it can never run), "reason" (rejections)}
+        """
+        cost = dict(cost, cpu_cores=min(cost["cpu_cores"], self.cpu_budget))
+        with self._lock:
+            if self.memory_budget is not None and cost["memory_bytes"] > self.memory_budget:
+                return {"decision": "rejected", "queue_position": None, "retry_after": None,
+                        "reason": (f"Job needs about {cost['memory_bytes'] / 1024 ** 3:.1f} GB; this host "
+                                   f"admits jobs up to {self.memory_budget / 1024 ** 3:.1f} GB.")}
+            if not self._queue and self._fits(cost):
+                self._running[job_id] = {"cost": cost, "admitted": time.time()}
+                return {"decision": "admitted", "queue_position": 0, "retry_after": 0, "reason": None}
+            if len(self._queue) >= self.max_queued:
+                return {"decision": "rejected", "queue_position": None,
+                        "retry_after": self._expected_wait(len(self._queue)),
+                        "reason": f"{len(self._queue)} jobs are already waiting."}
+            self._queue.append((job_id, cost))
+            position = len(self._queue)
+            return {"decision": "queued", "queue_position": position,
+                    "retry_after": self._expected_wait(position - 1), "reason": None}
+
+    def wait(self, job_id, timeout=None):
+        """Blocks until a submitted job is admitted.
+
+        Returns:
+            bool: True once admitted; False if it was withdrawn (or `timeout` passed).
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self._lock:
+            while job_id not in self._running:
+                if not any(queued_id == job_id for queued_id, _ in self._queue):
+                    return False
+                remaining = RECHECK_SECONDS if deadline is None else min(RECHECK_SECONDS, deadline - time.time())
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+                self._admit_waiting() # Free memory may have changed without a release
+            return True
+
+    def release(self, job_id):
+        """Returns a finished job's reservation (or drops it from the queue) and admits waiting jobs."""
+        with self._lock:
+            self._running.pop(job_id, None)
+            self._queue = [(queued_id, cost) for queued_id, cost in self._queue if queued_id != job_id]
+            self._admit_waiting()
+            self._changed.notify_all()
+
+    def withdraw(self, job_id):
+        """Removes a queued job (e.g. cancelled before it started). Returns False if it isn't queued."""
+        with self._lock:
+            queued = any(queued_id == job_id for queued_id, _ in self._queue)
+            if queued:
+                self._queue = [(queued_id, cost) for queued_id, cost in self._queue if queued_id != job_id]
+                self._changed.notify_all()
+            return queued
+
+    def status(self, job_id):
+        """Returns {"state": "running" | "queued", "queue_position", "retry_after"} or None."""
+        with self._lock:
+            if job_id in self._running:
+                return {"state": "running", "queue_position": 0, "retry_after": 0}
+            for index, (queued_id, _) in enumerate(self._queue):
+                if queued_id == job_id:
+                    return {"state": "queued", "queue_position": index + 1, "retry_after": self._expected_wait(index)}
+            return None
+
+    def snapshot(self):
+        """Budgets, reservations and the queue, for monitoring."""
+        with self._lock:
+            return {"memory_budget_bytes": self.memory_budget,
+                    "memory_reserved_bytes": sum(job["cost"]["memory_bytes"] for job in self._running.values()),
+                    "memory_available_bytes": available_memory_bytes(),
+                    "cpu_budget": self.cpu_budget,
+                    "cpu_reserved": sum(job["cost"]["cpu_cores"] for job in self._running.values()),
+                    "running": list(self._running), "queued": [job_id for job_id, _ in self._queue]}
+
+    def _fits(self, cost):
+        """Whether a job fits next to the running ones. Must be called with the lock held."""
+        if not self._running:
+            return True # Never leave the host idle with a job that fits the budget on its own
+        reserved_memory = sum(job["cost"]["memory_bytes"] for job in self._running.values())
+        reserved_cpu = sum(job["cost"]["cpu_cores"] for job in self._running.values())
+        if reserved_cpu + cost["cpu_cores"] > self.cpu_budget:
+            return False
+        if self.memory_budget is not None and reserved_memory + cost["memory_bytes"] > self.memory_budget:
+            return False
+        available = available_memory_bytes()
+        return available is None or available - MEMORY_HEADROOM_BYTES >= cost["memory_bytes"]
+
+    def _admit_waiting(self):
+        """Admits queued jobs in order while the oldest one fits. Must be called with the lock held."""
+        admitted = False
+        while self._queue and self._fits(self._queue[0][1]):
+            job_id, cost = self._queue.pop(0)
+            self._running[job_id] = {"cost": cost, "admitted": time.time()}
+            admitted = True
+        if admitted:
+            self._changed.notify_all()
+
+    def _expected_wait(self, jobs_ahead):
+        """Seconds until the job behind `jobs_ahead` queued jobs should start. Lock must be held.
+
+        Each running job frees its slot when its estimated time is up and the next queued job
+        takes it; the estimate is when the slot for this job frees.
+        """
+        now = time.time()
+        slot_free_at = [job["admitted"] + job["cost"]["seconds"] for job in self._running.values()] or [now]
+        heapq.heapify(slot_free_at)
+        for _, cost in self._queue[:jobs_ahead]:
+            heapq.heappush(slot_free_at, max(heapq.heappop(slot_free_at), now) + cost["seconds"])
+        return max(1, math.ceil(slot_free_at[0] - now))
@@ -1,16 +1,82 @@
 import whisper
 import os
+import json
+import numpy as np
+import torch
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
 
-# Global variable to hold the loaded model
-_model = None
+# Loaded models, keyed by model name (one set per process)
+_models = {}
+
+# --- Parallel Alignment Settings ---
+ALIGNMENT_SAMPLE_RATE = whisper.audio.SAMPLE_RATE # Whisper works on 16 kHz mono
+PARALLEL_MIN_SECONDS = 60 # "auto" mode only splits narrations at least this long
+MAX_CHUNK_SECONDS = 30 # Upper bound on each chunk (Whisper's own window length)
+MIN_CHUNK_SECONDS = 8 # Don't cut at silences closer than this to the previous cut
+SILENCE_FRAME_SECONDS = 0.02 # Frame size for the energy-based silence detector
+SILENCE_THRESHOLD_RATIO = 0.1 # Frames quieter than this fraction of the median frame energy are silent
+MIN_SILENCE_SECONDS = 0.15 # Shortest pause we are willing to cut at
+MAX_ALIGNMENT_WORKERS = max(1, (os.cpu_count() or 1) // 2) # Each worker holds its own model copy (per process)
+
+# --- CPU Inference Settings ---
+QUANTIZED_SUFFIX = "-int8" # e.g. "base.en-int8" = base.en with int8 dynamic quantization of linear layers
+QUANTIZED_MODEL_CACHE_DIR = os.getenv("REELIT_WHISPER_CACHE",
+                                      os.path.join(os.path.expanduser("~"), ".cache", "reelit", "whisper"))
+ALIGNMENT_LATENCY_BUDGET_SECONDS = float(os.getenv("REELIT_ALIGNMENT_BUDGET_SECONDS", 60)) # For model_name="auto"
+# Candidate models for "auto", most accurate first
+AUTO_MODEL_CANDIDATES = ["small.en", "small.en-int8", "base.en", "base.en-int8", "tiny.en", "tiny.en-int8"]
+# Seconds of CPU inference per second of audio. Rough defaults, replaced by
+# measurements saved by benchmark_alignment.py when available.
+DEFAULT_REALTIME_FACTORS = {
+    "tiny.en": 0.10, "tiny.en-int8": 0.06,
+    "base.en": 0.20, "base.en-int8": 0.12,
+    "small.en": 0.60, "small.en-int8": 0.35,
+}
+ALIGNMENT_BENCHMARK_PATH = os.path.join(QUANTIZED_MODEL_CACHE_DIR, "benchmark.json")
+
+_pools = {} # model name -> (process pool, workers, torch threads per worker), per process
+_pools_lock = threading.Lock()
+
+def _split_model_name(model_name):
+    """Splits "base.en-int8" into ("base.en", True)."""
+    if model_name.endswith(QUANTIZED_SUFFIX):
+        return model_name[:-len(QUANTIZED_SUFFIX)], True
+    return model_name, False
+
+def _load_quantized_model(base_name):
+    """Loads a Whisper model with int8 dynamic quantization of its linear layers, cached on disk."""
+    cache_path = os.path.join(QUANTIZED_MODEL_CACHE_DIR, f"{os.path.basename(base_name)}{QUANTIZED_SUFFIX}.pt")
+    if os.path.exists(cache_path):
+        print(f"  Using cached quantized weights: {cache_path}")
+        return torch.load(cache_path, map_location="cpu", weights_only=False)
+
+    model = whisper.load_model(base_name, device="cpu")
+    # Whisper's Linear subclass only adds dtype casting for fp16; swap in the plain class
+    # so quantize_dynamic recognises and replaces every linear layer
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    os.makedirs(QUANTIZED_MODEL_CACHE_DIR, exist_ok=True)
+    temp_path = cache_path + ".tmp"
+    torch.save(quantized, temp_path)
+    os.replace(temp_path, cache_path)
+    print(f"  Quantized weights cached to {cache_path}")
+    return quantized
 
 def load_whisper_model(model_name="tiny.en"):
-    """Loads the specified Whisper model. Defaults to tiny English model."""
-    global _model
-    if _model is None:
+    """Loads the specified Whisper model. Defaults to tiny English model.
+
+    A name ending in "-int8" (e.g. "base.en-int8") loads an int8 dynamically quantized
+    copy for faster CPU inference.
+    """
+    if model_name not in _models:
         print(f"Loading Whisper model: {model_name}...")
         try:
-            _model = whisper.load_model(model_name)
+            base_name, quantized = _split_model_name(model_name)
+            _models[model_name] = _load_quantized_model(base_name) if quantized else whisper.load_model(base_name)
             print("Whisper model loaded successfully.")
         except Exception as e:
             print(f"Error loading Whisper model '{model_name}': {e}")
@@ -18,23 +84,115 @@ def load_whisper_model(model_name="tiny.en"):
             print("Try running: pip install -U openai-whisper")
             print("And ensure ffmpeg is in your PATH.")
             raise # Re-raise the exception to stop the process
-    return _model
+    return _models[model_name]
+
+def _load_realtime_factors():
+    """Returns per-model realtime factors, preferring ones measured on this host."""
+    factors = dict(DEFAULT_REALTIME_FACTORS)
+    if os.path.exists(ALIGNMENT_BENCHMARK_PATH):
+        try:
+            with open(ALIGNMENT_BENCHMARK_PATH, "r", encoding="utf-8") as f:
+                factors.update(json.load(f).get("realtime_factors", {}))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read alignment benchmark {ALIGNMENT_BENCHMARK_PATH}: {e}")
+    return factors
+
+def choose_whisper_model(audio_seconds, latency_budget_seconds=ALIGNMENT_LATENCY_BUDGET_SECONDS):
+    """Picks the most accurate model expected to align `audio_seconds` of narration within the budget.
 
-def get_word_timestamps(audio_path, model_name="tiny.en"):
+    Args:
+        audio_seconds (float): Narration length.
+        latency_budget_seconds (float): Target alignment time.
+
+    Returns:
+        str: Model name (possibly with the "-int8" suffix). Falls back to the fastest model.
+    """
+    factors = _load_realtime_factors()
+    candidates = [name for name in AUTO_MODEL_CANDIDATES if name in factors]
+    for name in candidates:
+        if factors[name] * audio_seconds <= latency_budget_seconds:
+            return name
+    return min(candidates, key=lambda name: factors[name])
+
+def _extract_words(result, offset_seconds=0.0, chunk_end_seconds=None):
+    """Flattens a Whisper transcription result into {'word', 'start', 'end'} dicts.
+
+    Args:
+        result (dict): Result of model.transcribe(..., word_timestamps=True).
+        offset_seconds (float): Added to every timestamp (start of the chunk in the full audio).
+        chunk_end_seconds (float or None): Timestamps are clamped to this, since Whisper
+            can place the last word slightly past the end of the audio it was given.
+    """
+    word_segments = []
+    if 'segments' in result:
+        for segment in result['segments']:
+            if 'words' in segment:
+                 # Adjust word dict to match expected format if necessary
+                 # Whisper format is often [{'word': ' Hello', 'start': 0.5, 'end': 0.8, 'probability': 0.99}, ...]
+                 for word_info in segment['words']:
+                     # Clean up leading/trailing whitespace from whisper word
+                     clean_word = word_info['word'].strip()
+                     if clean_word: # Only add if there's actual word content
+                        start = word_info['start'] + offset_seconds
+                        end = word_info['end'] + offset_seconds
+                        if chunk_end_seconds is not None:
+                            start = min(start, chunk_end_seconds)
+                            end = min(end, chunk_end_seconds)
+                        word_segments.append({
+                            'word': clean_word,
+                            'start': start,
+                            'end': end
+                        })
+    return word_segments
+
+def get_word_timestamps(audio_path, model_name="tiny.en", mode="auto", concurrency=1):
     """Transcribes audio using Whisper and returns word-level timestamps.
 
     Args:
-        audio_path (str): Path to the audio file (e.g., MP3).
-        model_name (str): Name of the Whisper model to use (e.g., tiny.en, base.en).
+        audio_path (str or np.ndarray): Path to the audio file (e.g., MP3), or audio already
+            decoded to mono float32 at 16 kHz (no ffmpeg decode happens then).
+        model_name (str): Name of the Whisper model to use (e.g., tiny.en, base.en, base.en-int8),
+            or "auto" to pick one from the narration length and ALIGNMENT_LATENCY_BUDGET_SECONDS.
+        mode (str): "single" transcribes the whole file in this process, "parallel" splits it at
+            silences and transcribes the chunks in a process pool, "batched" queues the chunks on
+            the shared AlignmentBatcher so concurrent jobs are encoded together (see
+            alignment_service.py), "auto" picks parallel for narrations of at least
+            PARALLEL_MIN_SECONDS when more than one worker is available and batched otherwise.
+        concurrency (int): Renders running on this host at the same time (including this one,
+            e.g. the parts of a story); the parallel mode's pool gets its share of the cores.
 
     Returns:
         list: A list of dictionaries, where each dictionary contains
               'word', 'start', and 'end' keys for each word.
               Returns None if transcription fails.
     """
-    if not os.path.exists(audio_path):
+    if isinstance(audio_path, np.ndarray):
+        audio = audio_path.astype(np.float32, copy=False)
+        audio_path = "decoded narration" # For log messages
+    elif not os.path.exists(audio_path):
         print(f"Error: Audio file not found at {audio_path}")
         return None
+    else:
+        audio = None
+
+    transcribe_input = audio_path if audio is None else audio
+    if mode != "single" or model_name == "auto":
+        if audio is None:
+            try:
+                audio = whisper.load_audio(audio_path)
+            except Exception as e:
+                print(f"Error decoding {audio_path} for alignment: {e}")
+                return None
+        duration = len(audio) / ALIGNMENT_SAMPLE_RATE
+        if model_name == "auto":
+            model_name = choose_whisper_model(duration)
+            print(f"  Auto-selected Whisper model '{model_name}' for {duration:.1f}s of narration.")
+        parallel_workers, _ = _alignment_pool_size(concurrency)
+        if mode == "parallel" or (mode == "auto" and parallel_workers > 1 and duration >= PARALLEL_MIN_SECONDS):
+            return get_word_timestamps_parallel(audio, model_name, concurrency)
+        if mode in ("batched", "auto"):
+            return get_word_timestamps_batched(audio, model_name)
+        transcribe_input = audio # Already decoded; don't make Whisper run ffmpeg again
 
     try:
         model = load_whisper_model(model_name)
@@ -44,23 +202,8 @@ def get_word_timestamps(audio_path, model_name="tiny.en"):
     print(f"Transcribing {audio_path} with Whisper for word timestamps...")
     try:
         # Set word_timestamps=True
-        result = model.transcribe(audio_path, word_timestamps=True, fp16=False) # fp16=False might be more stable on CPU
-        
-        word_segments = []
-        if 'segments' in result:
-            for segment in result['segments']:
-                if 'words' in segment:
-                     # Adjust word dict to match expected format if necessary
-                     # Whisper format is often [{'word': ' Hello', 'start': 0.5, 'end': 0.8, 'probability': 0.99}, ...]
-                     for word_info in segment['words']:
-                         # Clean up leading/trailing whitespace from whisper word
-                         clean_word = word_info['word'].strip()
-                         if clean_word: # Only add if there's actual word content
-                            word_segments.append({
-                                'word': clean_word,
-                                'start': word_info['start'],
-                                'end': word_info['end']
-                            })
+        result = model.transcribe(transcribe_input, word_timestamps=True, fp16=False) # fp16=False might be more stable on CPU
+        word_segments = _extract_words(result)
         
         if not word_segments:
             print("Warning: Whisper transcription did not return any word segments.")
@@ -73,6 +216,177 @@ def get_word_timestamps(audio_path, model_name="tiny.en"):
         print(f"Error during Whisper transcription: {e}")
         return None
 
+# --- Parallel alignment over silence-split chunks ---
+
+def find_silence_boundaries(audio, sample_rate=ALIGNMENT_SAMPLE_RATE):
+    """Finds candidate cut points in the middle of pauses.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio.
+        sample_rate (int): Sample rate of `audio`.
+
+    Returns:
+        np.ndarray: Sample indices at the centre of each silent stretch, in increasing order.
+    """
+    frame = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+    frame_count = len(audio) // frame
+    if frame_count == 0:
+        return np.empty(0, dtype=np.int64)
+    energy = np.square(audio[:frame_count * frame].reshape(frame_count, frame)).mean(axis=1)
+    threshold = np.median(energy) * SILENCE_THRESHOLD_RATIO
+    silent = energy <= threshold
+
+    # Run boundaries of silent frames
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    long_enough = (run_ends - run_starts) * SILENCE_FRAME_SECONDS >= MIN_SILENCE_SECONDS
+    centres = (run_starts[long_enough] + run_ends[long_enough]) // 2
+    return centres.astype(np.int64) * frame
+
+def split_on_silence(audio, sample_rate=ALIGNMENT_SAMPLE_RATE,
+                     max_chunk_seconds=MAX_CHUNK_SECONDS, min_chunk_seconds=MIN_CHUNK_SECONDS):
+    """Splits audio into chunks of bounded length, cutting at silences where possible.
+
+    Returns:
+        list: (start_sample, end_sample) pairs covering the whole audio.
+    """
+    total = len(audio)
+    max_len = int(max_chunk_seconds * sample_rate)
+    min_len = int(min_chunk_seconds * sample_rate)
+    boundaries = find_silence_boundaries(audio, sample_rate)
+    chunks = []
+    start = 0
+    while total - start > max_len:
+        # Latest pause that keeps this chunk within [min_len, max_len]
+        lo = np.searchsorted(boundaries, start + min_len, side='left')
+        hi = np.searchsorted(boundaries, start + max_len, side='right')
+        cut = int(boundaries[hi - 1]) if hi > lo else start + max_len # No pause: hard cut
+        chunks.append((start, cut))
+        start = cut
+    if total > start:
+        chunks.append((start, total))
+    return chunks
+
+def _init_alignment_worker(model_name, threads_per_worker):
+    """Process pool initializer: limits torch threads and loads the model once per worker."""
+    import torch
+    torch.set_num_threads(threads_per_worker)
+    load_whisper_model(model_name)
+
+def _transcribe_chunk(args):
+    """Transcribes one chunk in a worker and returns its words in full-audio time."""
+    chunk, offset_seconds, model_name = args
+    model = load_whisper_model(model_name)
+    result = model.transcribe(chunk, word_timestamps=True, fp16=False,
+                              condition_on_previous_text=False)
+    return _extract_words(result, offset_seconds, offset_seconds + len(chunk) / ALIGNMENT_SAMPLE_RATE)
+
+def _alignment_pool_size(concurrency):
+    """Returns (workers, torch threads per worker) for a pool sharing the cores with
+    `concurrency` renders, including its own. Each part process of a story has its own pool."""
+    concurrency = max(1, concurrency)
+    workers = max(1, MAX_ALIGNMENT_WORKERS // concurrency)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // (workers * concurrency))
+    return workers, threads_per_worker
+
+def _submit_alignment_tasks(model_name, tasks, concurrency=1):
+    """Submits chunk transcriptions to the model's process pool, sized for `concurrency`.
+
+    Each model keeps its own pool, so jobs aligning with different models don't tear down
+    each other's. A pool of the wrong size is replaced; chunks already submitted to it still finish.
+
+    Returns:
+        list: One future per task.
+    """
+    workers, threads_per_worker = _alignment_pool_size(concurrency)
+    with _pools_lock:
+        pool, pool_workers, pool_threads = _pools.get(model_name, (None, None, None))
+        if pool is None or (pool_workers, pool_threads) != (workers, threads_per_worker):
+            if pool is not None:
+                pool.shutdown(wait=False)
+            # spawn: forking a process that already initialised torch/OpenMP can deadlock
+            pool = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_alignment_worker,
+                                       initargs=(model_name, threads_per_worker))
+            _pools[model_name] = (pool, workers, threads_per_worker)
+            print(f"Started alignment pool for {model_name}: {workers} workers x {threads_per_worker} threads.")
+        # Submitted under the lock, so the pool can't be replaced between lookup and submit
+        return [pool.submit(_transcribe_chunk, task) for task in tasks]
+
+def stitch_chunk_words(chunk_words):
+    """Joins per-chunk word lists, dropping words repeated across a seam.
+
+    Whisper sometimes re-emits the last word of a chunk at the start of the next one
+    (or places a word past the cut). A word is dropped when it starts before the
+    previous word ends and has the same text.
+    """
+    stitched = []
+    for words in chunk_words:
+        for word in words:
+            if stitched:
+                previous = stitched[-1]
+                if word['start'] < previous['end'] and word['word'].lower() == previous['word'].lower():
+                    continue
+                if word['start'] < previous['end']:
+                    word = dict(word, start=previous['end'], end=max(word['end'], previous['end']))
+            stitched.append(word)
+    return stitched
+
+def get_word_timestamps_parallel(audio, model_name="tiny.en", concurrency=1):
+    """Splits audio at silences and transcribes the chunks in a process pool.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio at 16 kHz.
+        model_name (str): Name of the Whisper model to use.
+        concurrency (int): Renders running on this host, including this one (sizes the pool).
+
+    Returns:
+        list: Word timestamp dicts for the whole audio, or None if transcription fails.
+    """
+    chunks = split_on_silence(audio)
+    print(f"Transcribing {len(audio) / ALIGNMENT_SAMPLE_RATE:.1f}s of narration as {len(chunks)} chunks "
+          f"in parallel for word timestamps...")
+    try:
+        tasks = [(audio[start:end], float(start) / ALIGNMENT_SAMPLE_RATE, model_name) for start, end in chunks]
+        futures = _submit_alignment_tasks(model_name, tasks, concurrency)
+        word_segments = stitch_chunk_words([future.result() for future in futures])
+    except Exception as e:
+        print(f"Error during parallel Whisper transcription: {e}")
+        return None
+
+    if not word_segments:
+        print("Warning: Whisper transcription did not return any word segments.")
+        return None
+    print(f"Transcription complete. Found {len(word_segments)} word timestamps.")
+    return word_segments
+
+def get_word_timestamps_batched(audio, model_name="tiny.en"):
+    """Aligns audio through the shared AlignmentBatcher, batching with other jobs' segments.
+
+    Args:
+        audio (np.ndarray): Mono float32 audio at 16 kHz.
+        model_name (str): Name of the Whisper model to use.
+
+    Returns:
+        list: Word timestamp dicts for the whole audio, or None if transcription fails.
+    """
+    from alignment_service import get_alignment_batcher # Imports this module; avoid a cycle at load time
+
+    print(f"Queueing {len(audio) / ALIGNMENT_SAMPLE_RATE:.1f}s of narration for batched Whisper alignment...")
+    try:
+        word_segments = get_alignment_batcher(model_name).align(audio)
+    except Exception as e:
+        print(f"Error during batched Whisper transcription: {e}")
+        return None
+
+    if not word_segments:
+        print("Warning: Whisper transcription did not return any word segments.")
+        return None
+    print(f"Transcription complete. Found {len(word_segments)} word timestamps.")
+    return word_segments
+
 if __name__ == '__main__':
     # Example usage:
     # Assumes you have a test audio file (e.g., the one generated by tts_generator)
@@ -0,0 +1,238 @@
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, log_mel_spectrogram, pad_or_trim
+from whisper.timing import add_word_timestamps
+
+from alignment import (load_whisper_model, split_on_silence, stitch_chunk_words, _extract_words,
+                       _split_model_name, _load_quantized_model, ALIGNMENT_SAMPLE_RATE)
+
+# --- Batching Settings ---
+MAX_ALIGNMENT_BATCH_SIZE = 8 # Max 30-second mel segments encoded together
+MAX_ALIGNMENT_BATCH_WAIT_SECONDS = 0.05 # How long the first queued segment waits for others to join it
+# Segments whose greedy decode looks unreliable are re-transcribed on their own with
+# Whisper's temperature fallback (same thresholds as whisper.transcribe). That runs on a
+# thread of its own, so a slow re-transcription doesn't hold up other jobs' batches
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# One queued segment: the chunk audio, its offset in the job's audio, and where its words go
+_Segment = namedtuple('_Segment', ['job', 'index', 'audio', 'offset_seconds'])
+
+class _AlignmentJob:
+    """Collects the per-segment word lists of one submitted narration."""
+
+    def __init__(self, segment_count):
+        self.future = Future()
+        self.words = [None] * segment_count
+        self.remaining = segment_count
+        self._lock = threading.Lock() # Segments finish on the batching and the fallback threads
+
+    def segment_done(self, index, words):
+        with self._lock:
+            self.words[index] = words
+            self.remaining -= 1
+            finished = self.remaining == 0
+        if finished and not self.future.done():
+            word_segments = stitch_chunk_words(self.words)
+            self.future.set_result(word_segments or None)
+
+class _EncodedAudioModel:
+    """Stands in for a Whisper model whose audio has already been encoded.
+
+    whisper.timing.find_alignment() calls model(mel, tokens); with this wrapper it can be
+    given a row of the batched encoder output instead, so the encoder runs once per batch.
+    """
+
+    def __init__(self, model):
+        self.dims = model.dims
+        self.decoder = model.decoder
+        self.alignment_heads = model.alignment_heads
+        self.device = model.device
+
+    def __call__(self, audio_features, tokens):
+        return self.decoder(tokens, audio_features)
+
+class AlignmentBatcher:
+    """Aligns narrations from many jobs with one Whisper model, encoding their segments in batches.
+
+    Each submitted narration is split at pauses into segments of at most 30 seconds (one
+    Whisper window). A background thread takes the first waiting segment, gathers whatever
+    else is queued within `max_wait_seconds` (up to `max_batch_size` segments, from any job),
+    runs the encoder once on the stacked mel segments, decodes the batch, and routes the word
+    timestamps back to each job's future. Segments whose batched decode looks unreliable are
+    handed to a separate fallback thread for a full transcription, with its own copy of the
+    model: Whisper's decoder caches attach hooks to the model, so two threads can't decode
+    with the same one.
+    """
+
+    def __init__(self, model_name="tiny.en", max_batch_size=MAX_ALIGNMENT_BATCH_SIZE,
+                 max_wait_seconds=MAX_ALIGNMENT_BATCH_WAIT_SECONDS):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._fallback_executor = ThreadPoolExecutor(max_workers=1,
+                                                     thread_name_prefix=f"alignment-fallback-{model_name}")
+        self._fallback_model = None # Loaded on the fallback thread on first use
+
+    def start(self):
+        """Starts the batching thread (done automatically on the first submit)."""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name=f"alignment-batcher-{self.model_name}",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the batching thread once the segments already queued have been processed."""
+        self._queue.put(None)
+
+    def submit(self, audio):
+        """Queues a narration for alignment.
+
+        Args:
+            audio (np.ndarray): Mono float32 audio at 16 kHz.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the list of word timestamp dicts
+                (None if no words were found).
+        """
+        self.start()
+        chunks = split_on_silence(audio)
+        job = _AlignmentJob(len(chunks))
+        if not chunks:
+            job.future.set_result(None)
+        for index, (start, end) in enumerate(chunks):
+            self._queue.put(_Segment(job, index, audio[start:end], start / ALIGNMENT_SAMPLE_RATE))
+        return job.future
+
+    def align(self, audio, timeout=None):
+        """Submits a narration and waits for its word timestamps."""
+        return self.submit(audio).result(timeout)
+
+    # --- Batching thread ---
+
+    def _collect_batch(self):
+        """Blocks for the next segment, then gathers more until the batch is full or the wait expires."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_seconds
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                segment = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if segment is None:
+                self._queue.put(None) # Finish this batch, then stop
+                break
+            batch.append(segment)
+        return batch
+
+    def _run(self):
+        model = load_whisper_model(self.model_name)
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                self._fallback_executor.shutdown(wait=False) # Queued re-transcriptions still run
+                return
+            try:
+                self._align_batch(model, batch)
+            except Exception as e:
+                print(f"Error during batched Whisper alignment: {e}")
+                for segment in batch:
+                    if not segment.job.future.done():
+                        segment.job.future.set_exception(e)
+
+    def _align_batch(self, model, batch):
+        began = time.perf_counter()
+        tokenizer = whisper.tokenizer.get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                                    language="en", task="transcribe")
+        with torch.no_grad():
+            mel = torch.stack([log_mel_spectrogram(pad_or_trim(segment.audio), model.dims.n_mels)
+                               for segment in batch]).to(model.device)
+            audio_features = model.embed_audio(mel) # One encoder pass for the whole batch
+            options = whisper.DecodingOptions(language="en", without_timestamps=True, fp16=False)
+            results = whisper.decode(model, audio_features, options) # Sees encoded features; skips the encoder
+
+        encoded_model = _EncodedAudioModel(model)
+        fallbacks = 0
+        for segment, features, result in zip(batch, audio_features, results):
+            chunk_seconds = len(segment.audio) / ALIGNMENT_SAMPLE_RATE
+            chunk_end = segment.offset_seconds + chunk_seconds
+            if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                words = [] # Silence
+            elif result.compression_ratio > COMPRESSION_RATIO_THRESHOLD or result.avg_logprob < LOGPROB_THRESHOLD:
+                fallbacks += 1
+                self._fallback_executor.submit(self._retranscribe, segment, chunk_end)
+                continue
+            else:
+                whisper_segment = {"seek": 0, "start": 0.0, "end": chunk_seconds,
+                                   "tokens": result.tokens, "text": result.text}
+                add_word_timestamps(segments=[whisper_segment], model=encoded_model, tokenizer=tokenizer,
+                                    mel=features, num_frames=len(segment.audio) // HOP_LENGTH,
+                                    last_speech_timestamp=0.0)
+                words = _extract_words({"segments": [whisper_segment]}, segment.offset_seconds, chunk_end)
+            segment.job.segment_done(segment.index, words)
+
+        job_count = len({id(segment.job) for segment in batch})
+        print(f"  Aligned batch of {len(batch)} segments from {job_count} job(s) in "
+              f"{time.perf_counter() - began:.2f}s" + (f" ({fallbacks} sent for re-transcription)" if fallbacks else ""))
+
+    # --- Fallback thread ---
+
+    def _retranscribe(self, segment, chunk_end):
+        """Transcribes one segment with Whisper's temperature fallback and routes its words to its job."""
+        if segment.job.future.done():
+            return # The job already failed
+        try:
+            if self._fallback_model is None:
+                base_name, quantized = _split_model_name(self.model_name)
+                self._fallback_model = _load_quantized_model(base_name) if quantized else whisper.load_model(base_name)
+            transcription = self._fallback_model.transcribe(segment.audio, word_timestamps=True, fp16=False,
+                                                            condition_on_previous_text=False)
+            segment.job.segment_done(segment.index,
+                                     _extract_words(transcription, segment.offset_seconds, chunk_end))
+        except Exception as e:
+            print(f"Error during fallback Whisper transcription: {e}")
+            if not segment.job.future.done():
+                segment.job.future.set_exception(e)
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+def get_alignment_batcher(model_name="tiny.en"):
+    """Returns the process-wide batcher for a model, creating it on first use."""
+    with _batchers_lock:
+        if model_name not in _batchers:
+            _batchers[model_name] = AlignmentBatcher(model_name)
+        return _batchers[model_name]
+
+if __name__ == '__main__':
+    # Example usage: align the same narration as several concurrent jobs
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+
+    test_audio = sys.argv[1] if len(sys.argv) > 1 else "../output/test_narration_timed.mp3"
+    job_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    audio = whisper.load_audio(test_audio)
+    batcher = get_alignment_batcher("tiny.en")
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=job_count) as executor:
+        all_words = list(executor.map(lambda _: batcher.align(audio), range(job_count)))
+    print(f"Aligned {job_count} jobs in {time.perf_counter() - began:.2f}s")
+    for word_info in (all_words[0] or [])[:15]:
+        print(f"  {word_info['word']} ({word_info['start']:.2f}s - {word_info['end']:.2f}s)")
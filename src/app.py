@@ -1,4 +1,5 @@
-from flask import Flask, jsonify, request, render_template, send_from_directory
+from flask import Flask, jsonify, request, render_template, send_from_directory, abort
+from werkzeug.wsgi import ClosingIterator
 import threading
 import os
 import sys
@@ -12,13 +13,37 @@ if src_dir not in sys.path:
     sys.path.insert(0, src_dir)
 
 try:
-    from main import run_pipeline, SUBREDDIT as DEFAULT_SUBREDDIT
+    from main import (run_pipeline, render_job, resume_job, estimate_story_cost, generate_random_filename,
+                      SUBREDDIT as DEFAULT_SUBREDDIT)
+    from video_creator import RENDER_PROFILES, DEFAULT_RENDER_PROFILE, OUTPUT_FRAMINGS, PRIMARY_FRAMING, framing_output_path
 except ImportError as e:
     print(f"Error importing main: {e}. Make sure main.py is in the same directory ({src_dir}) and all dependencies are installed.")
     # Define dummy functions/variables if import fails, so Flask can still load
-    def run_pipeline():
+    def run_pipeline(**kwargs):
         print("ERROR: run_pipeline could not be imported.")
+    def render_job(*args, **kwargs):
+        print("ERROR: render_job could not be imported.")
+    def resume_job(*args, **kwargs):
+        print("ERROR: resume_job could not be imported.")
+    def estimate_story_cost(*args, **kwargs):
+        return {"memory_bytes": 0, "cpu_cores": 0, "seconds": 0}
+    def generate_random_filename(prefix="video", length=8):
+        return prefix
     DEFAULT_SUBREDDIT = "ImportError"
+    RENDER_PROFILES = {"final": {}}
+    DEFAULT_RENDER_PROFILE = "final"
+    OUTPUT_FRAMINGS = {"9:16": "full"}
+    PRIMARY_FRAMING = "9:16"
+    def framing_output_path(output_path, framing):
+        return output_path
+
+from font_registry import prewarm_fonts
+from artifact_store import ArtifactStore
+from job_queue import JobQueue, LEASE_SECONDS, HEARTBEAT_SECONDS, FINISHED_STATUSES
+from cancellation import cancel_scope, cancel_job, JobCancelled
+from job_store import (get_job_status, mark_interrupted_jobs, load_job, load_checkpoints, JOB_DONE, STAGE_STORY,
+                       STAGE_RENDER_PLAN)
+from admission import AdmissionController, DEFAULT_STORY_WORDS
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
 
@@ -26,7 +51,11 @@ app = Flask(__name__, template_folder='templates', static_folder='static')
 GENERATION_IN_PROGRESS = False
 GENERATION_THREAD = None
 RESULT_FILE = None
+RESULT_FILES = [] # Every output of the last job (one per part for a multi-part story)
+RESULT_VARIANTS = {} # Result file -> {framing: filename} for extra framings (1:1, 16:9)
 GENERATION_ERROR = None
+CURRENT_JOB_ID = None
+CURRENT_RENDER_PROFILE = None
 
 # Progress tracking
 PROGRESS_LOGS = []
@@ -51,6 +80,18 @@ BACKGROUND_VIDEOS = {
 
 BACKGROUND_MUSIC_PATH = "src/assets/background_music.mp3"
 
+OUTPUT_DIR = os.path.join(src_dir, 'output') # Finished videos and retained draft inputs
+ESTIMATED_JOB_OUTPUT_BYTES = 300 * 1024 ** 2 # Room to reserve on disk before a job starts encoding
+
+# Where jobs render: "local" (threads in this process, as many at once as the admission
+# controller allows) or "workers" (queued for render workers started with
+# `python src/worker.py --server <this url>`)
+RENDER_MODE = os.getenv("REELIT_RENDER_MODE", "local")
+WORKER_TOKEN = os.getenv("REELIT_WORKER_TOKEN", "") # If set, workers must send it in X-Reelit-Worker-Token
+CANCEL_WAIT_SECONDS = 10 # How long /cancel waits for a local job to stop before answering
+
+LOCAL_JOB_THREADS = {} # job id -> thread, for every local job queued or running
+
 class ProgressLogHandler:
     """Custom handler to capture log messages and update progress"""
     
@@ -75,10 +116,11 @@ class ProgressLogHandler:
                     break
             
             # Track specific processing steps to provide detailed status
-            if "Creating caption: '" in message:
+            # video_creator logs each planned caption as it is queued for rasterizing
+            if "Queued caption: '" in message:
                 # Extract the caption text being processed
                 try:
-                    caption_text = message.split("Creating caption: '")[1].split("'")[0]
+                    caption_text = message.split("Queued caption: '")[1].split("'")[0]
                     self.current_caption = caption_text
                     # Add special log entry for UI to pick up
                     self.progress_queue.put(("log", f"Processing caption: '{caption_text}'"))
@@ -94,7 +136,7 @@ class ProgressLogHandler:
                     self.progress_queue.put(("progress", 60))
                 elif "Generating subtitle images" in message:
                     self.progress_queue.put(("progress", 65))
-                elif "Creating caption" in message:
+                elif "Queued caption" in message:
                     self.progress_queue.put(("progress", 70))
                 elif "Compositing final video" in message:
                     self.progress_queue.put(("progress", 75))
@@ -109,62 +151,272 @@ class ProgressLogHandler:
             if "successfully" in message.lower() or "saved to" in message.lower():
                 self.progress_queue.put(("progress_update", None))
 
-def pipeline_wrapper(subreddit, background_video, music_volume=0.15):
-    """Wrapper function to run the pipeline and manage the global flag."""
-    global GENERATION_IN_PROGRESS, RESULT_FILE, GENERATION_ERROR, PROGRESS_LOGS, CURRENT_STEP, PROGRESS_PERCENTAGE
-    
-    RESULT_FILE = None
-    GENERATION_ERROR = None
-    PROGRESS_LOGS = ["Starting video generation pipeline..."]
-    CURRENT_STEP = "Initializing"
-    PROGRESS_PERCENTAGE = 0
+class JobLogRouter:
+    """Stands in for sys.stdout so each local job's output reaches its own ProgressLogHandler.
+
+    Several local jobs can run at once, so stdout can't simply be swapped for one job's
+    handler. Output of the job the UI is showing (CURRENT_JOB_ID) feeds the progress tracking;
+    everything else goes to the console.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._routes = {} # thread id -> (job id, handler)
+
+    def route(self, job_id, handler):
+        """Sends the calling thread's output to `handler` while `job_id` is the current job."""
+        self._routes[threading.get_ident()] = (job_id, handler)
+
+    def unroute(self):
+        self._routes.pop(threading.get_ident(), None)
+
+    def write(self, message):
+        route = self._routes.get(threading.get_ident())
+        if route and route[0] == CURRENT_JOB_ID:
+            route[1].write(message)
+        else:
+            self.stream.write(message)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+# Server state, built by init_app() rather than at import: spawn-context pool processes
+# (alignment, caption rasterizing, story parts) re-import the main module, and must not
+# rebuild it (the artifact store rewrites its index) or wrap stdout again
+ARTIFACT_STORE = None # Finished videos (and retained draft inputs) with quota/retention tracking
+JOB_QUEUE = None # Jobs waiting for or leased to render workers
+ADMISSION = None # Local jobs are admitted while their estimated memory and cores fit this host, and queued otherwise
+LOG_ROUTER = None
+
+def init_app():
+    """Builds the server state and routes stdout per job. Called once, before serving.
+
+    Returns:
+        Flask: The app.
+    """
+    global ARTIFACT_STORE, JOB_QUEUE, ADMISSION, LOG_ROUTER
+    if LOG_ROUTER is None:
+        ARTIFACT_STORE = ArtifactStore(OUTPUT_DIR, job_dir_root=os.path.join(OUTPUT_DIR, 'jobs'))
+        JOB_QUEUE = JobQueue()
+        ADMISSION = AdmissionController()
+        LOG_ROUTER = JobLogRouter(sys.stdout)
+        sys.stdout = LOG_ROUTER
+    return app
+
+def register_job_outputs(job_id, result_paths):
+    """Registers a job's videos, and the extra framings written next to them, with the artifact store.
+
+    Returns:
+        tuple: (video filenames, {video filename: {framing: variant filename}})
+    """
+    result_files = [os.path.basename(path) for path in result_paths]
+    result_variants = {}
+    for path, filename in zip(result_paths, result_files):
+        ARTIFACT_STORE.register(filename, job_id=job_id)
+        # Extra framings are written next to each video in the same pass
+        variants = {}
+        for framing in OUTPUT_FRAMINGS:
+            variant_path = framing_output_path(path, framing)
+            if framing != PRIMARY_FRAMING and os.path.exists(variant_path):
+                variants[framing] = os.path.basename(variant_path)
+                ARTIFACT_STORE.register(variants[framing], job_id=job_id)
+        if variants:
+            result_variants[filename] = variants
+    return result_files, result_variants
+
+def pipeline_wrapper(subreddit, background_video, music_volume=0.15,
+                     render_profile=DEFAULT_RENDER_PROFILE, job_id=None, promote=False, extra_framings=(),
+                     post_url=None, resume=False):
+    """Runs the pipeline (or promotes or resumes a saved job) once the admission controller admits it.
+
+    The job must have been submitted to ADMISSION; it waits here while queued. Several local
+    jobs can run at once; only the one the UI is showing (CURRENT_JOB_ID) updates the progress
+    and result globals.
+    """
+    global GENERATION_IN_PROGRESS, RESULT_FILE, RESULT_FILES, RESULT_VARIANTS, GENERATION_ERROR, PROGRESS_LOGS, CURRENT_STEP, PROGRESS_PERCENTAGE
+
+    def is_current():
+        return CURRENT_JOB_ID == job_id
+
+    def report(message):
+        if is_current():
+            PROGRESS_QUEUE.put(("log", message))
+
+    if is_current():
+        RESULT_FILE = None
+        RESULT_FILES = []
+        RESULT_VARIANTS = {}
+        GENERATION_ERROR = None
+        PROGRESS_LOGS = ["Starting video generation pipeline..."]
+        CURRENT_STEP = "Initializing"
+        PROGRESS_PERCENTAGE = 0
     
     # Create a log handler to capture output for progress tracking
     log_handler = ProgressLogHandler()
     
-    print(f"Background thread started for video generation with params: subreddit={subreddit}, background_video={background_video}, music_volume={music_volume}")
+    print(f"Background thread started for video generation with params: subreddit={subreddit}, background_video={background_video}, music_volume={music_volume}, render_profile={render_profile}, job_id={job_id}")
     
     # Add initial log entry
-    PROGRESS_QUEUE.put(("log", f"Preparing to fetch story from r/{subreddit}"))
-    PROGRESS_QUEUE.put(("log", f"Selected background: {os.path.basename(background_video)}"))
-    PROGRESS_QUEUE.put(("log", f"Music volume set to: {int(music_volume * 100)}%"))
+    if promote:
+        report(f"Promoting job {job_id} to '{render_profile}' (reusing narration and captions)")
+    elif resume:
+        report(f"Resuming job {job_id} from its last finished stage")
+    else:
+        report(f"Preparing to fetch story {post_url}" if post_url else f"Preparing to fetch story from r/{subreddit}")
+        report(f"Selected background: {os.path.basename(background_video)}")
+        report(f"Music volume set to: {int(music_volume * 100)}%")
+        report(f"Render profile: {render_profile}")
+        if extra_framings:
+            report(f"Extra framings: {', '.join(extra_framings)}")
     
+    error = None
+    pinned = False
     try:
-        # Redirect stdout to capture logs (save original)
-        original_stdout = sys.stdout
-        sys.stdout = log_handler
-        
-        # Call run_pipeline with the parameters
-        result_file = run_pipeline(
-            subreddit=subreddit,
-            background_video_path=background_video,
-            background_music_path=BACKGROUND_MUSIC_PATH,
-            music_volume=music_volume
-        )
-        
-        # Restore stdout
-        sys.stdout = original_stdout
+        # /cancel/<job_id> can stop the job from here on (a queued job is withdrawn from the queue)
+        with cancel_scope(job_id):
+            admission = ADMISSION.status(job_id)
+            if admission and admission["state"] == "queued":
+                report(f"Waiting for resources (queue position {admission['queue_position']}, "
+                       f"expected to start in about {admission['retry_after']}s)")
+            if not ADMISSION.wait(job_id):
+                raise JobCancelled(f"Job {job_id} was cancelled.")
+
+            # Keep this job's inputs and outputs safe from the sweeper while it runs,
+            # and make room for what it is about to write
+            ARTIFACT_STORE.pin(job_id)
+            pinned = True
+            ARTIFACT_STORE.ensure_free_space(ESTIMATED_JOB_OUTPUT_BYTES)
+
+            # Encoders share the cores with every job admitted so far (this one included)
+            concurrency = max(1, len(ADMISSION.snapshot()["running"]))
+
+            # Send this thread's output to the progress tracking (while the job is the current one)
+            LOG_ROUTER.route(job_id, log_handler)
+            if promote:
+                # Only the encode runs; story, narration, timestamps and captions come from the saved job
+                result_file = render_job(job_id, render_profile=render_profile, concurrency=concurrency)
+            elif resume:
+                # Stages checkpointed by the failed attempt (story, narration, timestamps...) are skipped
+                result_file = resume_job(job_id, concurrency=concurrency)
+            else:
+                # Call run_pipeline with the parameters
+                result_file = run_pipeline(
+                    subreddit=subreddit,
+                    background_video_path=background_video,
+                    background_music_path=BACKGROUND_MUSIC_PATH,
+                    music_volume=music_volume,
+                    render_profile=render_profile,
+                    job_id=job_id,
+                    extra_framings=list(extra_framings),
+                    post_url=post_url,
+                    concurrency=concurrency
+                )
+            LOG_ROUTER.unroute()
         
-        if result_file and os.path.exists(result_file):
-            RESULT_FILE = os.path.basename(result_file)
-            print(f"Video generation completed successfully: {RESULT_FILE}")
-            PROGRESS_QUEUE.put(("log", f"Video generation completed successfully: {RESULT_FILE}"))
-            PROGRESS_QUEUE.put(("progress", 100))  # Set to 100% when complete
+        # Long stories come back as a list of part videos
+        result_paths = result_file if isinstance(result_file, list) else [result_file]
+        if result_file and all(path and os.path.exists(path) for path in result_paths):
+            result_files, result_variants = register_job_outputs(job_id, result_paths)
+            print(f"Video generation completed successfully: {', '.join(result_files)}")
+            if is_current():
+                RESULT_FILES, RESULT_VARIANTS = result_files, result_variants
+                RESULT_FILE = RESULT_FILES[0]
+                PROGRESS_QUEUE.put(("log", f"Video generation completed successfully: {', '.join(RESULT_FILES)}"))
+                PROGRESS_QUEUE.put(("progress", 100))  # Set to 100% when complete
         else:
-            GENERATION_ERROR = "Generation completed but no result file was produced."
-            PROGRESS_QUEUE.put(("log", GENERATION_ERROR))
+            error = "Generation completed but no result file was produced."
+    except JobCancelled:
+        LOG_ROUTER.unroute()
+        error = "Job cancelled."
+        print(f"Job {job_id} cancelled; its scratch files were removed.")
     except Exception as e:
-        # Restore stdout in case of exception
-        if sys.stdout != original_stdout:
-            sys.stdout = original_stdout
-            
-        GENERATION_ERROR = str(e)
+        LOG_ROUTER.unroute()
+        error = str(e)
         print(f"Exception in background pipeline thread: {e}")
-        PROGRESS_QUEUE.put(("log", f"Error: {GENERATION_ERROR}"))
     finally:
-        GENERATION_IN_PROGRESS = False
+        ADMISSION.release(job_id)
+        if pinned:
+            ARTIFACT_STORE.unpin(job_id)
+        LOCAL_JOB_THREADS.pop(job_id, None)
+        if is_current():
+            if error:
+                GENERATION_ERROR = error
+                PROGRESS_QUEUE.put(("log", error if error == "Job cancelled." else f"Error: {error}"))
+            GENERATION_IN_PROGRESS = False
         print("Background thread finished.")
-        PROGRESS_QUEUE.put(("log", "Background thread finished."))
+        report("Background thread finished.")
+
+def worker_pipeline_wrapper(job_id, kind, params):
+    """Queues a job for the render workers and follows it until a worker finishes it.
+
+    The worker's log lines (sent with its heartbeats) go through the same ProgressLogHandler
+    as a local run, so progress tracking works unchanged. Several jobs can be in flight; only
+    the one the UI is showing (CURRENT_JOB_ID) updates the progress and result globals.
+    """
+    global GENERATION_IN_PROGRESS, RESULT_FILE, RESULT_FILES, RESULT_VARIANTS, GENERATION_ERROR, PROGRESS_LOGS, CURRENT_STEP, PROGRESS_PERCENTAGE
+
+    def is_current():
+        return CURRENT_JOB_ID == job_id
+
+    if is_current():
+        RESULT_FILE = None
+        RESULT_FILES = []
+        RESULT_VARIANTS = {}
+        GENERATION_ERROR = None
+        PROGRESS_LOGS = ["Starting video generation pipeline..."]
+        CURRENT_STEP = "Initializing"
+        PROGRESS_PERCENTAGE = 0
+    log_handler = ProgressLogHandler()
+
+    ARTIFACT_STORE.pin(job_id)
+    ARTIFACT_STORE.ensure_free_space(ESTIMATED_JOB_OUTPUT_BYTES)
+    error = None
+    try:
+        # Promotions and resumes read a job's saved inputs, so only workers sharing src/output can run them
+        JOB_QUEUE.enqueue(job_id, kind, params, requires_shared_output=(kind in ("promote", "resume")))
+        position = JOB_QUEUE.get(job_id)["queue_position"]
+        if is_current():
+            PROGRESS_QUEUE.put(("log", f"Waiting for a render worker (queue position {position}, "
+                                       f"{len(JOB_QUEUE.workers())} workers registered)"))
+        log_index, status = 0, "queued"
+        while status is not None and status not in FINISHED_STATUSES:
+            lines, log_index, status = JOB_QUEUE.wait_for_update(job_id, log_index)
+            if is_current():
+                for line in lines:
+                    log_handler.write(line)
+
+        job = JOB_QUEUE.get(job_id)
+        if job is None:
+            error = "The job's record was pruned from the worker queue before its result was read."
+        elif status == "cancelled":
+            error = "Job cancelled."
+        elif status == "failed":
+            error = job["error"] or "Render worker reported a failure."
+        else:
+            result_paths = [os.path.join(OUTPUT_DIR, filename) for filename in job["result_files"] or []]
+            if result_paths and all(os.path.exists(path) for path in result_paths):
+                result_files, result_variants = register_job_outputs(job_id, result_paths)
+                print(f"Video generation completed successfully on a render worker: {', '.join(result_files)}")
+                if is_current():
+                    RESULT_FILES, RESULT_VARIANTS = result_files, result_variants
+                    RESULT_FILE = RESULT_FILES[0]
+                    PROGRESS_QUEUE.put(("log", f"Video generation completed successfully: {', '.join(RESULT_FILES)}"))
+                    PROGRESS_QUEUE.put(("progress", 100))
+            else:
+                error = "Render worker finished but its result files are not in the output directory."
+    except Exception as e:
+        error = str(e)
+        print(f"Exception while following job {job_id}: {e}")
+    finally:
+        ARTIFACT_STORE.unpin(job_id)
+        if is_current():
+            if error:
+                GENERATION_ERROR = error
+                PROGRESS_QUEUE.put(("log", f"Error: {error}"))
+            GENERATION_IN_PROGRESS = False
 
 def process_progress_queue():
     """Process any pending messages in the progress queue"""
@@ -222,6 +474,47 @@ def process_progress_queue():
     except Exception as e:
         print(f"Error processing progress queue: {e}")
 
+def saved_story_words(job_id):
+    """Word count of a saved job's story, for its admission cost (DEFAULT_STORY_WORDS if unknown)."""
+    story = load_checkpoints(job_id).get(STAGE_STORY)
+    if story:
+        return len(f"{story['title_text']} {story['story_text']}".split())
+    record = load_job(job_id)
+    # A multi-part job's record lists its parts, each with its own record
+    records = [load_job(part_id) for part_id in record["parts"]] if record and "parts" in record else [record]
+    words = sum(len(part["word_timestamps"]) for part in records if part and "word_timestamps" in part)
+    return words or DEFAULT_STORY_WORDS
+
+def admit_local_job(job_id, story_words, render_profile, extra_framings=()):
+    """Submits a local job to the admission controller.
+
+    Returns:
+        tuple: (admission decision, or None if rejected; error response to return if rejected)
+    """
+    cost = estimate_story_cost(story_words, render_profile, extra_framings)
+    admission = ADMISSION.submit(job_id, cost)
+    print(f"Admission for job {job_id}: {admission['decision']} (about {cost['memory_bytes'] / 1024 ** 3:.1f} GB, "
+          f"{cost['cpu_cores']:g} cores, {cost['seconds']:.0f}s)")
+    if admission["decision"] != "rejected":
+        return admission, None
+    response = jsonify({"status": "error", "message": f"Not enough capacity for this job. {admission['reason']}",
+                        "queue_position": None, "retry_after": admission["retry_after"]})
+    if admission["retry_after"] is None:
+        return None, (response, 503) # Service Unavailable: too big for this host, whatever is running
+    response.headers["Retry-After"] = str(admission["retry_after"])
+    return None, (response, 429) # Too Many Requests: the queue is full
+
+def accepted_response(message, job_id, admission=None, **fields):
+    """202 response for a started job, with its queue position if the admission controller queued it."""
+    body = {"status": "success", "message": message, "job_id": job_id, **fields}
+    if admission:
+        body.update(admission=admission["decision"], queue_position=admission["queue_position"],
+                    retry_after=admission["retry_after"])
+        if admission["decision"] == "queued":
+            body["message"] += (f" Waiting for resources (queue position {admission['queue_position']}, "
+                                f"expected to start in about {admission['retry_after']}s).")
+    return jsonify(body), 202 # Accepted
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -230,21 +523,30 @@ def index():
 @app.route('/generate', methods=['POST'])
 def generate_video_endpoint():
     """API endpoint to trigger the video generation pipeline."""
-    global GENERATION_IN_PROGRESS, GENERATION_THREAD, RESULT_FILE, GENERATION_ERROR
-
-    if GENERATION_IN_PROGRESS:
-        # Check if the thread is still alive
-        if GENERATION_THREAD and GENERATION_THREAD.is_alive():
-            return jsonify({"status": "error", "message": "Video generation is already in progress."}), 429 # Too Many Requests
-        else:
-            # Thread finished unexpectedly or flag wasn't reset properly, allow starting a new one
-            print("Warning: GENERATION_IN_PROGRESS was True, but thread is not alive. Resetting flag.")
-            GENERATION_IN_PROGRESS = False
+    global GENERATION_IN_PROGRESS, GENERATION_THREAD, RESULT_FILE, RESULT_FILES, RESULT_VARIANTS, GENERATION_ERROR, CURRENT_JOB_ID, CURRENT_RENDER_PROFILE
 
     # Get parameters from form data
     subreddit = request.form.get('subreddit', DEFAULT_SUBREDDIT)
     selected_game = request.form.get('selected_game')
     music_volume = float(request.form.get('music_volume', 0.15))  # Default to 15%
+    render_profile = request.form.get('render_profile', DEFAULT_RENDER_PROFILE)
+    extra_framings = request.form.getlist('extra_framings')
+    post_url = request.form.get('post_url', '').strip() or None
+
+    # Validate render profile
+    if render_profile not in RENDER_PROFILES:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid render profile: {render_profile}. Valid options are: {', '.join(RENDER_PROFILES.keys())}"
+        }), 400
+
+    # Validate extra framings
+    invalid_framings = [framing for framing in extra_framings if framing not in OUTPUT_FRAMINGS]
+    if invalid_framings:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid output framing: {', '.join(invalid_framings)}. Valid options are: {', '.join(OUTPUT_FRAMINGS.keys())}"
+        }), 400
 
     # Validate game selection
     if not selected_game or selected_game not in BACKGROUND_VIDEOS:
@@ -255,23 +557,165 @@ def generate_video_endpoint():
 
     # Get the background video path for the selected game
     background_video = BACKGROUND_VIDEOS[selected_game]
+    job_id = generate_random_filename(prefix=subreddit)
+
+    # Local jobs start once their estimated memory and cores fit (the story isn't fetched yet,
+    # so it is costed at a typical length)
+    admission = None
+    if RENDER_MODE == "local":
+        admission, rejection = admit_local_job(job_id, DEFAULT_STORY_WORDS, render_profile, extra_framings)
+        if rejection:
+            return rejection
     
     # Reset result tracking
     RESULT_FILE = None
+    RESULT_FILES = []
+    RESULT_VARIANTS = {}
     GENERATION_ERROR = None
     
-    print(f"Received request to generate video: subreddit={subreddit}, game={selected_game}, bg_video={background_video}, music_vol={music_volume}")
+    CURRENT_JOB_ID = job_id
+    CURRENT_RENDER_PROFILE = render_profile
+    
+    print(f"Received request to generate video: subreddit={subreddit}, game={selected_game}, bg_video={background_video}, music_vol={music_volume}, profile={render_profile}")
     GENERATION_IN_PROGRESS = True
     
     # Run the pipeline in a separate thread to avoid blocking the request
-    GENERATION_THREAD = threading.Thread(
-        target=pipeline_wrapper, 
-        args=(subreddit, background_video, music_volume),
-        daemon=True
-    )
+    if RENDER_MODE == "workers":
+        params = {"subreddit": subreddit, "background_video_path": background_video,
+                  "background_music_path": BACKGROUND_MUSIC_PATH, "music_volume": music_volume,
+                  "render_profile": render_profile, "extra_framings": extra_framings, "post_url": post_url}
+        GENERATION_THREAD = threading.Thread(
+            target=worker_pipeline_wrapper, args=(CURRENT_JOB_ID, "generate", params), daemon=True
+        )
+    else:
+        GENERATION_THREAD = threading.Thread(
+            target=pipeline_wrapper, 
+            args=(subreddit, background_video, music_volume, render_profile, CURRENT_JOB_ID),
+            kwargs={"extra_framings": extra_framings, "post_url": post_url},
+            daemon=True
+        )
+        LOCAL_JOB_THREADS[job_id] = GENERATION_THREAD
     GENERATION_THREAD.start()
 
-    return jsonify({"status": "success", "message": "Video generation started in the background."}), 202 # Accepted
+    return accepted_response("Video generation started in the background.", job_id, admission)
+
+@app.route('/promote/<job_id>', methods=['POST'])
+def promote_job_endpoint(job_id):
+    """API endpoint to re-render a saved draft job with another profile (default: final)."""
+    global GENERATION_IN_PROGRESS, GENERATION_THREAD, RESULT_FILE, RESULT_FILES, RESULT_VARIANTS, GENERATION_ERROR, CURRENT_JOB_ID, CURRENT_RENDER_PROFILE
+
+    render_profile = request.form.get('render_profile', 'final')
+    if render_profile not in RENDER_PROFILES:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid render profile: {render_profile}. Valid options are: {', '.join(RENDER_PROFILES.keys())}"
+        }), 400
+
+    admission = None
+    if RENDER_MODE == "local":
+        if job_id in LOCAL_JOB_THREADS:
+            return jsonify({"status": "error", "message": f"Job {job_id} is already queued or running."}), 409 # Conflict
+        admission, rejection = admit_local_job(job_id, saved_story_words(job_id), render_profile)
+        if rejection:
+            return rejection
+
+    RESULT_FILE = None
+    RESULT_FILES = []
+    RESULT_VARIANTS = {}
+    GENERATION_ERROR = None
+    CURRENT_JOB_ID = job_id
+    CURRENT_RENDER_PROFILE = render_profile
+
+    print(f"Received request to promote job {job_id} to profile '{render_profile}'")
+    GENERATION_IN_PROGRESS = True
+    if RENDER_MODE == "workers":
+        GENERATION_THREAD = threading.Thread(
+            target=worker_pipeline_wrapper, args=(job_id, "promote", {"render_profile": render_profile}), daemon=True
+        )
+    else:
+        GENERATION_THREAD = threading.Thread(
+            target=pipeline_wrapper,
+            kwargs={"subreddit": None, "background_video": None, "render_profile": render_profile,
+                    "job_id": job_id, "promote": True},
+            daemon=True
+        )
+        LOCAL_JOB_THREADS[job_id] = GENERATION_THREAD
+    GENERATION_THREAD.start()
+
+    return accepted_response(f"Rendering job {job_id} with profile '{render_profile}'.", job_id, admission)
+
+@app.route('/resume/<job_id>', methods=['POST'])
+def resume_job_endpoint(job_id):
+    """API endpoint to resume a failed or interrupted job from its last finished stage."""
+    global GENERATION_IN_PROGRESS, GENERATION_THREAD, RESULT_FILE, RESULT_FILES, RESULT_VARIANTS, GENERATION_ERROR, CURRENT_JOB_ID, CURRENT_RENDER_PROFILE
+
+    job = get_job_status(job_id)
+    if job is None or not job["params"]:
+        return jsonify({"status": "error", "message": f"Unknown job: {job_id}"}), 404
+    if job["status"] == JOB_DONE:
+        return jsonify({"status": "error", "message": f"Job {job_id} already finished."}), 409 # Conflict
+
+    render_profile = job["params"].get("render_profile", DEFAULT_RENDER_PROFILE)
+    admission = None
+    if RENDER_MODE == "local":
+        if job_id in LOCAL_JOB_THREADS:
+            return jsonify({"status": "error", "message": f"Job {job_id} is already queued or running."}), 409 # Conflict
+        admission, rejection = admit_local_job(job_id, saved_story_words(job_id), render_profile,
+                                               job["params"].get("extra_framings") or ())
+        if rejection:
+            return rejection
+
+    RESULT_FILE = None
+    RESULT_FILES = []
+    RESULT_VARIANTS = {}
+    GENERATION_ERROR = None
+    CURRENT_JOB_ID = job_id
+    CURRENT_RENDER_PROFILE = render_profile
+
+    print(f"Received request to resume job {job_id} ({job['status']}, finished stages: {', '.join(job['stages']) or 'none'})")
+    GENERATION_IN_PROGRESS = True
+    if RENDER_MODE == "workers":
+        GENERATION_THREAD = threading.Thread(
+            target=worker_pipeline_wrapper, args=(job_id, "resume", {}), daemon=True
+        )
+    else:
+        GENERATION_THREAD = threading.Thread(
+            target=pipeline_wrapper,
+            kwargs={"subreddit": None, "background_video": None, "render_profile": CURRENT_RENDER_PROFILE,
+                    "job_id": job_id, "resume": True},
+            daemon=True
+        )
+        LOCAL_JOB_THREADS[job_id] = GENERATION_THREAD
+    GENERATION_THREAD.start()
+
+    return accepted_response(f"Resuming job {job_id}.", job_id, admission, stages=job["stages"])
+
+@app.route('/cancel/<job_id>', methods=['POST'])
+def cancel_job_endpoint(job_id):
+    """API endpoint to cancel a queued or running job.
+
+    A local job waiting for admission leaves the queue; a running one stops at its next stage
+    boundary, or within a frame while encoding (the encoder is killed), its scratch files are
+    removed and its resource reservation is released.
+    A job on a render worker is dropped from the queue, or stopped at the worker's next heartbeat.
+    """
+    if RENDER_MODE == "workers":
+        if not JOB_QUEUE.cancel(job_id):
+            return jsonify({"status": "error", "message": f"Job {job_id} is not queued or running."}), 409 # Conflict
+        return jsonify({"status": "success", "message": f"Job {job_id} cancelled.", "job_id": job_id})
+
+    thread = LOCAL_JOB_THREADS.get(job_id)
+    # A job still waiting for admission is dropped from the queue; a running one is stopped
+    withdrawn = ADMISSION.withdraw(job_id)
+    if thread is None or not (cancel_job(job_id) or withdrawn):
+        return jsonify({"status": "error", "message": f"Job {job_id} is not queued or running."}), 409 # Conflict
+    print(f"Received request to cancel job {job_id}")
+    thread.join(timeout=CANCEL_WAIT_SECONDS)
+    if thread.is_alive():
+        # Narration and Whisper can't be interrupted; the job stops when the current one returns
+        return jsonify({"status": "success", "message": f"Cancelling job {job_id}; it stops when its current stage finishes.",
+                        "job_id": job_id}), 202 # Accepted
+    return jsonify({"status": "success", "message": f"Job {job_id} cancelled.", "job_id": job_id})
 
 @app.route('/status', methods=['GET'])
 def generation_status():
@@ -297,10 +741,21 @@ def generation_status():
         else:
             status_message = "No video generation in progress."
 
+    # A local job waiting for resources reports where it is in the admission queue
+    admission = ADMISSION.status(CURRENT_JOB_ID) if GENERATION_IN_PROGRESS and RENDER_MODE == "local" else None
+    if admission and admission["state"] == "queued":
+        status_message = f"Waiting for resources (queue position {admission['queue_position']})."
+
     return jsonify({
         "in_progress": GENERATION_IN_PROGRESS, 
+        "queue_position": admission["queue_position"] if admission else None,
+        "retry_after": admission["retry_after"] if admission else None,
         "message": status_message,
         "result_file": RESULT_FILE,
+        "result_files": RESULT_FILES,
+        "result_variants": RESULT_VARIANTS,
+        "job_id": CURRENT_JOB_ID,
+        "render_profile": CURRENT_RENDER_PROFILE,
         "error": GENERATION_ERROR,
         "progress": {
             "percentage": PROGRESS_PERCENTAGE,
@@ -309,10 +764,177 @@ def generation_status():
         }
     })
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """API endpoint for the state of a job: its render worker lease, its place in the local admission
+    queue, or its stored status and checkpoints."""
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        # Not handed to the workers (or from before a restart): report what the job store has
+        admission = ADMISSION.status(job_id)
+        if admission and admission["state"] == "queued":
+            # Waiting for local resources; the job store has nothing for it until it starts
+            return jsonify({"job_id": job_id, "status": "queued", "queue_position": admission["queue_position"],
+                            "retry_after": admission["retry_after"]})
+        stored_job = get_job_status(job_id)
+        if stored_job is None:
+            return jsonify({"status": "error", "message": f"Unknown job: {job_id}"}), 404
+        return jsonify(stored_job)
+    return jsonify({key: job[key] for key in ("job_id", "kind", "status", "queue_position", "worker_id",
+                                              "attempts", "result_files", "error", "created", "finished")})
+
+@app.route('/jobs/<job_id>/plan', methods=['GET'])
+def job_render_plan(job_id):
+    """API endpoint for a job's render plan (title timing, captions, background, audio mix).
+
+    The narration and title card paths are relative to the directory of the job that planned
+    it (the record's plan_job_id; another job's for a render cache hit). A multi-part job returns {"parts": {part id: plan}}.
+    """
+    def find_plan(plan_job_id):
+        record = load_job(plan_job_id) or {}
+        return record.get("render_plan") or load_checkpoints(plan_job_id).get(STAGE_RENDER_PLAN)
+
+    record = load_job(job_id)
+    if record and "parts" in record:
+        return jsonify({"parts": {part_id: find_plan(part_id) for part_id in record["parts"]}})
+    plan = find_plan(job_id)
+    if plan is None:
+        return jsonify({"status": "error", "message": f"No render plan for job: {job_id}"}), 404
+    return jsonify(plan)
+
+@app.route('/admission', methods=['GET'])
+def admission_status():
+    """API endpoint for the local admission controller: budgets, reservations and the queue."""
+    return jsonify(ADMISSION.snapshot())
+
+# --- Render Worker API ---
+# Workers (src/worker.py) register, lease queued jobs, renew the lease with heartbeats that also
+# carry their log lines, upload outputs (unless they share src/output) and report the result.
+
+def _worker_request_allowed():
+    return not WORKER_TOKEN or request.headers.get("X-Reelit-Worker-Token") == WORKER_TOKEN
+
+def _unknown_worker():
+    return jsonify({"status": "error", "message": "Unknown worker; register again."}), 404
+
+def _lost_lease():
+    return jsonify({"status": "error", "message": "This worker no longer holds the job's lease."}), 409
+
+@app.before_request
+def check_worker_token():
+    """Rejects worker API calls without the shared token (when one is configured)."""
+    if request.path.startswith('/workers') and not _worker_request_allowed():
+        return jsonify({"status": "error", "message": "Invalid worker token."}), 403
+
+@app.route('/workers', methods=['GET'])
+def list_workers():
+    """API endpoint listing registered render workers."""
+    return jsonify({"render_mode": RENDER_MODE, "workers": JOB_QUEUE.workers()})
+
+@app.route('/workers/register', methods=['POST'])
+def register_worker():
+    """Registers a render worker. Returns its id and the lease/heartbeat timing it must follow."""
+    payload = request.get_json(silent=True) or {}
+    worker_id = JOB_QUEUE.register_worker(payload.get("name") or request.remote_addr,
+                                          shared_output=bool(payload.get("shared_output")))
+    return jsonify({"worker_id": worker_id, "lease_seconds": LEASE_SECONDS, "heartbeat_seconds": HEARTBEAT_SECONDS})
+
+@app.route('/workers/<worker_id>/lease', methods=['POST'])
+def lease_job(worker_id):
+    """Hands the oldest queued job to a worker (204 if there is none)."""
+    try:
+        job = JOB_QUEUE.lease(worker_id)
+    except KeyError:
+        return _unknown_worker()
+    if job is None:
+        return "", 204
+    return jsonify({"job": job})
+
+@app.route('/workers/<worker_id>/heartbeat', methods=['POST'])
+def worker_heartbeat(worker_id):
+    """Renews a worker's lease on its job and records the job's new log lines."""
+    payload = request.get_json(silent=True) or {}
+    try:
+        lease_held = JOB_QUEUE.heartbeat(worker_id, payload.get("job_id"), payload.get("logs") or [])
+    except KeyError:
+        return _unknown_worker()
+    cancelled = not lease_held and JOB_QUEUE.is_cancelled(payload.get("job_id"))
+    return jsonify({"lease_held": lease_held, "cancelled": cancelled})
+
+@app.route('/workers/<worker_id>/jobs/<job_id>/files/<filename>', methods=['PUT'])
+def upload_job_file(worker_id, job_id, filename):
+    """Stores one output file of a leased job in the output directory."""
+    if not JOB_QUEUE.holds_lease(worker_id, job_id):
+        return _lost_lease()
+    # Outputs are named after their job; anything else (or any path) is refused
+    if filename != os.path.basename(filename) or not filename.startswith(job_id) or not filename.endswith(".mp4"):
+        return jsonify({"status": "error", "message": f"Invalid output filename: {filename}"}), 400
+    temp_path = os.path.join(OUTPUT_DIR, f".{filename}.{worker_id}.upload")
+    try:
+        with open(temp_path, "wb") as f:
+            while True:
+                block = request.stream.read(1024 * 1024)
+                if not block:
+                    break
+                f.write(block)
+        os.replace(temp_path, os.path.join(OUTPUT_DIR, filename))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return jsonify({"status": "success"})
+
+@app.route('/workers/<worker_id>/jobs/<job_id>/complete', methods=['POST'])
+def complete_job(worker_id, job_id):
+    """Marks a leased job done; `result_files` are its videos in the output directory."""
+    payload = request.get_json(silent=True) or {}
+    result_files = [os.path.basename(filename) for filename in payload.get("result_files") or []]
+    if not JOB_QUEUE.complete(worker_id, job_id, result_files):
+        return _lost_lease()
+    return jsonify({"status": "success"})
+
+@app.route('/workers/<worker_id>/jobs/<job_id>/fail', methods=['POST'])
+def fail_job(worker_id, job_id):
+    """Marks a leased job failed."""
+    payload = request.get_json(silent=True) or {}
+    if not JOB_QUEUE.fail(worker_id, job_id, payload.get("error") or "Render worker reported a failure."):
+        return _lost_lease()
+    return jsonify({"status": "success"})
+
+# Generated files never change once written (names are unique per job), so let browsers cache them
+OUTPUT_CACHE_MAX_AGE = 3600
+
+def send_output_file(filename, as_attachment):
+    """Serves a generated video with byte-range, ETag and Last-Modified support.
+
+    The file is pinned in the artifact store until the response has finished streaming.
+    """
+    if not ARTIFACT_STORE.exists(filename):
+        abort(404)
+    ARTIFACT_STORE.pin(filename)
+    try:
+        response = send_from_directory(
+            OUTPUT_DIR, filename,
+            as_attachment=as_attachment, mimetype='video/mp4',
+            conditional=True, etag=True, max_age=OUTPUT_CACHE_MAX_AGE
+        )
+    except Exception:
+        ARTIFACT_STORE.unpin(filename)
+        raise
+    # send_file responses are passed straight through to the server, so Response.call_on_close
+    # wouldn't fire; release the pin when the server closes the body iterator instead
+    response.response = ClosingIterator(response.response, [lambda: ARTIFACT_STORE.unpin(filename)])
+    ARTIFACT_STORE.touch(filename, download=as_attachment)
+    return response
+
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download the generated video file."""
-    return send_from_directory(os.path.join(src_dir, 'output'), filename, as_attachment=True)
+    return send_output_file(filename, as_attachment=True)
+
+@app.route('/video/<filename>')
+def stream_file(filename):
+    """Stream the generated video inline so the player can start and seek without a full download."""
+    return send_output_file(filename, as_attachment=False)
 
 if __name__ == '__main__':
     # Check if required files/configs are present before starting
@@ -329,6 +951,25 @@ if __name__ == '__main__':
     if not os.getenv("REDDIT_CLIENT_ID"):
         print("Warning: REDDIT_CLIENT_ID not found in environment variables or .env file. Reddit scraping will fail.")
 
+    init_app()
+
+    # Resolve caption/title fonts (and any fallbacks) once up front; each job thread loads its own copies
+    prewarm_fonts()
+
+    # Evict old/over-quota outputs in the background
+    ARTIFACT_STORE.start_sweeper()
+
+    # Jobs that were running when the server last stopped can be resumed from their checkpoints
+    interrupted_jobs = mark_interrupted_jobs()
+    if interrupted_jobs:
+        print(f"{len(interrupted_jobs)} job(s) were interrupted by the last shutdown and can be resumed "
+              f"(POST /resume/<job_id>): {', '.join(interrupted_jobs)}")
+
+    if RENDER_MODE == "workers":
+        # Re-queue jobs whose worker stopped renewing its lease
+        JOB_QUEUE.start_reaper()
+        print("Render mode: workers. Start render workers with: python src/worker.py --server http://<host>:5000")
+
     print("Starting Flask server...")
     # Use host='0.0.0.0' to make it accessible on the network
     # Disable the reloader to prevent conflicts with background task
@@ -0,0 +1,232 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# --- Retention Policy (override with environment variables) ---
+OUTPUT_QUOTA_BYTES = int(os.getenv("REELIT_OUTPUT_QUOTA_BYTES", 5 * 1024 ** 3)) # Total size allowed for finished videos
+OUTPUT_MAX_AGE_SECONDS = float(os.getenv("REELIT_OUTPUT_MAX_AGE_HOURS", 72)) * 3600 # Older artifacts are evicted
+MIN_FREE_DISK_BYTES = int(os.getenv("REELIT_MIN_FREE_DISK_BYTES", 2 * 1024 ** 3)) # Keep this much disk free for encodes
+SWEEP_INTERVAL_SECONDS = 300
+ARTIFACT_EXTENSIONS = (".mp4",)
+INDEX_FILENAME = ".artifacts.json"
+
+class ArtifactStore:
+    """Tracks finished videos in the output directory and evicts them by age or LRU under a byte quota.
+
+    Files that are pinned (being streamed, or still referenced by a live job) are never evicted.
+    Only registered artifacts are ever removed, so a file that is still being encoded is safe.
+    """
+
+    def __init__(self, directory, quota_bytes=OUTPUT_QUOTA_BYTES, max_age_seconds=OUTPUT_MAX_AGE_SECONDS,
+                 min_free_bytes=MIN_FREE_DISK_BYTES, job_dir_root=None):
+        self.directory = directory
+        self.quota_bytes = quota_bytes
+        self.max_age_seconds = max_age_seconds
+        self.min_free_bytes = min_free_bytes
+        self.job_dir_root = job_dir_root # Optional directory of per-job inputs, aged out with the same policy
+        self.index_path = os.path.join(directory, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._artifacts = {} # filename -> {"size", "created", "last_access", "downloads", "job_id"}
+        self._pins = {} # filename or job id -> reference count
+        self._sweeper = None
+        self._stop_event = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    # --- Index persistence ---
+
+    def _load_index(self):
+        """Loads the saved index and picks up any finished videos that aren't in it yet."""
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._artifacts = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read artifact index {self.index_path}: {e}. Rebuilding it.")
+                self._artifacts = {}
+        # Drop entries whose files are gone, add files we didn't know about
+        on_disk = {name for name in os.listdir(self.directory) if name.endswith(ARTIFACT_EXTENSIONS)}
+        for name in list(self._artifacts):
+            if name not in on_disk:
+                del self._artifacts[name]
+        for name in on_disk - set(self._artifacts):
+            stat = os.stat(os.path.join(self.directory, name))
+            self._artifacts[name] = {"size": stat.st_size, "created": stat.st_mtime,
+                                     "last_access": stat.st_mtime, "downloads": 0, "job_id": None}
+        self._save_index()
+
+    def _save_index(self):
+        """Writes the index atomically. Must be called with the lock held (or before threads start)."""
+        temp_path = None
+        try:
+            # A temp file of its own, so another process saving at the same time can't clobber it
+            fd, temp_path = tempfile.mkstemp(prefix=INDEX_FILENAME, suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._artifacts, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: Could not save artifact index: {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # --- Recording artifacts ---
+
+    def register(self, filename, job_id=None):
+        """Records a finished output file. Call once the file is completely written."""
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        now = time.time()
+        with self._lock:
+            self._artifacts[filename] = {"size": stat.st_size, "created": now, "last_access": now,
+                                         "downloads": 0, "job_id": job_id}
+            self._save_index()
+        print(f"Registered artifact {filename} ({stat.st_size / 1024 ** 2:.1f} MB)")
+
+    def touch(self, filename, download=False):
+        """Marks an artifact as accessed (moves it to the back of the LRU order)."""
+        with self._lock:
+            entry = self._artifacts.get(filename)
+            if entry:
+                entry["last_access"] = time.time()
+                if download: entry["downloads"] += 1
+                self._save_index()
+
+    def exists(self, filename):
+        """Returns True if the artifact is known and still on disk."""
+        with self._lock:
+            return filename in self._artifacts and os.path.exists(os.path.join(self.directory, filename))
+
+    def pin(self, key):
+        """Protects a filename (or job id, for its job directory) from eviction until unpin() is called."""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key):
+        """Releases one pin taken with pin()."""
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0: self._pins[key] = count
+            else: self._pins.pop(key, None)
+
+    def total_bytes(self):
+        """Returns the total size of all tracked artifacts."""
+        with self._lock:
+            return sum(entry["size"] for entry in self._artifacts.values())
+
+    # --- Eviction ---
+
+    def _is_pinned(self, filename, entry):
+        return self._pins.get(filename, 0) > 0 or (entry.get("job_id") and self._pins.get(entry["job_id"], 0) > 0)
+
+    def _evict(self, filename, reason):
+        """Removes one artifact. Must be called with the lock held."""
+        path = os.path.join(self.directory, filename)
+        try:
+            if os.path.exists(path): os.remove(path)
+        except OSError as e:
+            print(f"Error evicting artifact {filename}: {e}")
+            return False
+        entry = self._artifacts.pop(filename)
+        print(f"Evicted artifact {filename} ({entry['size'] / 1024 ** 2:.1f} MB, {reason})")
+        return True
+
+    def sweep(self, extra_bytes_needed=0):
+        """Evicts expired artifacts, then least recently used ones until under quota and disk reserve.
+
+        Args:
+            extra_bytes_needed (int): Additional bytes a job is about to write.
+
+        Returns:
+            list: Filenames that were evicted.
+        """
+        evicted = []
+        now = time.time()
+        with self._lock:
+            # 1. Age-based expiry
+            for name, entry in list(self._artifacts.items()):
+                if now - entry["created"] > self.max_age_seconds and not self._is_pinned(name, entry):
+                    if self._evict(name, "expired"): evicted.append(name)
+
+            # 2. LRU until under quota and enough disk is free
+            def over_budget():
+                used = sum(entry["size"] for entry in self._artifacts.values())
+                free = shutil.disk_usage(self.directory).free
+                return (used + extra_bytes_needed > self.quota_bytes
+                        or free - extra_bytes_needed < self.min_free_bytes)
+
+            candidates = sorted(self._artifacts.items(), key=lambda item: item[1]["last_access"])
+            for name, entry in candidates:
+                if not over_budget():
+                    break
+                if self._is_pinned(name, entry):
+                    continue
+                if self._evict(name, "over quota"): evicted.append(name)
+
+            if evicted:
+                self._save_index()
+            if over_budget():
+                print("Warning: Output storage is still over budget; remaining artifacts are in use.")
+
+        self._sweep_job_dirs(now)
+        return evicted
+
+    def _is_job_dir_pinned(self, job_id):
+        """A job directory is pinned by its job id, or by its story's (<id>_partN). Must be called with the lock held."""
+        return any(count > 0 and (job_id == key or job_id.startswith(f"{key}_part"))
+                   for key, count in self._pins.items())
+
+    @staticmethod
+    def _last_modified(job_dir):
+        """Newest mtime of a job directory and everything in it (rewriting a file doesn't touch the directory)."""
+        newest = os.path.getmtime(job_dir)
+        for root, dirs, files in os.walk(job_dir):
+            for name in dirs + files:
+                try:
+                    newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+                except OSError:
+                    pass # Removed while we looked
+        return newest
+
+    def _sweep_job_dirs(self, now):
+        """Removes per-job input directories that are past the age limit and not pinned."""
+        if not self.job_dir_root or not os.path.isdir(self.job_dir_root):
+            return
+        for job_id in os.listdir(self.job_dir_root):
+            job_dir = os.path.join(self.job_dir_root, job_id)
+            if not os.path.isdir(job_dir):
+                continue
+            with self._lock:
+                if self._is_job_dir_pinned(job_id):
+                    continue
+            if now - self._last_modified(job_dir) > self.max_age_seconds:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                print(f"Evicted job directory {job_dir} (expired)")
+
+    def ensure_free_space(self, bytes_needed):
+        """Evicts artifacts so a job can write `bytes_needed` more bytes without filling the disk."""
+        return self.sweep(extra_bytes_needed=bytes_needed)
+
+    # --- Background sweeper ---
+
+    def start_sweeper(self, interval_seconds=SWEEP_INTERVAL_SECONDS):
+        """Starts a daemon thread that sweeps the store every `interval_seconds`."""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        def _run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Error during artifact sweep: {e}")
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=_run, name="artifact-sweeper", daemon=True)
+        self._sweeper.start()
+        print(f"Artifact sweeper started (quota {self.quota_bytes / 1024 ** 3:.1f} GB, "
+              f"max age {self.max_age_seconds / 3600:.0f} h, every {interval_seconds}s).")
+
+    def stop_sweeper(self):
+        """Stops the background sweeper thread."""
+        self._stop_event.set()
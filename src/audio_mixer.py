@@ -0,0 +1,199 @@
+import numpy as np
+import os
+import subprocess
+from moviepy.config import get_setting
+
+# --- Mix Settings ---
+MIX_SAMPLE_RATE = 48000 # Sample rate of the final mixed track (Hz)
+MIX_CHANNELS = 2 # Final track is stereo; mono narration is centered
+MIX_AUDIO_BITRATE = "192k"
+DUCKING_WINDOW_SECONDS = 0.05 # Window for the narration loudness envelope
+DUCKING_SPEECH_THRESHOLD = 0.02 # RMS above this counts as speech
+DUCKING_RELEASE_SECONDS = 0.3 # Smoothing so the music doesn't pump between words
+RESAMPLE_TAPS_PER_FACTOR = 16 # Length of the anti-aliasing filter used by resample_audio, per unit of decimation
+
+def decode_audio(audio_path, sample_rate=MIX_SAMPLE_RATE, channels=1):
+    """Decodes an audio file to float32 PCM with a single ffmpeg call.
+
+    Args:
+        audio_path (str): Path to the audio file (MP3, WAV, ...).
+        sample_rate (int): Output sample rate in Hz.
+        channels (int): Number of output channels.
+
+    Returns:
+        np.ndarray: float32 array of shape (samples, channels), values in [-1, 1].
+    """
+    if not os.path.exists(audio_path):
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    cmd = [get_setting("FFMPEG_BINARY"), "-nostdin", "-v", "error", "-i", audio_path,
+           "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_path}: {result.stderr.decode(errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.float32).reshape(-1, channels)
+
+def resample_audio(pcm, from_rate, to_rate):
+    """Downsamples PCM by an integer factor with a windowed-sinc anti-aliasing filter.
+
+    Used to derive Whisper's 16 kHz input from the narration already decoded at
+    MIX_SAMPLE_RATE, instead of decoding the file a second time.
+
+    Args:
+        pcm (np.ndarray): float32 PCM of shape (samples, channels) or (samples,).
+        from_rate (int): Sample rate of `pcm`.
+        to_rate (int): Target sample rate; must divide `from_rate`.
+
+    Returns:
+        np.ndarray: float32 mono array of shape (samples * to_rate / from_rate,).
+    """
+    if from_rate % to_rate != 0:
+        raise ValueError(f"Can only downsample by an integer factor ({from_rate} Hz -> {to_rate} Hz)")
+    mono = pcm.mean(axis=1, dtype=np.float32) if pcm.ndim == 2 else np.asarray(pcm, dtype=np.float32)
+    factor = from_rate // to_rate
+    if factor == 1:
+        return np.ascontiguousarray(mono)
+
+    # Blackman-windowed sinc low-pass just below the new Nyquist frequency
+    taps = RESAMPLE_TAPS_PER_FACTOR * factor + 1
+    offsets = np.arange(taps) - taps // 2
+    kernel = np.sinc(offsets * 0.9 / factor) * np.blackman(taps)
+    kernel = (kernel / kernel.sum()).astype(np.float32)
+
+    # Only compute the samples we keep: each tap adds a strided slice of the padded input
+    output_count = -(-mono.shape[0] // factor)
+    padded = np.zeros(mono.shape[0] + taps + factor, dtype=np.float32)
+    padded[taps // 2:taps // 2 + mono.shape[0]] = mono
+    resampled = np.zeros(output_count, dtype=np.float32)
+    for k in range(taps):
+        resampled += kernel[k] * padded[k:k + output_count * factor:factor]
+    return resampled
+
+def speech_mask(narration, sample_rate=MIX_SAMPLE_RATE):
+    """Computes a smoothed 0..1 per-sample mask of where the narration is speaking.
+
+    Args:
+        narration (np.ndarray): Narration PCM of shape (samples, channels).
+        sample_rate (int): Sample rate of the narration.
+
+    Returns:
+        np.ndarray: float32 array of shape (samples,).
+    """
+    samples = narration.shape[0]
+    window = max(1, int(DUCKING_WINDOW_SECONDS * sample_rate))
+    window_count = -(-samples // window)
+    mono = narration.mean(axis=1)
+    padded = np.zeros(window_count * window, dtype=np.float32)
+    padded[:samples] = mono
+    rms = np.sqrt(np.mean(padded.reshape(window_count, window) ** 2, axis=1))
+    active = (rms > DUCKING_SPEECH_THRESHOLD).astype(np.float32)
+    # Hold each speaking window for the release time so the gain doesn't flutter
+    release_windows = max(1, int(DUCKING_RELEASE_SECONDS / DUCKING_WINDOW_SECONDS))
+    kernel = np.ones(release_windows, dtype=np.float32)
+    held = np.minimum(np.convolve(active, kernel)[:window_count], 1.0)
+    return np.repeat(held, window)[:samples]
+
+def mix_audio(narration, music=None, music_volume=0.15, duck_amount=0.0,
+              sample_rate=MIX_SAMPLE_RATE):
+    """Mixes narration with background music, looping/trimming the music to the narration length.
+
+    Args:
+        narration (np.ndarray): Narration PCM of shape (samples, channels).
+        music (np.ndarray or None): Music PCM of shape (samples, MIX_CHANNELS), or None.
+        music_volume (float): Gain applied to the music (0.0 to 1.0).
+        duck_amount (float): Extra fraction of the music gain removed while narration is
+            speaking (0.0 disables ducking, 1.0 silences music under speech).
+        sample_rate (int): Sample rate of both inputs.
+
+    Returns:
+        np.ndarray: float32 stereo mix of shape (narration samples, MIX_CHANNELS).
+    """
+    samples = narration.shape[0]
+    mixed = np.empty((samples, MIX_CHANNELS), dtype=np.float32)
+    mixed[:] = narration if narration.shape[1] == MIX_CHANNELS else narration[:, :1]
+
+    if music is not None and music.shape[0] > 0 and music_volume > 0:
+        # Tile and trim in one step
+        if music.shape[0] < samples:
+            music = np.tile(music, (-(-samples // music.shape[0]), 1))
+        music = music[:samples]
+        if duck_amount > 0:
+            gain = music_volume * (1.0 - duck_amount * speech_mask(narration, sample_rate))
+            mixed += music * gain[:, np.newaxis]
+        else:
+            mixed += music * np.float32(music_volume)
+
+    np.clip(mixed, -1.0, 1.0, out=mixed)
+    return mixed
+
+def write_audio_track(pcm, output_path, sample_rate=MIX_SAMPLE_RATE):
+    """Encodes float32 PCM to an AAC (.m4a) track that can be muxed into the MP4 without re-encoding.
+
+    Args:
+        pcm (np.ndarray): float32 PCM of shape (samples, channels).
+        output_path (str): Path of the .m4a file to write.
+        sample_rate (int): Sample rate of the PCM.
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    pcm = np.ascontiguousarray(pcm, dtype=np.float32)
+    cmd = [get_setting("FFMPEG_BINARY"), "-nostdin", "-v", "error", "-y",
+           "-f", "f32le", "-ar", str(sample_rate), "-ac", str(pcm.shape[1]), "-i", "-",
+           "-c:a", "aac", "-b:a", MIX_AUDIO_BITRATE, output_path]
+    result = subprocess.run(cmd, input=memoryview(pcm).cast("B"), stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode {output_path}: {result.stderr.decode(errors='ignore').strip()}")
+
+def create_mixed_track(narration_path, music_path, output_path, music_volume=0.15, duck_amount=0.0,
+                       narration_pcm=None):
+    """Decodes narration and music once, mixes them as arrays and writes the final track.
+
+    Args:
+        narration_path (str): Path to the narration audio file.
+        music_path (str or None): Path to the background music file, or None.
+        output_path (str): Path of the mixed .m4a track to write.
+        music_volume (float): Volume multiplier for background music (0.0 to 1.0).
+        duck_amount (float): How much to duck the music under speech (0.0 to 1.0).
+        narration_pcm (np.ndarray or None): Narration already decoded with decode_audio() at
+            MIX_SAMPLE_RATE. When given, `narration_path` is not decoded again.
+
+    Returns:
+        tuple: (success, output_path, narration_duration_seconds)
+    """
+    try:
+        narration = narration_pcm if narration_pcm is not None else decode_audio(narration_path, channels=1)
+        narration_duration = narration.shape[0] / MIX_SAMPLE_RATE
+        print(f"Narration audio loaded. Duration: {narration_duration:.2f} seconds")
+
+        music = None
+        if music_path and os.path.exists(music_path):
+            print(f"Loading background music from: {music_path}")
+            music = decode_audio(music_path, channels=MIX_CHANNELS)
+            print(f"  Original music duration: {music.shape[0] / MIX_SAMPLE_RATE:.2f}s")
+            print(f"  Music volume adjusted to {music_volume*100}%"
+                  + (f", ducked by {duck_amount*100:.0f}% under speech" if duck_amount > 0 else ""))
+        elif music_path:
+            print(f"Warning: Background music file not found at '{music_path}'. Skipping music.")
+        else:
+            print("No background music path provided. Skipping music.")
+
+        mixed = mix_audio(narration, music, music_volume, duck_amount)
+        write_audio_track(mixed, output_path)
+        print(f"Mixed audio track written to {output_path}")
+        return True, output_path, narration_duration
+    except Exception as e:
+        print(f"Error creating mixed audio track: {e}")
+        return False, None, 0.0
+
+if __name__ == '__main__':
+    # Example usage: mix the example narration with the example music
+    narration_file = "src/output/test_narration_music.mp3"
+    music_file = "src/assets/background_music.mp3"
+    mixed_file = "src/output/test_mixed_audio.m4a"
+    if not os.path.exists(narration_file):
+        print(f"Test narration not found: {narration_file}. Run the video_creator example first.")
+    else:
+        success, path, duration = create_mixed_track(narration_file, music_file, mixed_file,
+                                                     music_volume=0.15, duck_amount=0.5)
+        print(f"Mixed track created: {path} ({duration:.2f}s)" if success else "Failed to create mixed track.")
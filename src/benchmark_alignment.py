@@ -0,0 +1,115 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import sys
+import time
+
+import whisper
+
+from alignment import (load_whisper_model, _extract_words, ALIGNMENT_SAMPLE_RATE,
+                       ALIGNMENT_BENCHMARK_PATH, QUANTIZED_MODEL_CACHE_DIR)
+
+# Configurations benchmarked by default; the fp32 models double as references
+DEFAULT_CONFIGS = ["tiny.en", "tiny.en-int8", "base.en", "base.en-int8"]
+REFERENCE_MODELS = ["tiny.en", "base.en"]
+FIXTURE_DIR = "src/assets/fixtures" # Default location of fixture narrations (*.mp3 / *.wav)
+
+def _normalize(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+def word_boundary_error(words, reference_words):
+    """Mean absolute start/end difference (seconds) over words matched by text with the reference.
+
+    Returns:
+        tuple: (mean_error_seconds or None, matched_word_count)
+    """
+    a = [_normalize(w['word']) for w in words]
+    b = [_normalize(w['word']) for w in reference_words]
+    total_error = 0.0
+    matched = 0
+    for block in difflib.SequenceMatcher(None, a, b, autojunk=False).get_matching_blocks():
+        for k in range(block.size):
+            word, ref = words[block.a + k], reference_words[block.b + k]
+            total_error += (abs(word['start'] - ref['start']) + abs(word['end'] - ref['end'])) / 2
+            matched += 1
+    return (total_error / matched if matched else None), matched
+
+def run_benchmark(audio_paths, configs=DEFAULT_CONFIGS, save=True):
+    """Times each model configuration on each fixture and compares word boundaries to the references.
+
+    Args:
+        audio_paths (list): Fixture audio files.
+        configs (list): Model names to benchmark (e.g. "tiny.en", "base.en-int8").
+        save (bool): Store measured realtime factors where choose_whisper_model() reads them.
+
+    Returns:
+        dict: {config: {"realtime_factor", "seconds", "errors": {reference: seconds}}}
+    """
+    fixtures = [(path, whisper.load_audio(path)) for path in audio_paths]
+    total_audio_seconds = sum(len(audio) for _, audio in fixtures) / ALIGNMENT_SAMPLE_RATE
+    print(f"Benchmarking {len(configs)} configurations on {len(fixtures)} fixtures ({total_audio_seconds:.1f}s of audio)")
+
+    transcripts = {} # config -> list of word lists, one per fixture
+    timings = {}
+    for config in configs:
+        model = load_whisper_model(config) # Loading (and quantizing) is not part of the timing
+        model.transcribe(fixtures[0][1][:ALIGNMENT_SAMPLE_RATE], fp16=False) # Warm-up
+        began = time.perf_counter()
+        transcripts[config] = [_extract_words(model.transcribe(audio, word_timestamps=True, fp16=False))
+                               for _, audio in fixtures]
+        timings[config] = time.perf_counter() - began
+        print(f"  {config:<16} {timings[config]:7.2f}s  ({timings[config] / total_audio_seconds:.3f}x realtime)")
+
+    results = {}
+    for config in configs:
+        errors = {}
+        for reference in REFERENCE_MODELS:
+            if reference not in transcripts:
+                continue
+            weighted, matched = 0.0, 0
+            for words, reference_words in zip(transcripts[config], transcripts[reference]):
+                error, count = word_boundary_error(words, reference_words)
+                if error is not None:
+                    weighted += error * count
+                    matched += count
+            errors[reference] = weighted / matched if matched else None
+        results[config] = {"realtime_factor": timings[config] / total_audio_seconds,
+                           "seconds": timings[config], "errors": errors}
+
+    print("\n--- Alignment Benchmark ---")
+    header = f"{'config':<16} {'time (s)':>9} {'x realtime':>11}" + "".join(f" {'err vs ' + r + ' (ms)':>22}" for r in REFERENCE_MODELS)
+    print(header)
+    for config, result in results.items():
+        row = f"{config:<16} {result['seconds']:9.2f} {result['realtime_factor']:11.3f}"
+        for reference in REFERENCE_MODELS:
+            error = result["errors"].get(reference)
+            row += f" {'-' if error is None else f'{error * 1000:.1f}':>22}"
+        print(row)
+
+    if save:
+        os.makedirs(QUANTIZED_MODEL_CACHE_DIR, exist_ok=True)
+        with open(ALIGNMENT_BENCHMARK_PATH, "w", encoding="utf-8") as f:
+            json.dump({"realtime_factors": {c: r["realtime_factor"] for c, r in results.items()},
+                       "results": results}, f, indent=2)
+        print(f"\nRealtime factors saved to {ALIGNMENT_BENCHMARK_PATH} (used by model_name='auto').")
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark Whisper alignment configurations on fixture audio.")
+    parser.add_argument("audio", nargs="*", help=f"Fixture audio files (default: everything in {FIXTURE_DIR})")
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS,
+                        help="Model configurations, e.g. tiny.en base.en-int8")
+    parser.add_argument("--no-save", action="store_true", help="Don't store the measured realtime factors")
+    args = parser.parse_args()
+
+    audio_paths = args.audio
+    if not audio_paths and os.path.isdir(FIXTURE_DIR):
+        audio_paths = sorted(os.path.join(FIXTURE_DIR, name) for name in os.listdir(FIXTURE_DIR)
+                             if name.lower().endswith((".mp3", ".wav")))
+    if not audio_paths:
+        print(f"No fixture audio given and none found in {FIXTURE_DIR}.")
+        print("Generate one with tts_generator.py (e.g. a few minutes of narration) and pass its path.")
+        sys.exit(1)
+    run_benchmark(audio_paths, args.configs, save=not args.no_save)
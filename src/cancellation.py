@@ -0,0 +1,125 @@
+import threading
+from contextlib import contextmanager
+
+CANCEL_POLL_SECONDS = 0.5 # How often a job waiting on other processes checks whether it was cancelled
+
+class JobCancelled(Exception):
+    """Raised inside a job's work once the job has been cancelled (see cancel_job)."""
+
+class CancelToken:
+    """Cancellation state of one running job.
+
+    The job's code checks the token between stages and in its frame loops. cancel() can be
+    called from any thread: besides setting the flag, it kills the subprocesses the job
+    registered (ffmpeg decoders and encoders), so a blocked pipe read or write returns at
+    once, and runs the job's callbacks (e.g. signalling part renders in other processes).
+    """
+
+    def __init__(self, job_id, event=None):
+        self.job_id = job_id
+        self._event = event or threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        """Cancels the job: sets the flag, kills its subprocesses and runs its callbacks."""
+        with self._lock:
+            self._event.set()
+            processes = list(self._processes)
+            callbacks = list(self._callbacks)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        for callback in callbacks:
+            callback()
+
+    def check(self):
+        """Raises JobCancelled if the job has been cancelled."""
+        if self._event.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled.")
+
+    def register_process(self, process):
+        """Kills `process` (a subprocess.Popen) if the job is cancelled while it runs."""
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self._event.is_set()
+        if cancelled:
+            process.kill()
+
+    def unregister_process(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+    def add_callback(self, callback):
+        """Calls `callback()` when the job is cancelled (right away if it already is)."""
+        with self._lock:
+            self._callbacks.append(callback)
+            cancelled = self._event.is_set()
+        if cancelled:
+            callback()
+
+_tokens = {} # job id -> [token, open scopes]
+_tokens_lock = threading.Lock()
+_local = threading.local() # .token: the job this thread is working on
+_inherited_token = None # In part-render processes: the parent job's token (see inherit_cancel_event)
+
+@contextmanager
+def cancel_scope(job_id):
+    """Runs the enclosed work as job `job_id`, so cancel_job(job_id) from any thread can stop it.
+
+    A scope opened inside another one on the same thread (a sub-job, e.g. one part of a long
+    story) shares the outer job's token, so cancelling either id stops both.
+
+    Yields:
+        CancelToken: The job's token.
+    """
+    outer = getattr(_local, "token", None)
+    with _tokens_lock:
+        entry = _tokens.get(job_id)
+        if entry is None:
+            entry = _tokens[job_id] = [outer or _inherited_token or CancelToken(job_id), 0]
+        entry[1] += 1
+    _local.token = entry[0]
+    try:
+        yield entry[0]
+    finally:
+        _local.token = outer
+        with _tokens_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _tokens[job_id]
+
+def current_cancel_token():
+    """Returns the token of the job running on this thread, or None outside any cancel_scope."""
+    return getattr(_local, "token", None) or _inherited_token
+
+def check_cancelled():
+    """Raises JobCancelled if the job running on this thread has been cancelled."""
+    token = current_cancel_token()
+    if token is not None:
+        token.check()
+
+def cancel_job(job_id):
+    """Cancels a job running in this process.
+
+    Returns:
+        bool: False if no job with that id is running here.
+    """
+    with _tokens_lock:
+        entry = _tokens.get(job_id)
+    if entry is None:
+        return False
+    print(f"Cancelling job {job_id}...")
+    entry[0].cancel()
+    return True
+
+def inherit_cancel_event(job_id, event):
+    """Process pool initializer: work in this process is cancelled when `event` (a
+    multiprocessing Event the parent sets on cancellation) is set."""
+    global _inherited_token
+    _inherited_token = CancelToken(job_id, event)
@@ -0,0 +1,170 @@
+import numpy as np
+from collections import namedtuple
+
+# --- Caption Grouping Rules ---
+MAX_WORDS_PER_CAPTION = 2 # Max words shown in a single caption
+MIN_GAP_BETWEEN_CAPTIONS = 0.1 # A pause at least this long (seconds) always starts a new caption
+MIN_CAPTION_DURATION = 0.05 # Captions this short or shorter...
+FALLBACK_CAPTION_DURATION = 0.1 # ...are stretched to this duration
+
+# Compact caption plan: one entry per caption, all parallel NumPy arrays.
+#   word_begin / word_end: [begin, end) range into the word index array the plan was built from
+#   start / duration: caption timing in seconds
+CaptionPlan = namedtuple('CaptionPlan', ['word_begin', 'word_end', 'start', 'duration'])
+
+def timestamps_to_arrays(word_timestamps):
+    """Converts Whisper's list of {'word', 'start', 'end'} dicts into parallel arrays.
+
+    Args:
+        word_timestamps (list): List of {'word', 'start', 'end'} dicts.
+
+    Returns:
+        tuple: (starts, ends, word_indices) as float64, float64 and int32 NumPy arrays.
+    """
+    count = len(word_timestamps)
+    starts = np.fromiter((w['start'] for w in word_timestamps), dtype=np.float64, count=count)
+    ends = np.fromiter((w['end'] for w in word_timestamps), dtype=np.float64, count=count)
+    word_indices = np.arange(count, dtype=np.int32)
+    return starts, ends, word_indices
+
+def plan_captions(starts, ends, word_indices=None,
+                  max_words=MAX_WORDS_PER_CAPTION, min_gap=MIN_GAP_BETWEEN_CAPTIONS):
+    """Groups timed words into captions using vectorized gap and count rules.
+
+    A new caption starts at the first word, after any pause of at least
+    `min_gap` seconds, and after every `max_words` words since the last
+    pause-triggered break.
+
+    Args:
+        starts (np.ndarray): Word start times in seconds.
+        ends (np.ndarray): Word end times in seconds.
+        word_indices (np.ndarray or None): Index of each word in the caller's word list.
+            Defaults to 0..n-1.
+        max_words (int): Maximum number of words per caption.
+        min_gap (float): Minimum pause (seconds) that forces a new caption.
+
+    Returns:
+        CaptionPlan: The caption plan (empty arrays if there are no words).
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    count = starts.shape[0]
+    if word_indices is None:
+        word_indices = np.arange(count, dtype=np.int32)
+    else:
+        word_indices = np.asarray(word_indices, dtype=np.int32)
+
+    if count == 0:
+        empty_int = np.empty(0, dtype=np.int32)
+        empty_float = np.empty(0, dtype=np.float64)
+        return CaptionPlan(empty_int, empty_int.copy(), empty_float, empty_float.copy())
+
+    # Gap rule: a pause before word i (relative to the previous word's end) starts a run
+    run_start = np.empty(count, dtype=bool)
+    run_start[0] = True
+    run_start[1:] = (starts[1:] - ends[:-1]) >= min_gap
+
+    # Count rule: inside each run, break every max_words words
+    positions = np.arange(count)
+    run_first = np.maximum.accumulate(np.where(run_start, positions, 0))
+    breaks = ((positions - run_first) % max_words) == 0
+
+    begin = np.flatnonzero(breaks)
+    end_exclusive = np.empty_like(begin)
+    end_exclusive[:-1] = begin[1:]
+    end_exclusive[-1] = count
+
+    caption_start = starts[begin]
+    duration = ends[end_exclusive - 1] - caption_start
+    duration[duration <= MIN_CAPTION_DURATION] = FALLBACK_CAPTION_DURATION
+
+    return CaptionPlan(word_indices[begin], word_indices[end_exclusive - 1] + 1,
+                       caption_start, duration)
+
+def caption_texts(plan, words):
+    """Builds the display text for each caption in a plan.
+
+    Args:
+        plan (CaptionPlan): Plan returned by `plan_captions`.
+        words (list): Word strings, indexed by the plan's word ranges.
+
+    Returns:
+        list: One space-joined string per caption.
+    """
+    return [" ".join(words[b:e]) for b, e in zip(plan.word_begin.tolist(), plan.word_end.tolist())]
+
+def plan_story_captions(word_timestamps, skip_words=0):
+    """Plans captions for the words after the first `skip_words` (the spoken title).
+
+    Args:
+        word_timestamps (list): List of {'word', 'start', 'end'} dicts.
+        skip_words (int): Number of leading words that get no caption.
+
+    Returns:
+        CaptionPlan: Plan whose word ranges index into the full `word_timestamps` list.
+    """
+    starts, ends, word_indices = timestamps_to_arrays(word_timestamps)
+    return plan_captions(starts[skip_words:], ends[skip_words:], word_indices[skip_words:])
+
+def plan_to_dict(plan):
+    """Converts a caption plan to plain lists so it can be stored as JSON."""
+    return {field: getattr(plan, field).tolist() for field in CaptionPlan._fields}
+
+def plan_from_dict(data):
+    """Rebuilds a caption plan stored with `plan_to_dict`."""
+    return CaptionPlan(np.asarray(data['word_begin'], dtype=np.int32),
+                       np.asarray(data['word_end'], dtype=np.int32),
+                       np.asarray(data['start'], dtype=np.float64),
+                       np.asarray(data['duration'], dtype=np.float64))
+
+def _plan_captions_reference(word_timestamps, max_words=MAX_WORDS_PER_CAPTION,
+                             min_gap=MIN_GAP_BETWEEN_CAPTIONS):
+    """Word-by-word chunking loop as originally written in create_video. Used to check plan_captions."""
+    captions = []
+    current_chunk_words = []
+    chunk_start_time = -1
+    last_word_end_time = 0
+    for word_info in word_timestamps:
+        is_new_chunk = (not current_chunk_words
+                        or len(current_chunk_words) >= max_words
+                        or (word_info['start'] - last_word_end_time) >= min_gap)
+        if is_new_chunk and current_chunk_words:
+            duration = last_word_end_time - chunk_start_time
+            if duration <= MIN_CAPTION_DURATION: duration = FALLBACK_CAPTION_DURATION
+            captions.append((" ".join(current_chunk_words), chunk_start_time, duration))
+            current_chunk_words = [word_info['word']]
+            chunk_start_time = word_info['start']
+        else:
+            current_chunk_words.append(word_info['word'])
+            if len(current_chunk_words) == 1: chunk_start_time = word_info['start']
+        last_word_end_time = word_info['end']
+    if current_chunk_words:
+        duration = last_word_end_time - chunk_start_time
+        if duration <= MIN_CAPTION_DURATION: duration = FALLBACK_CAPTION_DURATION
+        captions.append((" ".join(current_chunk_words), chunk_start_time, duration))
+    return captions
+
+if __name__ == '__main__':
+    # Example usage: check the vectorized planner against the original loop on random timings
+    import random
+    import time
+
+    random.seed(1234)
+    for word_count in (0, 1, 7, 500, 10000):
+        timestamps = []
+        t = 0.0
+        for i in range(word_count):
+            t += random.choice([0.0, 0.02, 0.1, 0.3])
+            length = random.uniform(0.01, 0.4)
+            timestamps.append({'word': f"w{i}", 'start': t, 'end': t + length})
+            t += length
+        for max_words in (1, 2, 3):
+            expected = _plan_captions_reference(timestamps, max_words=max_words)
+            began = time.perf_counter()
+            starts, ends, indices = timestamps_to_arrays(timestamps)
+            plan = plan_captions(starts, ends, indices, max_words=max_words)
+            elapsed_ms = (time.perf_counter() - began) * 1000
+            actual = list(zip(caption_texts(plan, [w['word'] for w in timestamps]),
+                              plan.start.tolist(), plan.duration.tolist()))
+            status = "OK" if actual == expected else "MISMATCH"
+            print(f"  {word_count:>5} words, max {max_words}: {len(plan.start):>5} captions in {elapsed_ms:.2f} ms [{status}]")
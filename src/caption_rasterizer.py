@@ -0,0 +1,135 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from font_registry import get_font, prewarm_fonts, CAPTION_FONT_PATH, CAPTION_FONT_SIZE
+
+# --- Caption Rasterization Settings ---
+MAX_RASTER_WORKERS = max(1, (os.cpu_count() or 1) // 2) # Pillow holds the GIL while drawing, so use processes
+RASTER_CHUNK_SIZE = 8 # Captions rendered per task; small enough that the first ones arrive quickly
+PARALLEL_MIN_CAPTIONS = 24 # Fewer captions than this are rendered inline (pool hand-off costs more)
+MAX_CHUNKS_IN_FLIGHT = 4 # Per worker; bounds how many finished rasters wait in memory
+
+_pool = None
+
+def draw_caption(text, font_path=CAPTION_FONT_PATH, font_size=CAPTION_FONT_SIZE,
+                 text_color=(255, 255, 255), padding=20, outline_color=(0, 0, 0), outline_width=2):
+    """Draws a single-line caption: white text with a black outline on a transparent background.
+
+    Returns:
+        PIL.Image.Image: RGBA image sized to the text plus padding.
+    """
+    font = get_font(font_path, font_size)
+
+    # Determine text bounding box
+    text_bbox = font.getbbox(text)
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    # Add padding for outline and spacing
+    effective_padding_x = padding + outline_width
+    effective_padding_y = padding + outline_width + int(font_size * 0.1) # Extra bottom padding
+    img_width = text_width + 2 * effective_padding_x
+    img_height = text_height + 2 * effective_padding_y
+
+    img = Image.new('RGBA', (img_width, img_height), color=(0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    # --- Draw Outline ---
+    draw_x = effective_padding_x
+    draw_y = effective_padding_y - text_bbox[1] # Adjust y by the bbox top offset
+    for x_offset in range(-outline_width, outline_width + 1):
+        for y_offset in range(-outline_width, outline_width + 1):
+            if x_offset == 0 and y_offset == 0:
+                continue
+            draw.text((draw_x + x_offset, draw_y + y_offset), text, font=font, fill=outline_color)
+
+    # --- Draw Main Text ---
+    draw.text((draw_x, draw_y), text, font=font, fill=text_color)
+    return img
+
+def rasterize_caption(text, scale=1.0):
+    """Draws a caption and scales it to the output size. Returns an RGBA uint8 array, or None on error."""
+    try:
+        img = draw_caption(text)
+        if scale != 1:
+            img = img.resize((int(img.width * scale), int(img.height * scale)), Image.LANCZOS)
+        return np.asarray(img)
+    except Exception as e:
+        print(f"Error rasterizing caption '{text[:20]}...': {e}")
+        return None
+
+def _rasterize_chunk(texts, scale):
+    """Worker task: rasterizes a run of consecutive captions."""
+    return [rasterize_caption(text, scale) for text in texts]
+
+def _get_raster_pool():
+    """Returns the shared caption process pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that already initialised torch/OpenMP can deadlock
+        _pool = ProcessPoolExecutor(max_workers=MAX_RASTER_WORKERS,
+                                    mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=prewarm_fonts)
+        print(f"Started caption rasterization pool: {MAX_RASTER_WORKERS} workers.")
+    return _pool
+
+def rasterize_captions(texts, scale=1.0):
+    """Starts rasterizing every caption of a plan and returns an iterator over the results in plan order.
+
+    Long plans are cut into chunks of RASTER_CHUNK_SIZE and submitted to a process pool right
+    away; the iterator yields each raster as soon as the chunk holding it is done, so a consumer
+    can start compositing the first captions while later ones are still being drawn. Only a
+    bounded number of chunks are in flight at once. Short plans are drawn lazily, inline.
+
+    Args:
+        texts (list): Caption texts in display order.
+        scale (float): Layout-to-output scale applied to each raster.
+
+    Returns:
+        iterator: (h, w, 4) uint8 array per caption, or None where drawing failed. Closing it
+            early cancels chunks that haven't started.
+    """
+    if MAX_RASTER_WORKERS <= 1 or len(texts) < PARALLEL_MIN_CAPTIONS:
+        return (rasterize_caption(text, scale) for text in texts)
+
+    pool = _get_raster_pool()
+    chunks = [texts[i:i + RASTER_CHUNK_SIZE] for i in range(0, len(texts), RASTER_CHUNK_SIZE)]
+    max_in_flight = MAX_RASTER_WORKERS * MAX_CHUNKS_IN_FLIGHT
+    futures = [pool.submit(_rasterize_chunk, chunk, scale) for chunk in chunks[:max_in_flight]]
+    return _collect_in_order(pool, chunks, futures, scale)
+
+def _collect_in_order(pool, chunks, futures, scale):
+    """Yields rasters chunk by chunk, topping up the pool as chunks are consumed."""
+    submitted = len(futures)
+    try:
+        for index in range(len(chunks)):
+            rasters = futures[index].result()
+            futures[index] = None # Drop the reference so consumed rasters can be freed
+            if submitted < len(chunks):
+                futures.append(pool.submit(_rasterize_chunk, chunks[submitted], scale))
+                submitted += 1
+            yield from rasters
+    finally:
+        # Consumer stopped early (error or cancellation): don't render the rest
+        for future in futures:
+            if future is not None:
+                future.cancel()
+
+if __name__ == '__main__':
+    import time
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    example_texts = [f"caption number {i} here" for i in range(200)]
+    started = time.perf_counter()
+    serial = [rasterize_caption(text, 0.5) for text in example_texts]
+    print(f"Serial: {len(serial)} captions in {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    first_at = None
+    for i, raster in enumerate(rasterize_captions(example_texts, 0.5)):
+        if first_at is None:
+            first_at = time.perf_counter() - started
+        assert np.array_equal(raster, serial[i])
+    print(f"Pooled: first caption after {first_at:.2f}s, all after {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from moviepy.config import get_setting
+
+# --- Encoder Tuning Settings ---
+ENCODER_PROFILE_PATH = os.getenv("REELIT_ENCODER_PROFILE",
+                                 os.path.join(os.path.expanduser("~"), ".cache", "reelit", "encoder_profile.json"))
+# Target encode time as a multiple of the video's duration (e.g. 0.5 = a 60s video encodes in 30s)
+ENCODE_BUDGET_FACTOR = float(os.getenv("REELIT_ENCODE_BUDGET_FACTOR", 1.0))
+# x264 presets, fastest first
+X264_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow"]
+CALIBRATION_SECONDS = 4 # Length of the representative clip
+CALIBRATION_FPS = 30 # Rate the clip is encoded at; costs are stored per frame, so any output rate can use them
+DEFAULT_CALIBRATION_VIDEO = "src/assets/background_minecraft.webm"
+
+_profile = None
+_profile_mtime = None
+
+def _thread_counts(cpu_count):
+    """1, 2, 4, ... up to the core count (always including the core count itself)."""
+    counts = []
+    threads = 1
+    while threads < cpu_count:
+        counts.append(threads)
+        threads *= 2
+    counts.append(cpu_count)
+    return counts
+
+def _time_command(cmd):
+    """Runs an ffmpeg command and returns its wall time in seconds."""
+    began = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    elapsed = time.perf_counter() - began
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode(errors='ignore').strip()}")
+    return elapsed
+
+def calibrate(video_path, render_profiles, presets=X264_PRESETS, thread_counts=None,
+              seconds=CALIBRATION_SECONDS, save=True):
+    """Measures x264 encode speed on this host for each profile's resolution, preset and thread count.
+
+    A `seconds`-long clip of `video_path` is decoded, scaled to the profile's size and encoded
+    to a null muxer at CALIBRATION_FPS. Decoding and scaling alone are timed once per resolution
+    and subtracted, leaving the encoder's share, which is stored per frame.
+
+    Args:
+        video_path (str): Representative footage (e.g. one of the background videos).
+        render_profiles (dict): {name: {"width", "height", "crf", ...}} (see video_creator.RENDER_PROFILES).
+        presets (list): x264 presets to measure.
+        thread_counts (list or None): Encoder thread counts; defaults to 1, 2, 4, ... cores.
+        seconds (float): Clip length.
+        save (bool): Store the results where choose_encoder_settings() reads them.
+
+    Returns:
+        dict: The encoder profile: {"cpu_count", "frame_seconds": {"<w>x<h>": {preset: {threads: cost}}}},
+            where cost is encode seconds per frame.
+    """
+    cpu_count = os.cpu_count() or 1
+    thread_counts = thread_counts or _thread_counts(cpu_count)
+    ffmpeg = get_setting("FFMPEG_BINARY")
+    measured = {}
+    frames = seconds * CALIBRATION_FPS
+    for name, profile in render_profiles.items():
+        size = f"{profile['width']}x{profile['height']}"
+        if size in measured:
+            continue
+        source = [ffmpeg, "-nostdin", "-v", "error", "-stream_loop", "-1", "-i", video_path, "-an", "-t", str(seconds),
+                  "-vf", (f"scale={profile['width']}:{profile['height']}:force_original_aspect_ratio=increase,"
+                          f"crop={profile['width']}:{profile['height']},fps={CALIBRATION_FPS}")]
+        decode_seconds = _time_command(source + ["-c:v", "rawvideo", "-f", "null", "-"])
+        print(f"{size} ({name}): decoding and scaling {seconds}s takes {decode_seconds:.2f}s")
+        measured[size] = {}
+        for preset in presets:
+            measured[size][preset] = {}
+            for threads in thread_counts:
+                elapsed = _time_command(source + ["-c:v", "libx264", "-preset", preset, "-crf", str(profile["crf"]),
+                                                  "-threads", str(threads), "-pix_fmt", "yuv420p", "-f", "null", "-"])
+                frame_seconds = max(elapsed - decode_seconds, 0.01) / frames
+                measured[size][preset][str(threads)] = frame_seconds
+                print(f"  {preset:<10} {threads:>3} threads  {frame_seconds * 1000:7.2f} ms per frame")
+
+    encoder_profile = {"cpu_count": cpu_count, "frame_seconds": measured}
+    if save:
+        os.makedirs(os.path.dirname(ENCODER_PROFILE_PATH), exist_ok=True)
+        with open(ENCODER_PROFILE_PATH, "w", encoding="utf-8") as f:
+            json.dump(encoder_profile, f, indent=2)
+        print(f"\nEncoder profile saved to {ENCODER_PROFILE_PATH} (used by create_video).")
+    return encoder_profile
+
+def load_encoder_profile():
+    """Returns the saved encoder profile, re-reading it when the file changes, or None if there isn't one."""
+    global _profile, _profile_mtime
+    if not os.path.exists(ENCODER_PROFILE_PATH):
+        return None
+    mtime = os.path.getmtime(ENCODER_PROFILE_PATH)
+    if mtime != _profile_mtime:
+        try:
+            with open(ENCODER_PROFILE_PATH, "r", encoding="utf-8") as f:
+                _profile = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read encoder profile {ENCODER_PROFILE_PATH}: {e}")
+            _profile = None
+        _profile_mtime = mtime
+    return _profile
+
+def _frame_costs(encoder_profile, size):
+    """Encode seconds per frame for one resolution: {preset: {threads: cost}}, or None if not measured.
+
+    Profiles saved before costs were stored per frame hold seconds per video second at CALIBRATION_FPS.
+    """
+    if not encoder_profile:
+        return None
+    if "frame_seconds" in encoder_profile:
+        return encoder_profile["frame_seconds"].get(size)
+    legacy = encoder_profile.get("measured", {}).get(size)
+    if not legacy:
+        return None
+    return {preset: {threads: factor / CALIBRATION_FPS for threads, factor in timings.items()}
+            for preset, timings in legacy.items()}
+
+def choose_encoder_settings(profile, duration_seconds, budget_seconds=None, concurrency=1, fps=None):
+    """Picks the x264 preset and thread count for one encode.
+
+    Threads are the host's cores divided among `concurrency` simultaneous renders. With a
+    calibration profile, the slowest (best compressing) preset no slower than the render
+    profile's own whose measured speed meets the budget is used, falling back to the fastest
+    measured one. Without calibration, the render profile's preset is kept.
+
+    Args:
+        profile (dict): Render profile ("width", "height", "preset", "crf").
+        duration_seconds (float): Length of the video.
+        budget_seconds (float or None): Target encode time; defaults to duration * ENCODE_BUDGET_FACTOR.
+        concurrency (int): Renders sharing this host right now (including this one).
+        fps (float or None): Output frame rate (CALIBRATION_FPS if None); the encode time is
+            the measured per-frame cost times the frame count.
+
+    Returns:
+        dict: {"preset", "crf", "threads", "estimated_seconds" (None if uncalibrated)}
+    """
+    threads = max(1, (os.cpu_count() or 1) // max(1, concurrency))
+    settings = {"preset": profile["preset"], "crf": profile["crf"], "threads": threads, "estimated_seconds": None}
+    if budget_seconds is None:
+        budget_seconds = duration_seconds * ENCODE_BUDGET_FACTOR
+
+    measured = _frame_costs(load_encoder_profile(), f"{profile['width']}x{profile['height']}")
+    if not measured:
+        return settings
+    frame_count = duration_seconds * (fps or CALIBRATION_FPS)
+
+    # The render profile's preset is the quality ceiling; only go faster to make the budget
+    ceiling = X264_PRESETS.index(profile["preset"]) if profile["preset"] in X264_PRESETS else len(X264_PRESETS) - 1
+    candidates = [] # (preset, threads, seconds per frame), fastest preset first
+    for preset in X264_PRESETS[:ceiling + 1]:
+        # Best measured thread count that fits this job's share of the cores
+        timings = [(int(count), factor) for count, factor in measured.get(preset, {}).items() if int(count) <= threads]
+        if timings:
+            best_threads, factor = min(timings, key=lambda timing: timing[1])
+            candidates.append((preset, best_threads, factor))
+    if not candidates:
+        return settings
+
+    chosen = candidates[0]
+    for candidate in candidates:
+        if candidate[2] * frame_count <= budget_seconds:
+            chosen = candidate
+    settings.update(preset=chosen[0], threads=chosen[1], estimated_seconds=chosen[2] * frame_count)
+    return settings
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calibrate x264 presets and thread counts on this host.")
+    parser.add_argument("video", nargs="?", default=DEFAULT_CALIBRATION_VIDEO,
+                        help=f"Representative footage (default: {DEFAULT_CALIBRATION_VIDEO})")
+    parser.add_argument("--profiles", nargs="+", help="Render profiles to calibrate (default: all)")
+    parser.add_argument("--presets", nargs="+", default=X264_PRESETS, help="x264 presets to measure")
+    parser.add_argument("--threads", nargs="+", type=int, help="Thread counts (default: 1, 2, 4, ... cores)")
+    parser.add_argument("--seconds", type=float, default=CALIBRATION_SECONDS, help="Clip length in seconds")
+    parser.add_argument("--no-save", action="store_true", help="Don't store the encoder profile")
+    args = parser.parse_args()
+
+    from video_creator import RENDER_PROFILES
+    if not os.path.exists(args.video):
+        print(f"Calibration video not found: {args.video}")
+        sys.exit(1)
+    unknown_profiles = [name for name in args.profiles or [] if name not in RENDER_PROFILES]
+    if unknown_profiles:
+        print(f"Unknown render profile(s) {', '.join(unknown_profiles)}. Valid options are: {', '.join(RENDER_PROFILES)}")
+        sys.exit(1)
+    profiles = {name: RENDER_PROFILES[name] for name in args.profiles or RENDER_PROFILES}
+    calibrate(args.video, profiles, args.presets, args.threads, args.seconds, save=not args.no_save)
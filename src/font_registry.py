@@ -0,0 +1,103 @@
+from PIL import ImageFont
+import os
+import threading
+
+# Fonts tried, in order, when a requested font file can't be loaded
+FALLBACK_FONT_PATHS = ['C:/Windows/Fonts/arial.ttf']
+
+# --- Configured fonts (shared by the caption and title renderers) ---
+CAPTION_FONT_PATH = 'src/assets/Montserrat-Black.ttf'
+CAPTION_FONT_SIZE = 90
+TITLE_FONT_PATH = 'src/assets/Inter-Bold.ttf'
+TITLE_MAX_FONT_SIZE = 48
+TITLE_MIN_FONT_SIZE = 36
+TITLE_FONT_SIZE_STEP = 2
+
+# Registry state. Keyed by pid so a forked worker never reuses FreeType handles
+# inherited from its parent. Loaded fonts are also per thread: a FreeType face isn't
+# thread-safe, and jobs (and the title card) draw text on several threads at once.
+_lock = threading.Lock()
+_owner_pid = None
+_resolved_paths = {}  # requested_path -> resolved_path, or None for Pillow default (process-wide)
+_local = threading.local() # .fonts: (resolved_path, size) -> FreeTypeFont / default font; .pid
+
+def _ensure_process_local():
+    """Resets the registry if we are running in a different process than the one that filled it."""
+    global _owner_pid
+    if _owner_pid != os.getpid():
+        _resolved_paths.clear()
+        _owner_pid = os.getpid()
+
+def _thread_fonts():
+    """Returns the calling thread's loaded fonts."""
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.fonts = {}
+        _local.pid = os.getpid()
+    return _local.fonts
+
+def _resolve_font_path(font_path, font_size, fonts):
+    """Walks the fallback chain once for a requested font path.
+
+    Returns the first path that Pillow can open, or None if only the
+    default Pillow font is available. Must be called with the lock held.
+    """
+    if font_path in _resolved_paths:
+        return _resolved_paths[font_path]
+
+    resolved = None
+    for candidate in [font_path] + [p for p in FALLBACK_FONT_PATHS if p != font_path]:
+        try:
+            # Keep the font we opened while probing so it isn't parsed twice
+            fonts[(candidate, font_size)] = ImageFont.truetype(candidate, font_size)
+            resolved = candidate
+            break
+        except IOError:
+            if candidate == font_path:
+                print(f"Warning: Font '{font_path}' not found in assets. Trying fallback fonts...")
+            else:
+                print(f"Warning: Fallback font '{candidate}' not found.")
+    if resolved is None:
+        print(f"Warning: No usable font for '{font_path}'. Using default Pillow font.")
+    _resolved_paths[font_path] = resolved
+    return resolved
+
+def get_font(font_path, font_size):
+    """Returns a loaded font for (font_path, font_size), parsing the TTF only once per thread.
+
+    The font must only be used on the calling thread.
+
+    Args:
+        font_path (str): Path to the requested TTF file.
+        font_size (int): Font size in pixels.
+
+    Returns:
+        ImageFont.FreeTypeFont: The requested font, a fallback font, or Pillow's default font.
+    """
+    fonts = _thread_fonts()
+    with _lock:
+        _ensure_process_local()
+        resolved = _resolve_font_path(font_path, font_size, fonts)
+    key = (resolved, font_size)
+    font = fonts.get(key)
+    if font is None:
+        if resolved is None:
+            font = ImageFont.load_default()
+        else:
+            font = ImageFont.truetype(resolved, font_size)
+        fonts[key] = font
+    return font
+
+def prewarm_fonts():
+    """Loads the configured caption and title fonts on the calling thread (e.g. a rasterizer
+    process's worker thread) so its first render doesn't pay for parsing them."""
+    get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE)
+    for size in range(TITLE_MAX_FONT_SIZE, TITLE_MIN_FONT_SIZE - 1, -TITLE_FONT_SIZE_STEP):
+        get_font(TITLE_FONT_PATH, size)
+    print(f"Font registry prewarmed with {len(_thread_fonts())} fonts.")
+
+if __name__ == '__main__':
+    # Example usage: load the configured fonts twice and confirm the second lookup is cached
+    prewarm_fonts()
+    first = get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE)
+    second = get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE)
+    print(f"Cached lookup returns same font object: {first is second}")
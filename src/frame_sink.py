@@ -0,0 +1,256 @@
+import heapq
+import os
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+from moviepy.config import get_setting
+
+# --- Frame Sink Settings ---
+# Set REELIT_FRAME_STATS=1 to measure Python/NumPy heap allocations in the steady-state frame loop
+# with tracemalloc (adds overhead; off by default)
+TRACE_ALLOCATIONS = os.getenv("REELIT_FRAME_STATS", "0") == "1"
+TRACE_WARMUP_FRAMES = 5 # Frames rendered before the allocation baseline is taken
+
+def _read_exactly(stream, view):
+    """Fills a writable memoryview from an unbuffered pipe. Returns the number of bytes read."""
+    filled = 0
+    total = len(view)
+    while filled < total:
+        count = stream.readinto(view[filled:])
+        if not count:
+            break
+        filled += count
+    return filled
+
+def _write_all(fd, view):
+    """Writes a whole memoryview to a file descriptor without copying it."""
+    while len(view):
+        view = view[os.write(fd, view):]
+
+class Overlay:
+    """A timed RGBA image blended onto the frame in place.
+
+    The image is cropped to its visible pixels and stored premultiplied, so blending is a
+    handful of in-place integer ops on a view of the frame buffer, into preallocated scratch.
+    """
+
+    def __init__(self, rgba, x, y, start, end, frame_width, frame_height):
+        alpha_rows = np.flatnonzero(rgba[..., 3].any(axis=1))
+        alpha_cols = np.flatnonzero(rgba[..., 3].any(axis=0))
+        if len(alpha_rows) == 0:
+            self.shape = (0, 0)
+            self.start, self.end = start, end
+            return
+        top, bottom = alpha_rows[0], alpha_rows[-1] + 1
+        left, right = alpha_cols[0], alpha_cols[-1] + 1
+        # Clip to the frame
+        x0, y0 = max(0, x + left), max(0, y + top)
+        x1, y1 = min(frame_width, x + right), min(frame_height, y + bottom)
+        rgba = rgba[y0 - y:y1 - y, x0 - x:x1 - x]
+        alpha = rgba[..., 3:4].astype(np.uint16)
+        self.premultiplied = rgba[..., :3].astype(np.uint16) * alpha
+        self.inverse_alpha = np.broadcast_to(255 - alpha, self.premultiplied.shape).copy()
+        self.region = (slice(y0, y1), slice(x0, x1))
+        self.shape = (max(0, y1 - y0), max(0, x1 - x0))
+        self.start, self.end = start, end
+
+    @classmethod
+    def from_image(cls, image_path, scale, start, duration, frame_width, frame_height):
+        """Loads a PNG, scales it like the layout, and centers it on the frame."""
+        with Image.open(image_path) as image:
+            image = image.convert("RGBA")
+            if scale != 1:
+                image = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS)
+            rgba = np.asarray(image)
+        return cls.centered(rgba, start, duration, frame_width, frame_height)
+
+    @classmethod
+    def centered(cls, rgba, start, duration, frame_width, frame_height):
+        """Centers an already-scaled RGBA raster on the frame."""
+        x, y = int((frame_width - rgba.shape[1]) / 2), int((frame_height - rgba.shape[0]) / 2)
+        return cls(rgba, x, y, start, start + duration, frame_width, frame_height)
+
+    def blend(self, frame, scratch, scratch_shift):
+        """Alpha-blends onto `frame` in place: out = (frame * (255 - a) + rgb * a) / 255, rounded.
+
+        Returns:
+            int: Bytes of the frame rewritten (the blended region copied back from scratch).
+        """
+        h, w = self.shape
+        if h == 0 or w == 0:
+            return 0
+        region = frame[self.region]
+        s = scratch[:h, :w]
+        t = scratch_shift[:h, :w]
+        np.multiply(region, self.inverse_alpha, out=s)
+        np.add(s, self.premultiplied, out=s)
+        # Exact rounded division by 255: (x + 128 + ((x + 128) >> 8)) >> 8
+        np.add(s, 128, out=s)
+        np.right_shift(s, 8, out=t)
+        np.add(s, t, out=s)
+        np.right_shift(s, 8, out=s)
+        np.copyto(region, s, casting="unsafe")
+        return region.nbytes
+
+class FrameSink:
+    """Renders background + overlays into one reusable frame buffer and streams it to the encoder.
+
+    The background is decoded, looped, scaled and cropped by an ffmpeg reader process and read
+    straight into the frame buffer; overlays are blended in place; the buffer is handed to the
+    encoder's stdin as a memoryview. Every array is allocated up front, so the per-frame loop
+    allocates (close to) nothing.
+
+    Overlays can be added before rendering, or streamed in start order while the frames are
+    being rendered (e.g. captions still being rasterized); a streamed overlay is only waited
+    for when the first frame that shows it comes up.
+    """
+
+    def __init__(self, width, height, fps, duration):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = len(np.arange(0, duration, 1.0 / fps)) # Same frame times as MoviePy
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._frame_view = memoryview(self.frame).cast("B")
+        self.overlays = []
+        # Blend scratch covers the whole frame, so overlays of any size can arrive mid-render
+        self._scratch = np.empty((height, width, 3), dtype=np.uint16)
+        self._scratch_shift = np.empty_like(self._scratch)
+        self.stats = {"frames": 0, "setup_arrays": 3,
+                      "setup_bytes": self.frame.nbytes + self._scratch.nbytes * 2,
+                      "bytes_decoded_into_buffer": 0, "bytes_blended": 0, "bytes_written": 0,
+                      "bytes_copied": 0, "loop_allocations": None, "loop_allocated_bytes": None}
+
+    def add_overlay(self, overlay):
+        """Adds a timed overlay before rendering."""
+        self.overlays.append(overlay)
+
+    def _count_overlay(self, overlay):
+        self.stats["setup_arrays"] += 2
+        if overlay.shape != (0, 0):
+            self.stats["setup_bytes"] += overlay.premultiplied.nbytes + overlay.inverse_alpha.nbytes
+
+    def _background_command(self, background_path, offset=0.0):
+        """ffmpeg command that decodes the looped background at the output size and rate,
+        starting `offset` seconds in."""
+        seek = ["-ss", f"{offset:.3f}"] if offset > 0 else []
+        return [get_setting("FFMPEG_BINARY"), "-nostdin", "-v", "error", "-stream_loop", "-1",
+                *seek, "-i", background_path, "-an",
+                "-vf", (f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase,"
+                        f"crop={self.width}:{self.height},fps={self.fps:g}"),
+                "-frames:v", str(self.frame_count), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+
+    def render(self, background_path, encoder_command, overlay_stream=(), cancel_token=None, background_offset=0.0):
+        """Runs the frame loop: decode into the buffer, blend overlays, write to the encoder.
+
+        Args:
+            background_path (str): Background video (looped to fill the duration).
+            encoder_command (list): ffmpeg command reading rgb24 frames of this size from stdin.
+            overlay_stream (iterable): More overlays, in start order, pulled as the frames that
+                need them come up. Overlays are drawn in start order (ties: added ones first).
+            cancel_token (CancelToken or None): Checked every frame; cancelling it kills both
+                ffmpeg processes and raises JobCancelled here (see cancellation.py).
+            background_offset (float): Seconds into the background the first frame is taken from.
+        """
+        pending = heapq.merge(sorted(self.overlays, key=lambda o: o.start), overlay_stream,
+                              key=lambda o: o.start)
+        next_overlay = next(pending, None)
+        live = []
+        frame_time = 1.0 / self.fps
+        # bufsize=0: reads and writes go straight between the pipes and the frame buffer
+        reader = subprocess.Popen(self._background_command(background_path, background_offset), stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE, bufsize=0)
+        encoder = subprocess.Popen(encoder_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        if cancel_token is not None:
+            cancel_token.register_process(reader)
+            cancel_token.register_process(encoder)
+        encoder_fd = encoder.stdin.fileno()
+        baseline = None
+        began = time.perf_counter()
+        try:
+            for index in range(self.frame_count):
+                if cancel_token is not None:
+                    cancel_token.check()
+                if TRACE_ALLOCATIONS and index == TRACE_WARMUP_FRAMES:
+                    tracemalloc.start()
+                    baseline = tracemalloc.take_snapshot()
+                t = index * frame_time
+                if _read_exactly(reader.stdout, self._frame_view) != len(self._frame_view):
+                    raise RuntimeError(f"Background decoder ended early at frame {index}: "
+                                       f"{reader.stderr.read().decode(errors='ignore').strip()}")
+                self.stats["bytes_decoded_into_buffer"] += len(self._frame_view)
+                self.stats["bytes_copied"] += len(self._frame_view) # readinto: pipe -> frame buffer
+
+                # Pull in overlays that start by this frame; drop the ones that have ended
+                while next_overlay is not None and next_overlay.start <= t:
+                    self._count_overlay(next_overlay)
+                    live.append(next_overlay)
+                    next_overlay = next(pending, None)
+                for overlay in live:
+                    if overlay.end <= t:
+                        live = [overlay for overlay in live if overlay.end > t]
+                        break
+                for overlay in live:
+                    blended = overlay.blend(self.frame, self._scratch, self._scratch_shift)
+                    self.stats["bytes_blended"] += blended
+                    self.stats["bytes_copied"] += blended # copyto: blend scratch -> frame region
+
+                _write_all(encoder_fd, self._frame_view)
+                self.stats["bytes_written"] += len(self._frame_view)
+                self.stats["bytes_copied"] += len(self._frame_view) # os.write: frame buffer -> pipe
+                self.stats["frames"] += 1
+
+            if baseline is not None:
+                self._record_allocations(baseline)
+            encoder.stdin.close()
+        except BrokenPipeError:
+            pass # Encoder exited early; its error is reported below
+        except BaseException:
+            # Don't leave a half-fed encoder behind (e.g. the job was cancelled)
+            encoder.kill()
+            encoder.wait()
+            if cancel_token is not None:
+                cancel_token.check() # A killed decoder ends early: report the cancellation instead
+            raise
+        finally:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            reader.stdout.close()
+            reader.kill()
+            reader.wait()
+            if cancel_token is not None:
+                cancel_token.unregister_process(reader)
+                cancel_token.unregister_process(encoder)
+        stderr = encoder.stderr.read()
+        returncode = encoder.wait()
+        if cancel_token is not None:
+            cancel_token.check() # A killed encoder fails: report the cancellation instead
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg encoder failed: {stderr.decode(errors='ignore').strip()}")
+        self.stats["seconds"] = time.perf_counter() - began
+
+    def _record_allocations(self, baseline):
+        """Stores heap allocations made by the loop after warm-up (blocks still alive at the end)."""
+        differences = tracemalloc.take_snapshot().compare_to(baseline, "filename")
+        ignored = (tracemalloc.__file__,)
+        differences = [d for d in differences if d.traceback[0].filename not in ignored]
+        self.stats["loop_allocations"] = sum(max(0, d.count_diff) for d in differences)
+        self.stats["loop_allocated_bytes"] = sum(max(0, d.size_diff) for d in differences)
+
+    def report(self):
+        """Prints allocation and copy statistics for the last render."""
+        frames = max(1, self.stats["frames"])
+        print(f"  Frame sink: {self.stats['frames']} frames in {self.stats.get('seconds', 0):.1f}s; "
+              f"{self.stats['setup_arrays']} arrays ({self.stats['setup_bytes'] / 1024 ** 2:.1f} MB) allocated up front.")
+        print(f"    Per frame: {self.stats['bytes_decoded_into_buffer'] / frames / 1024:.0f} KB decoded into the buffer, "
+              f"{self.stats['bytes_blended'] / frames / 1024:.0f} KB blended in place, "
+              f"{self.stats['bytes_written'] / frames / 1024:.0f} KB written via memoryview, "
+              f"{self.stats['bytes_copied'] / frames / 1024:.0f} KB copied in total "
+              f"(pipe reads, blend write-backs and pipe writes; no other copies of the frame).")
+        if self.stats["loop_allocations"] is not None:
+            measured = max(1, frames - TRACE_WARMUP_FRAMES)
+            print(f"    Steady-state heap growth: {self.stats['loop_allocations']} blocks, "
+                  f"{self.stats['loop_allocated_bytes'] / measured:.1f} bytes per frame.")
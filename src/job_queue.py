@@ -0,0 +1,279 @@
+import os
+import threading
+import time
+import uuid
+
+# --- Worker Protocol Settings (override with environment variables) ---
+LEASE_SECONDS = float(os.getenv("REELIT_LEASE_SECONDS", 45)) # A leased job is re-queued if not renewed for this long
+HEARTBEAT_SECONDS = float(os.getenv("REELIT_HEARTBEAT_SECONDS", 10)) # How often workers renew their lease
+WORKER_TIMEOUT_SECONDS = LEASE_SECONDS # Workers silent for this long are dropped
+MAX_JOB_ATTEMPTS = 3 # Leases a job may lose (worker died) before it is failed
+REAP_INTERVAL_SECONDS = 5
+MAX_JOB_LOGS = 200 # Log lines kept per job
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+# Finished jobs are forgotten after this long, oldest first beyond MAX_FINISHED_JOBS (their
+# status is then reported from the job store)
+FINISHED_JOB_TTL_SECONDS = float(os.getenv("REELIT_FINISHED_JOB_TTL_SECONDS", 3600))
+MAX_FINISHED_JOBS = int(os.getenv("REELIT_MAX_FINISHED_JOBS", 1000))
+
+class JobQueue:
+    """Jobs waiting for render workers, and the leases of jobs being rendered.
+
+    A worker leases the oldest queued job it can run and must renew the lease with heartbeats.
+    If it stops (crash, network split), the lease expires and the job goes back to the queue
+    for another worker, up to MAX_JOB_ATTEMPTS times. Results from a worker whose lease was
+    lost are rejected, so a job completes exactly once.
+    """
+
+    def __init__(self, lease_seconds=LEASE_SECONDS, max_attempts=MAX_JOB_ATTEMPTS,
+                 finished_ttl_seconds=FINISHED_JOB_TTL_SECONDS, max_finished=MAX_FINISHED_JOBS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self.max_finished = max_finished
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs = {} # job id -> record (see enqueue)
+        self._order = [] # Queued job ids, oldest first
+        self._workers = {} # worker id -> {"name", "shared_output", "registered", "last_seen", "job_id"}
+        self._reaper = None
+        self._stop_event = threading.Event()
+
+    # --- Jobs ---
+
+    def enqueue(self, job_id, kind, params, requires_shared_output=False):
+        """Queues a job.
+
+        Args:
+            job_id (str): Job identifier (also names the job's outputs).
+            kind (str): "generate" (run_pipeline), "promote" (render_job) or "resume" (resume_job).
+            params (dict): Keyword arguments for the worker's pipeline call.
+            requires_shared_output (bool): Only lease to workers that write to the shared output
+                directory (e.g. promotions, which read a draft's saved inputs).
+        """
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id, "kind": kind, "params": params, "status": "queued",
+                "requires_shared_output": requires_shared_output, "worker_id": None,
+                "lease_expires": None, "attempts": 0, "logs": [], "log_offset": 0,
+                "result_files": None, "error": None, "created": time.time(), "finished": None,
+            }
+            self._order.append(job_id)
+            self._prune_finished(time.time())
+            self._changed.notify_all()
+        print(f"Queued {kind} job {job_id} for render workers.")
+
+    def get(self, job_id):
+        """Returns a copy of a job's record (without its logs), or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            record = {key: value for key, value in job.items() if key != "logs"}
+            record["queue_position"] = self._order.index(job_id) + 1 if job_id in self._order else None
+            return record
+
+    def wait_for_update(self, job_id, log_index, timeout=1.0):
+        """Blocks until `job_id` has logs past `log_index` or finishes (or `timeout` passes).
+
+        Returns:
+            tuple: (new log lines, next log index, status), status is None for unknown jobs.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return [], log_index, None
+            def has_update():
+                return job["log_offset"] + len(job["logs"]) > log_index or job["status"] in FINISHED_STATUSES
+            self._changed.wait_for(has_update, timeout=timeout)
+            start = max(0, log_index - job["log_offset"])
+            lines = job["logs"][start:]
+            return lines, job["log_offset"] + len(job["logs"]), job["status"]
+
+    # --- Workers ---
+
+    def register_worker(self, name, shared_output=False):
+        """Registers a worker and returns its id."""
+        worker_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            now = time.time()
+            self._workers[worker_id] = {"name": name, "shared_output": shared_output,
+                                        "registered": now, "last_seen": now, "job_id": None}
+        print(f"Render worker registered: {name} ({worker_id}, shared output: {shared_output})")
+        return worker_id
+
+    def workers(self):
+        """Returns a snapshot of the registered workers."""
+        with self._lock:
+            return {worker_id: dict(worker) for worker_id, worker in self._workers.items()}
+
+    def lease(self, worker_id):
+        """Leases the oldest queued job the worker can run.
+
+        Returns:
+            dict or None: {"job_id", "kind", "params"}, or None if there is nothing to do.
+
+        Raises:
+            KeyError: If the worker isn't registered (it should register again).
+        """
+        with self._lock:
+            worker = self._workers[worker_id]
+            worker["last_seen"] = time.time()
+            for job_id in self._order:
+                job = self._jobs[job_id]
+                if job["requires_shared_output"] and not worker["shared_output"]:
+                    continue
+                self._order.remove(job_id)
+                job.update(status="leased", worker_id=worker_id, lease_expires=time.time() + self.lease_seconds)
+                job["attempts"] += 1
+                worker["job_id"] = job_id
+                self._append_logs(job, [f"Leased by render worker {worker['name']} (attempt {job['attempts']})"])
+                return {"job_id": job_id, "kind": job["kind"], "params": job["params"]}
+        return None
+
+    def heartbeat(self, worker_id, job_id=None, logs=()):
+        """Renews a worker's lease and records the job's new log lines.
+
+        Returns:
+            bool: False if the worker no longer holds `job_id` (its lease expired and the job was
+                re-queued or failed); the worker should abandon it.
+
+        Raises:
+            KeyError: If the worker isn't registered.
+        """
+        with self._lock:
+            worker = self._workers[worker_id]
+            worker["last_seen"] = time.time()
+            if job_id is None:
+                return True
+            job = self._jobs.get(job_id)
+            if not self._holds_lease(job, worker_id):
+                return False
+            job["lease_expires"] = time.time() + self.lease_seconds
+            if logs:
+                self._append_logs(job, logs)
+                self._changed.notify_all()
+            return True
+
+    def complete(self, worker_id, job_id, result_files):
+        """Marks a leased job done. Returns False if the worker no longer holds the lease."""
+        return self._finish(worker_id, job_id, "done", result_files=result_files)
+
+    def fail(self, worker_id, job_id, error):
+        """Marks a leased job failed. Returns False if the worker no longer holds the lease."""
+        return self._finish(worker_id, job_id, "failed", error=error)
+
+    def cancel(self, job_id):
+        """Cancels a queued or leased job.
+
+        A queued job is dropped from the queue. A leased job's worker is freed for new leases
+        right away; its next heartbeat finds the lease gone, so it stops rendering and
+        discards the job.
+
+        Returns:
+            bool: False if the job is unknown or already finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] in FINISHED_STATUSES:
+                return False
+            if job_id in self._order:
+                self._order.remove(job_id)
+            worker = self._workers.get(job["worker_id"])
+            if worker and worker["job_id"] == job_id:
+                worker["job_id"] = None
+            job.update(status="cancelled", error="Job cancelled.", lease_expires=None, finished=time.time())
+            self._append_logs(job, ["Job cancelled."])
+            self._changed.notify_all()
+        print(f"Job {job_id} cancelled.")
+        return True
+
+    def is_cancelled(self, job_id):
+        """Returns True if the job was cancelled."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job is not None and job["status"] == "cancelled"
+
+    def holds_lease(self, worker_id, job_id):
+        """Returns True if the worker currently holds the job's lease."""
+        with self._lock:
+            return self._holds_lease(self._jobs.get(job_id), worker_id)
+
+    def _holds_lease(self, job, worker_id):
+        return job is not None and job["status"] == "leased" and job["worker_id"] == worker_id
+
+    def _finish(self, worker_id, job_id, status, result_files=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not self._holds_lease(job, worker_id):
+                return False
+            job.update(status=status, result_files=result_files, error=error,
+                       lease_expires=None, finished=time.time())
+            worker = self._workers.get(worker_id)
+            if worker and worker["job_id"] == job_id:
+                worker["job_id"] = None
+            self._changed.notify_all()
+        print(f"Job {job_id} {status} on worker {worker_id}.")
+        return True
+
+    def _append_logs(self, job, lines):
+        """Appends log lines, keeping the last MAX_JOB_LOGS. Must be called with the lock held."""
+        job["logs"].extend(lines)
+        overflow = len(job["logs"]) - MAX_JOB_LOGS
+        if overflow > 0:
+            del job["logs"][:overflow]
+            job["log_offset"] += overflow
+
+    def _prune_finished(self, now):
+        """Forgets finished jobs past the TTL, and the oldest ones beyond the cap. Must be called with the lock held."""
+        finished = sorted((job for job in self._jobs.values() if job["status"] in FINISHED_STATUSES),
+                          key=lambda job: job["finished"])
+        overflow = len(finished) - self.max_finished
+        for index, job in enumerate(finished):
+            if index < overflow or now - job["finished"] > self.finished_ttl_seconds:
+                del self._jobs[job["job_id"]]
+
+    # --- Lease expiry ---
+
+    def reap(self):
+        """Re-queues jobs whose lease expired, drops workers that stopped sending heartbeats and
+        forgets old finished jobs."""
+        now = time.time()
+        with self._lock:
+            for job in self._jobs.values():
+                if job["status"] != "leased" or job["lease_expires"] > now:
+                    continue
+                lost_worker = self._workers.get(job["worker_id"], {}).get("name", job["worker_id"])
+                if job["attempts"] >= self.max_attempts:
+                    job.update(status="failed", lease_expires=None, finished=now,
+                               error=f"Render worker lost {job['attempts']} times; giving up.")
+                    self._append_logs(job, [f"Lease expired on worker {lost_worker}; job failed."])
+                else:
+                    job.update(status="queued", worker_id=None, lease_expires=None)
+                    self._order.insert(0, job["job_id"]) # It has waited long enough; run it next
+                    self._append_logs(job, [f"Lease expired on worker {lost_worker}; job re-queued."])
+                print(f"Lease on job {job['job_id']} expired (worker {lost_worker}); now {job['status']}.")
+            for worker_id, worker in list(self._workers.items()):
+                if now - worker["last_seen"] > WORKER_TIMEOUT_SECONDS:
+                    del self._workers[worker_id]
+                    print(f"Render worker {worker['name']} ({worker_id}) timed out.")
+            self._prune_finished(now)
+            self._changed.notify_all()
+
+    def start_reaper(self, interval_seconds=REAP_INTERVAL_SECONDS):
+        """Starts a daemon thread that expires leases every `interval_seconds`."""
+        if self._reaper and self._reaper.is_alive():
+            return
+        def _run():
+            while not self._stop_event.wait(interval_seconds):
+                try:
+                    self.reap()
+                except Exception as e:
+                    print(f"Error while expiring job leases: {e}")
+        self._stop_event.clear()
+        self._reaper = threading.Thread(target=_run, name="job-lease-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self):
+        """Stops the lease reaper thread."""
+        self._stop_event.set()
@@ -0,0 +1,190 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+JOBS_DIR = "src/output/jobs" # Per-job inputs and stage checkpoints (narration, title card), kept for resume/re-render
+JOB_DB_PATH = os.getenv("REELIT_JOB_DB", "src/output/jobs.sqlite3") # Job metadata and stage checkpoints
+DB_TIMEOUT_SECONDS = 30 # Part renders run in other processes and write to the same database
+
+# Job status values
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_INTERRUPTED = "interrupted" # Was running when the server stopped
+JOB_CANCELLED = "cancelled"
+
+# Stage checkpoints, in pipeline order; a resumed job redoes only the stages it has no checkpoint for
+STAGE_STORY = "story" # {"title_text", "story_text", "post_url"}
+STAGE_NARRATION = "narration" # {"path"} of the narration MP3 in the job directory
+STAGE_WORD_TIMESTAMPS = "word_timestamps" # [{"word", "start", "end"}, ...]
+STAGE_CAPTION_PLAN = "caption_plan" # caption_planner.plan_to_dict()
+STAGE_RENDER_PLAN = "render_plan" # render_plan.plan_render(): title timing, captions, background, audio mix
+STAGE_TITLE_CARD = "title_card" # {"path"} of the drawn title card in the job directory
+STAGE_VIDEO = "video" # {"path"} of the finished video
+PIPELINE_STAGES = [STAGE_STORY, STAGE_NARRATION, STAGE_WORD_TIMESTAMPS, STAGE_CAPTION_PLAN,
+                   STAGE_RENDER_PLAN, STAGE_TITLE_CARD, STAGE_VIDEO]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT,
+    params TEXT,
+    result TEXT,
+    error TEXT,
+    record TEXT,
+    created REAL,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT,
+    stage TEXT,
+    data TEXT,
+    created REAL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+_schema_lock = threading.Lock()
+_schema_ready_for = None # Database path whose schema exists (per process)
+
+def _connect():
+    """Opens the job database, creating it (WAL mode, so readers don't block writers) on first use."""
+    global _schema_ready_for
+    db_dir = os.path.dirname(JOB_DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    connection = sqlite3.connect(JOB_DB_PATH, timeout=DB_TIMEOUT_SECONDS)
+    connection.row_factory = sqlite3.Row
+    with _schema_lock:
+        if _schema_ready_for != JOB_DB_PATH:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            _schema_ready_for = JOB_DB_PATH
+    return connection
+
+def _execute(sql, parameters=()):
+    """Runs one statement in its own transaction and returns the fetched rows."""
+    connection = _connect()
+    try:
+        with connection:
+            return connection.execute(sql, parameters).fetchall()
+    finally:
+        connection.close()
+
+def get_job_dir(job_id):
+    """Returns the directory that holds a job's retained inputs."""
+    return os.path.join(JOBS_DIR, job_id)
+
+# --- Job records (inputs a draft needs to be re-rendered) ---
+
+def save_job(job_id, record):
+    """Stores a job's record (narration path, timestamps, caption plan, settings).
+
+    Args:
+        job_id (str): Job identifier.
+        record (dict): JSON-serializable job record.
+    """
+    now = time.time()
+    _execute("INSERT INTO jobs (job_id, record, created, updated) VALUES (?, ?, ?, ?) "
+             "ON CONFLICT(job_id) DO UPDATE SET record = excluded.record, updated = excluded.updated",
+             (job_id, json.dumps(record), now, now))
+
+def load_job(job_id):
+    """Loads a job's record, or returns None if the job doesn't exist."""
+    rows = _execute("SELECT record FROM jobs WHERE job_id = ?", (job_id,))
+    if rows and rows[0]["record"]:
+        return json.loads(rows[0]["record"])
+    # Jobs saved before the database existed kept their record next to their inputs
+    record_path = os.path.join(get_job_dir(job_id), "job.json")
+    if not os.path.exists(record_path):
+        return None
+    with open(record_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def delete_job(job_id):
+    """Removes a job's directory, record and checkpoints."""
+    discard_job_inputs(job_id)
+    _execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+    _execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+# --- Job status ---
+
+def start_job(job_id, params):
+    """Records that a job is running. A resumed job keeps its original parameters.
+
+    Args:
+        job_id (str): Job identifier.
+        params (dict): Arguments the job was started with (run_pipeline keyword arguments),
+            used by resume_job().
+    """
+    now = time.time()
+    _execute("INSERT INTO jobs (job_id, status, params, created, updated) VALUES (?, ?, ?, ?, ?) "
+             "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, error = NULL, updated = excluded.updated, "
+             "params = COALESCE(jobs.params, excluded.params)",
+             (job_id, JOB_RUNNING, json.dumps(params), now, now))
+
+def finish_job(job_id, status, result=None, error=None):
+    """Records a job's outcome (JOB_DONE with its result, or JOB_FAILED with an error)."""
+    _execute("UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE job_id = ?",
+             (status, json.dumps(result), error, time.time(), job_id))
+
+def get_job_status(job_id):
+    """Returns {"job_id", "status", "params", "result", "error", "created", "updated", "stages"} or None."""
+    rows = _execute("SELECT job_id, status, params, result, error, created, updated FROM jobs WHERE job_id = ?",
+                    (job_id,))
+    if not rows or rows[0]["status"] is None:
+        return None
+    job = dict(rows[0])
+    job["params"] = json.loads(job["params"]) if job["params"] else None
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["stages"] = list(load_checkpoints(job_id))
+    return job
+
+def mark_interrupted_jobs():
+    """Marks jobs left "running" by a previous process as interrupted. Returns their ids."""
+    rows = _execute("SELECT job_id FROM jobs WHERE status = ?", (JOB_RUNNING,))
+    _execute("UPDATE jobs SET status = ?, updated = ? WHERE status = ?", (JOB_INTERRUPTED, time.time(), JOB_RUNNING))
+    return [row["job_id"] for row in rows]
+
+# --- Stage checkpoints ---
+
+def save_checkpoint(job_id, stage, data):
+    """Records that a stage finished, with its (JSON-serializable) output."""
+    _execute("INSERT OR REPLACE INTO checkpoints (job_id, stage, data, created) VALUES (?, ?, ?, ?)",
+             (job_id, stage, json.dumps(data), time.time()))
+
+def load_checkpoints(job_id):
+    """Returns {stage: data} for every finished stage of a job.
+
+    Stages whose output is a file ({"path": ...}) are left out if the file is gone.
+    """
+    rows = _execute("SELECT stage, data FROM checkpoints WHERE job_id = ?", (job_id,))
+    checkpoints = {}
+    for row in rows:
+        data = json.loads(row["data"])
+        if isinstance(data, dict) and "path" in data and not os.path.exists(data["path"]):
+            continue
+        checkpoints[row["stage"]] = data
+    return checkpoints
+
+def discard_job_inputs(job_id, keep_stages=()):
+    """Removes a job's directory and the checkpoints of its inputs (once they won't be needed again).
+
+    Args:
+        job_id (str): Job identifier.
+        keep_stages (iterable): Checkpoints to keep (e.g. STAGE_VIDEO, so a resumed multi-part
+            job doesn't redo finished parts).
+    """
+    job_dir = get_job_dir(job_id)
+    if os.path.isdir(job_dir):
+        shutil.rmtree(job_dir, ignore_errors=True)
+        print(f"Removed job directory: {job_dir}")
+    keep_stages = list(keep_stages)
+    placeholders = ",".join("?" * len(keep_stages))
+    if keep_stages:
+        _execute(f"DELETE FROM checkpoints WHERE job_id = ? AND stage NOT IN ({placeholders})",
+                 [job_id] + keep_stages)
+    else:
+        _execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
@@ -3,11 +3,29 @@ import datetime
 import random
 import string
 import re # Import regex module
+import math
+import multiprocessing
+import queue
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait
 
-from reddit_scraper import get_random_top_story
+from reddit_scraper import get_random_top_story, get_story_by_url
 from tts_generator import create_narration
-from video_creator import create_video
-from alignment import get_word_timestamps # Import the new function
+from video_creator import (create_video, render_video, framing_output_path,
+                           RENDER_PROFILES, DEFAULT_RENDER_PROFILE, PRIMARY_FRAMING)
+from caption_planner import plan_story_captions, plan_to_dict, plan_from_dict
+from render_plan import plan_render, estimate_title_duration, RENDER_PLAN_VERSION
+from job_store import (get_job_dir, save_job, load_job, start_job, finish_job, get_job_status,
+                       save_checkpoint, load_checkpoints, discard_job_inputs, JOB_DONE, JOB_FAILED, JOB_CANCELLED,
+                       STAGE_STORY, STAGE_NARRATION, STAGE_WORD_TIMESTAMPS, STAGE_CAPTION_PLAN,
+                       STAGE_RENDER_PLAN, STAGE_TITLE_CARD, STAGE_VIDEO)
+from scratch import job_scratch
+from cancellation import (cancel_scope, check_cancelled, current_cancel_token, inherit_cancel_event,
+                          JobCancelled, CANCEL_POLL_SECONDS)
+from render_cache import RenderCache, make_render_key, post_id_from_url
+from alignment import get_word_timestamps, ALIGNMENT_SAMPLE_RATE # Import the new function
+from audio_mixer import decode_audio, resample_audio, MIX_SAMPLE_RATE
+from admission import estimate_job_cost
 
 # --- Configuration ---
 SUBREDDIT = "AmItheAsshole" # Or choose another like "confession", "tifu"
@@ -16,6 +34,21 @@ BACKGROUND_VIDEO_PATH = "src/assets/background_minecraft.webm" # Default backgro
 BACKGROUND_MUSIC_PATH = "src/assets/background_music.mp3" # Path to background music
 OUTPUT_DIR = "src/output" # Directory for output files
 ASSETS_DIR = "src/assets" # Directory for assets
+# Whisper model for word timestamps: a name like "tiny.en" / "base.en-int8", or "auto"
+# to pick by narration length and the alignment latency budget (see alignment.py)
+WHISPER_MODEL = "auto"
+# How alignment runs: "batched" (shared batcher; concurrent jobs are encoded together),
+# "parallel" (process pool), "single", or "auto" (see get_word_timestamps)
+ALIGNMENT_MODE = "auto"
+# --- Multi-part Settings ---
+MAX_PART_SECONDS = 60 # Stories whose narration is estimated longer than this become "Part 1/2/..." videos
+NARRATION_WORDS_PER_SECOND = 2.6 # Approximate gTTS speaking rate, used to estimate length before TTS
+MAX_PART_WORKERS = max(1, (os.cpu_count() or 1) // 2) # Parts rendered at the same time, one process each
+# Extra framings encoded alongside the 9:16 video in the same pass, e.g. ["1:1", "16:9"]
+EXTRA_OUTPUT_FRAMINGS = []
+
+# Identical jobs (same post, text, assets, settings and code) reuse one render
+RENDER_CACHE = RenderCache()
 
 # Ensure necessary directories exist
 # Use the adjusted paths here too
@@ -29,7 +62,9 @@ def generate_random_filename(prefix="video", length=8):
     return f"{prefix}_{timestamp}_{random_chars}"
 
 def run_pipeline(subreddit=SUBREDDIT, background_video_path=BACKGROUND_VIDEO_PATH, 
-                background_music_path=BACKGROUND_MUSIC_PATH, music_volume=0.15):
+                background_music_path=BACKGROUND_MUSIC_PATH, music_volume=0.15,
+                render_profile=DEFAULT_RENDER_PROFILE, job_id=None, extra_framings=None, post_url=None,
+                concurrency=1):
     """Runs the full pipeline: fetch story -> generate audio -> create video with title/captions.
     
     Args:
@@ -37,32 +72,156 @@ def run_pipeline(subreddit=SUBREDDIT, background_video_path=BACKGROUND_VIDEO_PAT
         background_video_path (str): Path to the background video file
         background_music_path (str): Path to the background music file
         music_volume (float): Volume of background music (0.0 to 1.0)
+        render_profile (str): Render profile name ("final" or "draft"). Draft jobs keep their
+            narration, timestamps and caption plan so they can be promoted with render_job().
+        job_id (str or None): Identifier for this run. Generated from the subreddit if None.
+        extra_framings (list or None): Extra framings ("1:1", "16:9") written next to each video
+            (see video_creator.framing_output_path). Defaults to EXTRA_OUTPUT_FRAMINGS.
+        post_url (str or None): Render this Reddit post instead of a random one from `subreddit`.
+        concurrency (int): Jobs rendering on this host at the same time, including this one
+            (they share the encoder threads).
         
     Returns:
-        str: Path to the generated video file, or None if failed
+        str or list: Path to the generated video file, a list of paths (one per part) if the
+            story was split into parts, or None if failed
+
+    Raises:
+        JobCancelled: If cancel_job(job_id) was called while it ran.
     """
     print(f"--- Starting Video Generation Pipeline ---")
-    print(f"Parameters: subreddit={subreddit}, bg_video={background_video_path}, music_vol={music_volume}")
+    print(f"Parameters: subreddit={subreddit}, bg_video={background_video_path}, music_vol={music_volume}, profile={render_profile}")
+    if render_profile not in RENDER_PROFILES:
+        print(f"Unknown render profile '{render_profile}'. Exiting.")
+        return None
+
+    # Generate unique filenames for this run
+    base_filename = job_id or generate_random_filename(prefix=subreddit)
+    if extra_framings is None:
+        extra_framings = EXTRA_OUTPUT_FRAMINGS
+
+    # Job status and stage checkpoints go to the job database, so a failed or interrupted
+    # job can be resumed with resume_job()
+    start_job(base_filename, {"subreddit": subreddit, "background_video_path": background_video_path,
+                              "background_music_path": background_music_path, "music_volume": music_volume,
+                              "render_profile": render_profile, "extra_framings": list(extra_framings),
+                              "post_url": post_url})
+    result = None
+    status, error = JOB_FAILED, "Pipeline failed; see the job log. Resume to retry from the last finished stage."
+    try:
+        # cancel_job(base_filename) stops the job between stages, or mid-encode
+        with cancel_scope(base_filename):
+            result = _run_pipeline_stages(base_filename, subreddit, background_video_path, background_music_path,
+                                          music_volume, render_profile, extra_framings, post_url, concurrency)
+    except JobCancelled:
+        status, error = JOB_CANCELLED, "Cancelled. Resume to continue from the last finished stage."
+        print(f"\n--- Job {base_filename} cancelled ---")
+        raise
+    finally:
+        if result:
+            finish_job(base_filename, JOB_DONE, result=result)
+        else:
+            finish_job(base_filename, status, error=error)
+    if result and render_profile == "final":
+        # Finished finals don't need their inputs (drafts keep them for promotion)
+        discard_job_inputs(base_filename)
+    return result
 
+def _run_pipeline_stages(base_filename, subreddit, background_video_path, background_music_path,
+                         music_volume, render_profile, extra_framings, post_url, concurrency=1):
+    """Fetches (or restores) the story and renders it. See run_pipeline()."""
     # 1. Get Reddit Story
-    print(f"\nStep 1: Fetching random story from r/{subreddit}...")
+    story = load_checkpoints(base_filename).get(STAGE_STORY)
+    if story:
+        print(f"\nStep 1: Fetching story... restored from checkpoint.")
+        title_text, story_text, post_url = story["title_text"], story["story_text"], story["post_url"]
+    else:
+        title_text, story_text, post_url = _fetch_story(subreddit, post_url)
+        if not title_text:
+            return None
+        save_checkpoint(base_filename, STAGE_STORY,
+                        {"title_text": title_text, "story_text": story_text, "post_url": post_url})
+    check_cancelled()
+
+    # A matching finished or in-flight render is reused instead of rendering again
+    render_key = make_render_key(post_id_from_url(post_url), f"{title_text}. {story_text}",
+                                 background_video_path, background_music_path, music_volume,
+                                 render_profile, extra_framings)
+    def list_outputs(result):
+        videos = result if isinstance(result, list) else [result]
+        return [framing_output_path(video, framing) for video in videos
+                for framing in [PRIMARY_FRAMING] + list(extra_framings)]
+    result, source_job_id = RENDER_CACHE.get_or_render(
+        render_key, base_filename,
+        lambda: render_fetched_story(base_filename, title_text, story_text, background_video_path,
+                                     background_music_path, music_volume, render_profile, extra_framings,
+                                     concurrency),
+        list_outputs)
+    if not result:
+        return None
+    if source_job_id != base_filename and render_profile != "final":
+        # Let this job id be promoted too: point it at the inputs saved by the job that rendered
+        source_job = load_job(source_job_id)
+        if source_job:
+            save_job(base_filename, source_job)
+
+    print(f"\n--- Pipeline Finished Successfully ---")
+    return result
+
+def _fetch_story(subreddit, post_url=None):
+    """Fetches the post at `post_url`, or a random top story from `subreddit`.
+
+    Returns:
+        tuple: (title_text, story_text, post_url), or (None, None, None) if failed
+    """
     try:
-        title_text, story_text, post_url = get_random_top_story(subreddit) # Keep original title in title_text
+        if post_url:
+            print(f"\nStep 1: Fetching story {post_url}...")
+            title_text, story_text, post_url = get_story_by_url(post_url)
+        else:
+            print(f"\nStep 1: Fetching random story from r/{subreddit}...")
+            title_text, story_text, post_url = get_random_top_story(subreddit) # Keep original title in title_text
         if not title_text or not story_text:
             print("Failed to retrieve a story title or text. Exiting.")
-            return None
+            return None, None, None
         print(f"Successfully fetched story: '{title_text}'")
-        # Post URL is fetched but not used in this version
-        # print(f"Post URL: {post_url}") 
+        print(f"Post URL: {post_url}")
     except ValueError as e:
         print(f"Error fetching story: {e}")
-        return None
+        return None, None, None
     except Exception as e:
         print(f"An unexpected error occurred during story fetching: {e}")
-        return None
+        return None, None, None
+    return title_text, story_text, post_url
+
+def render_fetched_story(base_filename, title_text, story_text, background_video_path,
+                         background_music_path, music_volume=0.15, render_profile=DEFAULT_RENDER_PROFILE,
+                         extra_framings=(), concurrency=1):
+    """Renders a fetched story as one video, or as parts if it is too long.
+
+    `concurrency` counts the jobs rendering on this host, including this one (see run_pipeline).
+
+    Returns:
+        str or list: Path to the video, a list of part videos, or None if failed
+    """
+    # Long stories become several short videos, each narrated and rendered on its own
+    parts = split_story_into_parts(title_text, story_text)
+    if len(parts) > 1:
+        print(f"  Story is too long for one video; splitting it into {len(parts)} parts at sentence boundaries.")
+        video_filenames = render_story_parts(base_filename, title_text, parts, background_video_path,
+                                             background_music_path, music_volume, render_profile,
+                                             extra_framings, concurrency)
+        if video_filenames:
+            print(f"  Rendered {len(video_filenames)} parts.")
+        return video_filenames
 
     # Prepare text for narration - use original title and story
-    narration_text = f"{title_text}. {story_text}" 
+    narration_text = prepare_narration_text(f"{title_text}. {story_text}")
+    return render_story(base_filename, title_text, story_text, narration_text,
+                        background_video_path, background_music_path, music_volume,
+                        render_profile, extra_framings, concurrency)
+
+def prepare_narration_text(narration_text):
+    """Cleans text for TTS: symbols, AITA and age/gender shorthand."""
     # Basic cleaning
     narration_text = narration_text.replace("&", " and ").replace("#", " number ") 
     # Replace AITA variations for TTS
@@ -72,76 +231,430 @@ def run_pipeline(subreddit=SUBREDDIT, background_video_path=BACKGROUND_VIDEO_PAT
     narration_text = re.sub(r'\b(\d+)[mM]\b', r'\1 male', narration_text)
     narration_text = re.sub(r'\b(\d+)[fF]\b', r'\1 female', narration_text)
     print(f"  Text prepared for narration (AITA, Age/Gender replaced). Length: {len(narration_text)}")
+    return narration_text
 
-    # Generate unique filenames for this run
-    base_filename = generate_random_filename(prefix=subreddit)
-    audio_filename = os.path.join(OUTPUT_DIR, f"{base_filename}_narration.mp3")
-    video_filename = os.path.join(OUTPUT_DIR, f"{base_filename}_final.mp4")
-    # screenshot_filename = os.path.join(OUTPUT_DIR, f"{base_filename}_screenshot.png") # Removed
-
-    # --- Screenshot step removed --- 
-
-    # 2. Generate Narration
-    print(f"\nStep 2: Generating narration audio...")
-    if not create_narration(narration_text, audio_filename):
-        print("Failed to create narration. Exiting.")
-        # ... (cleanup audio if exists) ...
-        if os.path.exists(audio_filename):
-            try: os.remove(audio_filename)
-            except OSError as e: print(f"Error removing partial audio file {audio_filename}: {e}")
+def split_story_into_parts(title_text, story_text, max_part_seconds=MAX_PART_SECONDS,
+                           words_per_second=NARRATION_WORDS_PER_SECOND):
+    """Splits a story into parts that each fit in `max_part_seconds` of narration, at sentence boundaries.
+
+    Every part repeats the spoken title, so its length counts against each part. Parts are
+    balanced (cut at the sentence boundary nearest each even share of the story); a single
+    sentence longer than a part is never cut.
+
+    Args:
+        title_text (str): Post title (spoken at the start of every part).
+        story_text (str): Post body.
+        max_part_seconds (float): Maximum estimated narration length per part.
+        words_per_second (float): Speaking rate used for the estimate.
+
+    Returns:
+        list: Story text for each part (a single item if no split is needed).
+    """
+    sentences = [s for s in re.split(r'(?<=[.!?])\s+', story_text.strip()) if s]
+    title_seconds = (len(title_text.split()) + 2) / words_per_second # "<title>. Part N."
+    story_budget = max(1.0, max_part_seconds - title_seconds)
+    sentence_seconds = [len(sentence.split()) / words_per_second for sentence in sentences]
+    total_seconds = sum(sentence_seconds)
+    if title_seconds + total_seconds <= max_part_seconds or len(sentences) < 2:
+        return [story_text]
+
+    target = total_seconds / math.ceil(total_seconds / story_budget)
+    parts = []
+    current, current_seconds = [], 0.0
+    for sentence, seconds in zip(sentences, sentence_seconds):
+        # Close the part if adding this sentence overshoots the budget, or lands further
+        # from the even share than stopping here would
+        if current and (current_seconds + seconds > story_budget
+                        or current_seconds + seconds - target > target - current_seconds):
+            parts.append(" ".join(current))
+            current, current_seconds = [], 0.0
+        current.append(sentence)
+        current_seconds += seconds
+    parts.append(" ".join(current))
+    return parts
+
+def estimate_story_cost(story_words, render_profile=DEFAULT_RENDER_PROFILE, extra_framings=()):
+    """Estimates the memory, cores and time needed to render a story of `story_words` words.
+
+    Uses the same length estimate as split_story_into_parts, so long stories are costed as
+    parts rendered MAX_PART_WORKERS at a time.
+
+    Returns:
+        dict: {"memory_bytes", "cpu_cores", "seconds"} (see admission.estimate_job_cost)
+    """
+    narration_seconds = max(1.0, story_words / NARRATION_WORDS_PER_SECOND)
+    parts = max(1, math.ceil(narration_seconds / MAX_PART_SECONDS))
+    parallel_parts = min(MAX_PART_WORKERS, parts) if parts > 1 else 1
+    return estimate_job_cost(narration_seconds / parts, RENDER_PROFILES[render_profile], parts=parts,
+                             parallel_parts=parallel_parts, framings=1 + len(extra_framings))
+
+class _QueuedLogWriter:
+    """stdout of a part process: complete lines go to the parent through a queue."""
+
+    def __init__(self, log_queue):
+        self.log_queue = log_queue
+        self._partial = ""
+
+    def write(self, message):
+        lines = (self._partial + message).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.log_queue.put(line)
+
+    def flush(self):
+        if self._partial:
+            self.log_queue.put(self._partial)
+            self._partial = ""
+
+def _init_part_process(job_id, cancel_event, log_queue):
+    """Process pool initializer: follows the parent job's cancellation and sends output to its log."""
+    inherit_cancel_event(job_id, cancel_event)
+    sys.stdout = _QueuedLogWriter(log_queue)
+
+def _run_part(function, args):
+    """Runs one part in a pool process, sending any unfinished output line before returning."""
+    try:
+        return function(*args)
+    finally:
+        sys.stdout.flush()
+
+def _print_part_logs(log_queue, timeout=0):
+    """Prints the lines part processes have sent so far. Runs on the job's own thread, so the
+    lines reach wherever this job's output goes (the web UI's progress log, worker heartbeats)."""
+    while True:
+        try:
+            line = log_queue.get(timeout=timeout) if timeout else log_queue.get_nowait()
+        except queue.Empty:
+            return
+        print(line)
+
+def _run_in_parallel(function, argument_tuples):
+    """Runs function(*args) for each tuple, in up to MAX_PART_WORKERS processes, keeping order.
+
+    The processes' output is printed by the calling thread as it arrives. Cancelling the
+    current job (see cancellation.py) stops the work in every process and raises JobCancelled here.
+    """
+    workers = min(MAX_PART_WORKERS, len(argument_tuples))
+    if workers <= 1:
+        results = []
+        for args in argument_tuples:
+            check_cancelled()
+            results.append(function(*args))
+        return results
+    # spawn: a forked copy of a process that already loaded torch/OpenMP can deadlock
+    context = multiprocessing.get_context("spawn")
+    cancel_token = current_cancel_token()
+    cancel_event = context.Event()
+    log_queue = context.Queue()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_part_process,
+                                   initargs=(cancel_token.job_id if cancel_token else None, cancel_event, log_queue))
+    try:
+        futures = [executor.submit(_run_part, function, args) for args in argument_tuples]
+        if cancel_token is not None:
+            cancel_token.add_callback(cancel_event.set)
+        while wait(futures, timeout=CANCEL_POLL_SECONDS).not_done:
+            _print_part_logs(log_queue)
+            if cancel_token is not None:
+                cancel_token.check()
+        return [future.result() for future in futures]
+    finally:
+        # After a cancellation, parts that haven't started are dropped and running ones stop
+        # at their next check (cleaning up their scratch space), so this wait is short
+        executor.shutdown(wait=True, cancel_futures=True)
+        # The processes have exited, so everything they printed is in the queue
+        _print_part_logs(log_queue, timeout=CANCEL_POLL_SECONDS)
+
+def _discard_part_outputs(video_filenames):
+    """Removes finished parts of a multi-part job that failed as a whole."""
+    for video_filename in video_filenames:
+        if video_filename and os.path.exists(video_filename):
+            os.remove(video_filename)
+
+def render_story_parts(job_id, title_text, parts, background_video_path, background_music_path,
+                       music_volume=0.15, render_profile=DEFAULT_RENDER_PROFILE, extra_framings=(),
+                       concurrency=1):
+    """Renders each part of a split story as an independent job, in parallel.
+
+    Each part gets the title card (with "(Part N)" added), its own narration, caption plan
+    and scratch directory, so memory and latency are bounded per part.
+
+    Args:
+        job_id (str): Identifier of the whole story; parts are "<job_id>_part<N>".
+        title_text (str): Original post title.
+        parts (list): Story text of each part (from split_story_into_parts).
+        background_video_path (str): Path to the background video file
+        background_music_path (str): Path to the background music file
+        music_volume (float): Volume of background music (0.0 to 1.0)
+        render_profile (str): Render profile name.
+        extra_framings (iterable): Extra framings written next to each part.
+        concurrency (int): Jobs rendering on this host, including this one.
+
+    Returns:
+        list: Paths of the part videos in order, or None if any part failed
+    """
+    part_jobs = []
+    parallel_parts = min(MAX_PART_WORKERS, len(parts))
+    # The encoders of this job's parts share the cores with the other jobs' renders
+    render_concurrency = concurrency - 1 + parallel_parts
+    for number, part_text in enumerate(parts, start=1):
+        part_title = f"{title_text} (Part {number})"
+        # "Part N" is spoken right after the title so the title card covers it too
+        part_narration = prepare_narration_text(f"{title_text}. Part {number}. {part_text}")
+        part_jobs.append((f"{job_id}_part{number}", part_title, part_text, part_narration,
+                          background_video_path, background_music_path, music_volume, render_profile,
+                          list(extra_framings), render_concurrency))
+
+    print(f"\nRendering {len(part_jobs)} parts ({parallel_parts} at a time)...")
+    video_filenames = _run_in_parallel(render_story, part_jobs)
+    if not all(video_filenames):
+        print("One or more parts failed to render. Exiting.")
+        _discard_part_outputs(video_filenames)
+        return None
+
+    if render_profile != "final":
+        # Remember the parts so the whole story can be promoted with render_job(job_id)
+        save_job(job_id, {"title_text": title_text, "parts": [job[0] for job in part_jobs]})
+    return video_filenames
+
+def render_story(job_id, title_text, story_text, narration_text, background_video_path,
+                 background_music_path, music_volume=0.15, render_profile=DEFAULT_RENDER_PROFILE,
+                 extra_framings=(), concurrency=1):
+    """Narrates, aligns and renders one story. Intermediates live in a per-job scratch directory.
+
+    Each finished stage (narration, word timestamps, caption plan, title card, video) is
+    checkpointed in the job store; running the same job id again resumes after the last one.
+
+    Args:
+        job_id (str): Identifier for this job, used for output and scratch names.
+        title_text (str): Original post title (drawn on the title card).
+        story_text (str): Original post body.
+        narration_text (str): Cleaned text to narrate (title + story).
+        background_video_path (str): Path to the background video file
+        background_music_path (str): Path to the background music file
+        music_volume (float): Volume of background music (0.0 to 1.0)
+        render_profile (str): Render profile name.
+        extra_framings (iterable): Extra framings ("1:1", "16:9") encoded in the same pass as the
+            9:16 video and written next to it.
+        concurrency (int): Renders running side by side with this one (they share the encoder threads).
+
+    Returns:
+        str: Path to the generated (9:16) video file, or None if failed
+    """
+    keep_job_inputs = render_profile != "final" # Drafts keep inputs so they can be promoted
+    video_filename = os.path.join(OUTPUT_DIR, f"{job_id}_{render_profile}.mp4")
+
+    # Stages finished by an earlier (failed or interrupted) attempt are restored, not redone
+    checkpoints = load_checkpoints(job_id)
+    if checkpoints.get(STAGE_VIDEO, {}).get("path") == video_filename:
+        print(f"\nVideo for {job_id} was already rendered: {video_filename}")
+        return video_filename
+
+    with job_scratch(job_id) as scratch_dir:
+        # Stage outputs live in the job directory until the job finishes, so a retry can reuse
+        # them; only the final MP4 (and a draft's retained inputs) stay afterwards
+        job_dir = get_job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        audio_filename = os.path.join(job_dir, "narration.mp3")
+        title_card_path = os.path.join(job_dir, "titled_card.png")
+
+        # 2. Generate Narration
+        check_cancelled()
+        if STAGE_NARRATION in checkpoints:
+            audio_filename = checkpoints[STAGE_NARRATION]["path"]
+            print(f"\nStep 2: Generating narration audio... restored from checkpoint: {audio_filename}")
+        else:
+            print(f"\nStep 2: Generating narration audio...")
+            if not create_narration(narration_text, audio_filename):
+                print("Failed to create narration. Exiting.")
+                return None
+            print(f"Narration saved to: {audio_filename}")
+            save_checkpoint(job_id, STAGE_NARRATION, {"path": audio_filename})
+
+        # Decode the narration once: the mix uses it at MIX_SAMPLE_RATE, Whisper gets a 16 kHz copy
+        try:
+            narration_pcm = decode_audio(audio_filename, MIX_SAMPLE_RATE, channels=1)
+        except Exception as e:
+            print(f"Failed to decode narration audio: {e}. Exiting.")
+            return None
+
+        # --- New Step: Get Word Timestamps --- 
+        check_cancelled()
+        if STAGE_WORD_TIMESTAMPS in checkpoints:
+            word_timestamps = checkpoints[STAGE_WORD_TIMESTAMPS]
+            print(f"\nStep 2.5: Getting word timestamps... restored {len(word_timestamps)} from checkpoint.")
+        else:
+            print(f"\nStep 2.5: Getting word timestamps using Whisper...")
+            alignment_audio = resample_audio(narration_pcm, MIX_SAMPLE_RATE, ALIGNMENT_SAMPLE_RATE)
+            # Model is configured by WHISPER_MODEL (e.g., "tiny.en", "base.en-int8" or "auto")
+            word_timestamps = get_word_timestamps(alignment_audio, model_name=WHISPER_MODEL, mode=ALIGNMENT_MODE,
+                                                  concurrency=concurrency)
+            if not word_timestamps:
+                print("Failed to get word timestamps from audio. Cannot proceed with accurate caption sync. Exiting.")
+                return None
+            print(f"Successfully obtained {len(word_timestamps)} word timestamps.")
+            save_checkpoint(job_id, STAGE_WORD_TIMESTAMPS, word_timestamps)
+        # --- End New Step --- 
+
+        # Plan captions once; the same plan is reused if a draft is promoted or the job resumed
+        if STAGE_CAPTION_PLAN in checkpoints:
+            caption_plan = plan_from_dict(checkpoints[STAGE_CAPTION_PLAN])
+        else:
+            title_word_count, _ = estimate_title_duration(title_text, word_timestamps, 0)
+            caption_plan = plan_story_captions(word_timestamps, title_word_count)
+            save_checkpoint(job_id, STAGE_CAPTION_PLAN, plan_to_dict(caption_plan))
+        if STAGE_TITLE_CARD not in checkpoints and os.path.exists(title_card_path):
+            os.remove(title_card_path) # Left by an attempt that stopped while drawing it
+
+        # 3. Create Video (Pass background music path and volume)
+        check_cancelled()
+        print(f"\nStep 3: Creating video...")
+        if not os.path.exists(background_video_path):
+             print(f"Error: Background video not found at '{background_video_path}'. Please add it.")
+             return None
+        # Check for background music file existence
+        if not os.path.exists(background_music_path):
+            print(f"Warning: Background music file not found at '{background_music_path}'. Proceeding without music.")
+            # Set path to None so create_video knows to skip it
+            music_path_to_pass = None 
+        else:
+            music_path_to_pass = background_music_path
+
+        # Everything about the video that isn't pixels (title timing, captions, background,
+        # audio mix) is decided here; rendering only executes the plan
+        if checkpoints.get(STAGE_RENDER_PLAN, {}).get("version") == RENDER_PLAN_VERSION:
+            render_plan = checkpoints[STAGE_RENDER_PLAN]
+        else:
+            render_plan = plan_render(title_text, word_timestamps, audio_filename, background_video_path,
+                                      music_path=music_path_to_pass, music_volume=music_volume,
+                                      render_profile=render_profile, extra_framings=extra_framings,
+                                      caption_plan=caption_plan, narration_duration=narration_pcm.shape[0] / MIX_SAMPLE_RATE,
+                                      title_card_path=title_card_path, plan_root=job_dir)
+            save_checkpoint(job_id, STAGE_RENDER_PLAN, render_plan)
+
+        if keep_job_inputs:
+            save_job(job_id, {
+                "title_text": title_text,
+                "story_text": story_text,
+                "narration_path": audio_filename,
+                "word_timestamps": word_timestamps,
+                "render_plan": render_plan,
+                "plan_job_id": job_id, # The plan's job files are in this job's directory
+            })
+            print(f"Job inputs saved for later promotion: {job_id}")
+
+        if not render_video(render_plan, video_filename, scratch_dir=scratch_dir, plan_root=job_dir,
+                            narration_pcm=narration_pcm, concurrency=concurrency, cancel_token=current_cancel_token()):
+            if os.path.exists(title_card_path):
+                save_checkpoint(job_id, STAGE_TITLE_CARD, {"path": title_card_path})
+            print("Failed to create video. Exiting.")
+            return None
+        save_checkpoint(job_id, STAGE_TITLE_CARD, {"path": title_card_path})
+        print(f"Final video saved to: {video_filename}")
+
+        # 4. Cleanup: the scratch directory (mixed audio) goes as a unit; a final job's inputs
+        # go too, but its video checkpoint stays so a resumed multi-part job skips this part
+        print(f"\nStep 4: Cleaning up intermediate files...")
+        save_checkpoint(job_id, STAGE_VIDEO, {"path": video_filename})
+        if not keep_job_inputs:
+            discard_job_inputs(job_id, keep_stages=[STAGE_VIDEO])
+
+    return video_filename
+
+def render_job(job_id, render_profile="final", background_video_path=None, concurrency=1):
+    """Re-renders a saved job (e.g. promotes a draft to final) without fetching, TTS or Whisper.
+
+    Args:
+        job_id (str): Identifier of a job saved by a draft run of run_pipeline.
+        render_profile (str): Render profile to encode with.
+        background_video_path (str or None): Override the job's background video.
+        concurrency (int): Renders running side by side with this one.
+
+    Returns:
+        str or list: Path to the rendered video file (a list of paths for a multi-part job),
+            or None if failed
+
+    Raises:
+        JobCancelled: If cancel_job(job_id) was called while it ran.
+    """
+    # cancel_job(job_id) stops the re-render (and every part of a multi-part job)
+    with cancel_scope(job_id):
+        return _render_saved_job(job_id, render_profile, background_video_path, concurrency)
+
+def _render_saved_job(job_id, render_profile, background_video_path, concurrency):
+    """Re-renders a saved job inside its cancel scope. See render_job()."""
+    print(f"--- Re-rendering job {job_id} with profile '{render_profile}' ---")
+    job = load_job(job_id)
+    if not job:
+        print(f"Error: No saved inputs for job '{job_id}'.")
         return None
-    print(f"Narration saved to: {audio_filename}")
-
-    # --- New Step: Get Word Timestamps --- 
-    print(f"\nStep 2.5: Getting word timestamps using Whisper...")
-    # Use a small model for faster processing, adjust if needed (e.g., "base.en")
-    word_timestamps = get_word_timestamps(audio_filename, model_name="tiny.en") 
-    if not word_timestamps:
-        print("Failed to get word timestamps from audio. Cannot proceed with accurate caption sync. Exiting.")
-        # Clean up audio file
-        if os.path.exists(audio_filename): os.remove(audio_filename)
+    if "parts" in job:
+        part_concurrency = concurrency - 1 + min(MAX_PART_WORKERS, len(job["parts"]))
+        video_filenames = _run_in_parallel(render_job, [(part_id, render_profile, background_video_path, part_concurrency)
+                                                        for part_id in job["parts"]])
+        if not all(video_filenames):
+            print("One or more parts failed to re-render.")
+            _discard_part_outputs(video_filenames)
+            return None
+        return video_filenames
+    if not os.path.exists(job["narration_path"]):
+        print(f"Error: Narration for job '{job_id}' is missing: {job['narration_path']}")
         return None
-    print(f"Successfully obtained {len(word_timestamps)} word timestamps.")
-    # --- End New Step --- 
 
-    # 3. Create Video (Pass background music path and volume)
     print(f"\nStep 3: Creating video...")
-    if not os.path.exists(background_video_path):
-         print(f"Error: Background video not found at '{background_video_path}'. Please add it.")
-         # Clean up audio file
-         if os.path.exists(audio_filename): os.remove(audio_filename)
-         return None
-    # Check for background music file existence
-    if not os.path.exists(background_music_path):
-        print(f"Warning: Background music file not found at '{background_music_path}'. Proceeding without music.")
-        # Set path to None so create_video knows to skip it
-        music_path_to_pass = None 
-    else:
-        music_path_to_pass = background_music_path
-
-    # Pass music_path_to_pass and music_volume to create_video
-    if not create_video(audio_filename, background_video_path, title_text, story_text, 
-                        word_timestamps, music_path_to_pass, video_filename, music_volume):
-        print("Failed to create video. Exiting.")
-        # Clean up audio file
-        if os.path.exists(audio_filename): os.remove(audio_filename)
-        return None
+    video_filename = os.path.join(OUTPUT_DIR, f"{job_id}_{render_profile}.mp4")
+    with job_scratch(job_id) as scratch_dir:
+        # The saved plan is rendered as is; only the profile (and background, if given) change
+        if "render_plan" in job:
+            # The plan's files are in the directory of the job that planned it, which differs from
+            # job_id for a render cache hit; plans saved before version 2 hold usable paths instead
+            plan_root = (get_job_dir(job.get("plan_job_id", job_id))
+                         if job["render_plan"]["version"] >= 2 else None)
+            rendered = render_video(job["render_plan"], video_filename, render_profile=render_profile,
+                                    background_video_path=background_video_path, scratch_dir=scratch_dir,
+                                    plan_root=plan_root, concurrency=concurrency, cancel_token=current_cancel_token())
+        else: # Saved before jobs had render plans
+            rendered = create_video(job["narration_path"], background_video_path or job["background_video_path"],
+                                    job["title_text"], job["story_text"], job["word_timestamps"], job["music_path"],
+                                    video_filename, music_volume=job["music_volume"], render_profile=render_profile,
+                                    caption_plan=plan_from_dict(job["caption_plan"]), scratch_dir=scratch_dir,
+                                    extra_framings=job.get("extra_framings", []), concurrency=concurrency,
+                                    title_card_path=job.get("title_card_path"), cancel_token=current_cancel_token())
+        if not rendered:
+            print("Failed to create video.")
+            return None
     print(f"Final video saved to: {video_filename}")
+    print(f"\n--- Re-render Finished Successfully ---")
+    return video_filename
 
-    # 4. Cleanup (Optional: remove intermediate audio file)
-    cleanup_intermediate_files = True
-    if cleanup_intermediate_files:
-        print(f"\nStep 4: Cleaning up intermediate audio file...")
-        if os.path.exists(audio_filename):
-            try:
-                os.remove(audio_filename)
-                print(f"Removed intermediate audio file: {audio_filename}")
-            except OSError as e:
-                print(f"Error removing intermediate audio file {audio_filename}: {e}")
-        # No screenshot to cleanup anymore
+def resume_job(job_id, concurrency=1):
+    """Resumes a failed or interrupted job from its last finished stage.
 
-    print(f"\n--- Pipeline Finished Successfully ---")
-    return video_filename
+    Finished stages (story, narration, word timestamps, caption plan, render plan, title card,
+    and the videos of finished parts) are restored from their checkpoints; the rest run again.
+
+    Args:
+        job_id (str): Identifier of a job started by run_pipeline.
+        concurrency (int): Jobs rendering on this host at the same time, including this one.
+
+    Returns:
+        str or list: The job's result (see run_pipeline), or None if it failed again or is unknown
+
+    Raises:
+        JobCancelled: If cancel_job(job_id) was called while it ran.
+    """
+    job = get_job_status(job_id)
+    if not job or not job["params"]:
+        print(f"Error: No job '{job_id}' to resume.")
+        return None
+    if job["status"] == JOB_DONE and job["result"]:
+        videos = job["result"] if isinstance(job["result"], list) else [job["result"]]
+        if all(os.path.exists(video) for video in videos):
+            print(f"Job {job_id} already finished.")
+            return job["result"]
+    print(f"--- Resuming job {job_id} ({job['status']}; finished stages: {', '.join(job['stages']) or 'none'}) ---")
+    return run_pipeline(job_id=job_id, concurrency=concurrency, **job["params"])
 
 if __name__ == "__main__":
+    from font_registry import prewarm_fonts
+    prewarm_fonts()
     run_pipeline() 
\ No newline at end of file
@@ -63,6 +63,20 @@ def get_random_top_story(subreddit_name="AmItheAsshole", limit=25):
         # Return None for all three values
         return None, None, None
 
+def get_story_by_url(post_url):
+    """Fetches a specific post by its URL. Returns (title, text, url) like get_random_top_story."""
+    reddit = get_reddit_instance()
+    try:
+        post = reddit.submission(url=post_url)
+        if not post.selftext.strip():
+            print(f"Post {post_url} has no body text.")
+            return None, None, None
+        print(f"Selected post: '{post.title}'")
+        return post.title, post.selftext, f"https://www.reddit.com{post.permalink}"
+    except Exception as e:
+        print(f"An error occurred while fetching {post_url} from Reddit: {e}")
+        return None, None, None
+
 if __name__ == '__main__':
     # Example usage:
     try:
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, wait
+
+from cancellation import check_cancelled, CANCEL_POLL_SECONDS
+
+try:
+    import fcntl # POSIX only; elsewhere only threads of one process are kept from racing
+except ImportError:
+    fcntl = None
+
+CACHE_INDEX_PATH = "src/output/.render_cache.json" # Completed renders, keyed by render key
+# Source files whose contents change what a render looks like; editing any of them invalidates the cache
+CODE_VERSION_FILES = ["main.py", "video_creator.py", "audio_mixer.py", "caption_planner.py",
+                      "font_registry.py", "alignment.py", "alignment_service.py", "tts_generator.py",
+                      "frame_sink.py", "caption_rasterizer.py", "render_plan.py", "encoder_tuning.py"]
+HASH_CHUNK_BYTES = 1024 * 1024
+
+_code_version = None
+_file_digests = {} # path -> (size, mtime, digest); assets are hashed once per change
+
+def code_version():
+    """Returns a short hash of the rendering code (CODE_VERSION_FILES), computed once per process."""
+    global _code_version
+    if _code_version is None:
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for name in CODE_VERSION_FILES:
+            path = os.path.join(src_dir, name)
+            if os.path.exists(path):
+                digest.update(name.encode())
+                digest.update(file_digest(path).encode())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+def file_digest(path):
+    """Returns the SHA-256 of a file's contents, reusing the last result while its size and mtime are unchanged."""
+    if not path or not os.path.exists(path):
+        return "missing"
+    stat = os.stat(path)
+    cached = _file_digests.get(path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(block)
+    _file_digests[path] = (stat.st_size, stat.st_mtime, digest.hexdigest())
+    return digest.hexdigest()
+
+def post_id_from_url(post_url):
+    """Extracts the Reddit post ID from a permalink (".../comments/<id>/..."), or returns the URL itself."""
+    match = re.search(r"/comments/([a-z0-9]+)", post_url or "")
+    return match.group(1) if match else (post_url or "")
+
+def make_render_key(post_id, narration_text, background_video_path, background_music_path,
+                    music_volume, render_profile, extra_framings=()):
+    """Builds the cache key for a render.
+
+    Args:
+        post_id (str): Reddit post ID.
+        narration_text (str): Text that will be narrated (an edited post gets a new key).
+        background_video_path (str): Background video; keyed by content hash, not path.
+        background_music_path (str or None): Background music; keyed by content hash.
+        music_volume (float): Music volume.
+        render_profile (str): Render profile name.
+        extra_framings (iterable): Extra framings encoded with the video.
+
+    Returns:
+        str: Hex digest identifying the render.
+    """
+    parts = {
+        "post_id": post_id,
+        "narration": hashlib.sha256(narration_text.encode("utf-8")).hexdigest(),
+        "background": file_digest(background_video_path),
+        "music": file_digest(background_music_path),
+        "music_volume": round(float(music_volume), 4),
+        "render_profile": render_profile,
+        "extra_framings": sorted(set(extra_framings)),
+        "code_version": code_version(),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+class RenderCache:
+    """Maps render keys to finished outputs, and lets identical submissions share one in-flight render."""
+
+    def __init__(self, index_path=CACHE_INDEX_PATH):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._entries = {} # key -> {"result", "outputs": [...], "job_id", "created"}
+        self._in_flight = {} # key -> Future resolving to (result, job_id), or raising the owner's error
+        self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not read render cache {self.index_path}: {e}. Starting empty.")
+                self._entries = {}
+
+    @contextmanager
+    def _index_file_lock(self):
+        """Holds the lock other processes' RenderCaches take around reading and changing the index."""
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir:
+            os.makedirs(index_dir, exist_ok=True)
+        with open(self.index_path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when the file is closed
+            yield
+
+    def _update_index(self, key, entry=None):
+        """Stores (or, if entry is None, removes) one entry and writes the index atomically.
+
+        Part renders and workers run in other processes with their own RenderCache, so the
+        change is merged into the index on disk under a file lock rather than overwriting it
+        with this process's copy. Must be called with the lock held.
+        """
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with self._index_file_lock():
+                self._load_index()
+                if entry is None:
+                    self._entries.pop(key, None)
+                else:
+                    self._entries[key] = entry
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f)
+                os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: Could not save render cache: {e}")
+
+    def lookup(self, key):
+        """Returns the cached entry for a key if all of its outputs still exist, else None."""
+        with self._lock:
+            return self._lookup_locked(key)
+
+    def _lookup_locked(self, key):
+        if key not in self._entries:
+            # Another process may have rendered it since the index was last read
+            try:
+                with self._index_file_lock():
+                    self._load_index()
+            except OSError as e:
+                print(f"Warning: Could not read render cache {self.index_path}: {e}")
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not all(os.path.exists(path) for path in entry["outputs"]):
+            # Outputs were evicted (or deleted); forget the entry
+            self._update_index(key)
+            return None
+        return entry
+
+    def get_or_render(self, key, job_id, render, list_outputs=None):
+        """Returns cached outputs for `key`, waits for an identical in-flight render, or renders.
+
+        Args:
+            key (str): Render key from make_render_key().
+            job_id (str): Job asking for the render.
+            render (callable): Called with no arguments to render; returns a path, a list of
+                paths, or None on failure.
+            list_outputs (callable or None): Maps a result to every file it produced (e.g. extra
+                framings); the cache entry is dropped once any of them is gone.
+
+        Returns:
+            tuple: (result, source_job_id). `result` is what `render` returned (or the cached
+                equivalent); `source_job_id` is the job that actually rendered it.
+
+        If the render being waited for fails, raises or is cancelled, the waiting job renders
+        itself (or waits for whichever waiter got there first) instead of sharing the failure.
+        """
+        while True:
+            with self._lock:
+                entry = self._lookup_locked(key)
+                if entry:
+                    print(f"Render cache hit: reusing output of job {entry['job_id']}.")
+                    return entry["result"], entry["job_id"]
+                future = self._in_flight.get(key)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self._in_flight[key] = future
+            if owner:
+                break
+
+            print("An identical render is already in progress; waiting for it instead of rendering again.")
+            # Cancelling this job stops the wait; the render itself belongs to the other job
+            while wait([future], timeout=CANCEL_POLL_SECONDS).not_done:
+                check_cancelled()
+            if future.exception() is None and future.result()[0]:
+                return future.result()
+            print("The identical render did not finish; rendering here instead.")
+
+        try:
+            result = render()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._in_flight[key]
+            if result:
+                if list_outputs:
+                    outputs = list_outputs(result)
+                else:
+                    outputs = result if isinstance(result, list) else [result]
+                self._update_index(key, {"result": result, "outputs": outputs, "job_id": job_id,
+                                         "created": time.time()})
+        future.set_result((result, job_id))
+        return result, job_id
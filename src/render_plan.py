@@ -0,0 +1,175 @@
+import json
+import os
+import random
+import re
+
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from caption_planner import plan_story_captions, caption_texts
+from audio_mixer import decode_audio, MIX_SAMPLE_RATE
+
+# A render plan holds every decision about a video that doesn't touch pixels: when the title
+# card ends, the caption chunks and their times, where the background starts and how the audio
+# is mixed. Planning is cheap (no drawing, decoding or encoding), so plans can be made in bulk,
+# stored as JSON, inspected or edited, and rendered later (video_creator.render_video), with
+# another background or render profile if wanted.
+#
+# Job-owned files (narration, title card) are stored relative to the plan's root, usually the
+# job directory, so a plan stays valid if the job directory moves; pass the same root to
+# render_video. Shared assets (background, music) keep the paths they were given.
+#
+#   version: RENDER_PLAN_VERSION
+#   profile: render profile name (None: the renderer's default); framings: extra output framings
+#   duration: narration length in seconds (the video's length)
+#   audio: {"narration_path", "music_path", "music_volume", "duck_amount"}
+#   background: {"path", "offset"}: video looped behind everything, starting `offset` seconds in.
+#       A background longer than the narration starts at a random point that leaves room for the
+#       whole video; a shorter one starts at 0 and loops
+#   title: {"text", "word_count", "end", "card_path"}: the card shows from 0 to `end`; card_path
+#       is where the drawn card is kept (None: drawn into the render's scratch directory)
+#   captions: {"text", "start", "duration"}: parallel lists, one entry per caption
+RENDER_PLAN_VERSION = 2 # 2: job files relative to the plan root, background offset chosen when planning
+
+def estimate_title_duration(title_text, word_timestamps, narration_duration):
+    """Estimates how long the spoken title lasts at the start of the narration.
+
+    Args:
+        title_text (str): Original title text.
+        word_timestamps (list): List of {'word', 'start', 'end'} dicts from Whisper.
+        narration_duration (float): Narration length in seconds.
+
+    Returns:
+        tuple: (title_word_count, estimated_title_end_seconds)
+    """
+    spoken_title_text = re.sub(r'\bAITA\b\??', 'Am I the asshole?', title_text, flags=re.IGNORECASE)
+    spoken_title_word_list = spoken_title_text.split()
+    title_word_count = len(spoken_title_word_list)
+    estimated_title_speak_duration = 0
+    if title_word_count > 0 and len(word_timestamps) >= title_word_count:
+        try:
+             estimated_title_speak_duration = word_timestamps[title_word_count - 1]['end']
+        except IndexError:
+             total_narration_word_count = len(word_timestamps)
+             if total_narration_word_count > 0:
+                 estimated_title_speak_duration = (title_word_count / total_narration_word_count) * narration_duration
+             else:
+                 estimated_title_speak_duration = 3.0
+    else:
+         estimated_title_speak_duration = 3.0
+    if estimated_title_speak_duration < 0.1: estimated_title_speak_duration = 0.5
+    return title_word_count, estimated_title_speak_duration
+
+def plan_render(title_text, word_timestamps, narration_path, background_video_path,
+                music_path=None, music_volume=0.15, duck_amount=0.0, render_profile=None,
+                extra_framings=(), caption_plan=None, narration_duration=None,
+                background_offset=None, title_card_path=None, plan_root=None):
+    """Plans a video: title timing, captions, background and audio mix. Draws and encodes nothing.
+
+    Args:
+        title_text (str): Original title text for the title card.
+        word_timestamps (list): List of {'word', 'start', 'end'} dicts from Whisper.
+        narration_path (str): Path to the narration audio file.
+        background_video_path (str): Path to the background video file.
+        music_path (str or None): Path to the background music file, or None.
+        music_volume (float): Volume multiplier for background music (0.0 to 1.0).
+        duck_amount (float): How much to lower the music while narration is speaking (0.0 to 1.0).
+        render_profile (str or None): Render profile name (see video_creator.RENDER_PROFILES).
+        extra_framings (iterable): Additional output framings (e.g. "1:1", "16:9").
+        caption_plan (CaptionPlan or None): Precomputed plan over `word_timestamps`. Planned here if None.
+        narration_duration (float or None): Narration length in seconds. Measured by decoding
+            `narration_path` if None.
+        background_offset (float or None): Seconds into the background video the render starts at.
+            Chosen from the background's length if None (see the top of this module).
+        title_card_path (str or None): Where the drawn title card is kept (see render_video).
+        plan_root (str or None): Directory `narration_path` and `title_card_path` are stored
+            relative to (usually the job directory). Paths are stored as given if None.
+
+    Returns:
+        dict: The render plan (JSON-serializable; see the top of this module).
+    """
+    if narration_duration is None:
+        narration_duration = decode_audio(narration_path, channels=1).shape[0] / MIX_SAMPLE_RATE
+    title_word_count, title_end = estimate_title_duration(title_text, word_timestamps, narration_duration)
+    if caption_plan is None:
+        caption_plan = plan_story_captions(word_timestamps, title_word_count)
+    if background_offset is None:
+        background_offset = choose_background_offset(background_video_path, narration_duration)
+    if plan_root is not None:
+        narration_path = os.path.relpath(narration_path, plan_root)
+        if title_card_path is not None:
+            title_card_path = os.path.relpath(title_card_path, plan_root)
+    return {
+        "version": RENDER_PLAN_VERSION,
+        "profile": render_profile,
+        "framings": list(dict.fromkeys(extra_framings)),
+        "duration": narration_duration,
+        "audio": {"narration_path": narration_path, "music_path": music_path,
+                  "music_volume": music_volume, "duck_amount": duck_amount},
+        "background": {"path": background_video_path, "offset": background_offset},
+        "title": {"text": title_text, "word_count": title_word_count, "end": title_end,
+                  "card_path": title_card_path},
+        "captions": {"text": caption_texts(caption_plan, [w['word'] for w in word_timestamps]),
+                     "start": caption_plan.start.tolist(), "duration": caption_plan.duration.tolist()},
+    }
+
+def choose_background_offset(background_video_path, narration_duration):
+    """Picks where in the background video a render starts.
+
+    Returns:
+        float: A random start that leaves `narration_duration` seconds before the background
+            ends, or 0.0 if the background is no longer than the narration (it loops from its start).
+    """
+    background_duration = ffmpeg_parse_infos(background_video_path).get("duration") or 0.0
+    if background_duration <= narration_duration:
+        return 0.0
+    return random.uniform(0.0, background_duration - narration_duration)
+
+def resolve_plan_path(path, plan_root):
+    """Returns a path stored in a plan as a usable path, given the root the plan was made with."""
+    if path is None or plan_root is None:
+        return path
+    return os.path.join(plan_root, path)
+
+def save_render_plan(plan, path):
+    """Writes a render plan to a JSON file."""
+    plan_dir = os.path.dirname(path)
+    if plan_dir:
+        os.makedirs(plan_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2)
+
+def load_render_plan(path):
+    """Reads a render plan written by save_render_plan.
+
+    Raises:
+        ValueError: If the file holds a plan of another version.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    if plan.get("version") != RENDER_PLAN_VERSION:
+        raise ValueError(f"Render plan {path} has version {plan.get('version')}; expected {RENDER_PLAN_VERSION}.")
+    return plan
+
+if __name__ == '__main__':
+    # Example usage: time planning alone (no pixels) on synthetic stories of growing length
+    import random
+    import time
+
+    random.seed(1234)
+    for word_count in (50, 350, 2000, 10000):
+        timestamps = []
+        t = 0.0
+        for i in range(word_count):
+            t += random.choice([0.0, 0.02, 0.1, 0.3])
+            length = random.uniform(0.05, 0.4)
+            timestamps.append({'word': f"w{i}", 'start': t, 'end': t + length})
+            t += length
+        runs = 20
+        began = time.perf_counter()
+        for _ in range(runs):
+            plan = plan_render("AITA for timing my planner?", timestamps, "narration.mp3", "background.webm",
+                               music_path="music.mp3", narration_duration=t, background_offset=0.0)
+        elapsed_ms = (time.perf_counter() - began) * 1000 / runs
+        size_kb = len(json.dumps(plan)) / 1024
+        print(f"  {word_count:>5} words: {len(plan['captions']['start']):>5} captions, "
+              f"planned in {elapsed_ms:.2f} ms, {size_kb:.1f} KB as JSON")
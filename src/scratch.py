@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+# --- Scratch Space Settings ---
+SCRATCH_ROOT = os.getenv("REELIT_SCRATCH_DIR") # Force a specific scratch root
+RAM_SCRATCH_ROOTS = ["/dev/shm"] # RAM-backed filesystems to prefer when present
+MIN_RAM_SCRATCH_BYTES = 1024 ** 3 # Only use RAM scratch if at least this much is free
+SCRATCH_PREFIX = "reelit_"
+
+def _choose_scratch_root(required_bytes):
+    """Picks where to put scratch directories: RAM-backed if large enough, else the system temp dir."""
+    if SCRATCH_ROOT:
+        return SCRATCH_ROOT
+    for root in RAM_SCRATCH_ROOTS:
+        if os.path.isdir(root) and os.access(root, os.W_OK):
+            try:
+                if shutil.disk_usage(root).free >= required_bytes:
+                    return root
+            except OSError:
+                continue
+    return tempfile.gettempdir()
+
+def create_scratch_dir(job_id, required_bytes=MIN_RAM_SCRATCH_BYTES):
+    """Creates an isolated scratch directory for one job's intermediate files.
+
+    Args:
+        job_id (str): Job identifier, used in the directory name for easier debugging.
+        required_bytes (int): Free space the scratch filesystem should have.
+
+    Returns:
+        str: Path to the new, empty scratch directory.
+    """
+    root = _choose_scratch_root(required_bytes)
+    os.makedirs(root, exist_ok=True)
+    scratch_dir = tempfile.mkdtemp(prefix=f"{SCRATCH_PREFIX}{job_id}_", dir=root)
+    print(f"Using scratch directory: {scratch_dir}")
+    return scratch_dir
+
+def remove_scratch_dir(scratch_dir):
+    """Removes a scratch directory and every intermediate in it."""
+    if scratch_dir and os.path.isdir(scratch_dir):
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        print(f"Removed scratch directory: {scratch_dir}")
+
+@contextmanager
+def job_scratch(job_id, required_bytes=MIN_RAM_SCRATCH_BYTES):
+    """Context manager that yields a scratch directory and always cleans it up as a unit."""
+    scratch_dir = create_scratch_dir(job_id, required_bytes)
+    try:
+        yield scratch_dir
+    finally:
+        remove_scratch_dir(scratch_dir)
@@ -6,9 +6,14 @@ document.addEventListener("DOMContentLoaded", () => {
   const resultMessage = document.getElementById("result-message");
   const downloadLink = document.getElementById("download-link");
   const generateAgainButton = document.getElementById("generate-again-button");
+  const promoteButton = document.getElementById("promote-button");
+  const partLinks = document.getElementById("part-links");
+  const variantLinks = document.getElementById("variant-links");
   const errorMessageDiv = document.getElementById("error-message");
   const errorText = document.getElementById("error-text");
   const errorAgainButton = document.getElementById("error-again-button");
+  const resumeButton = document.getElementById("resume-button");
+  const cancelButton = document.getElementById("cancel-button");
 
   const gameCards = document.querySelectorAll(".game-card");
   const selectedGameInput = document.getElementById("selected_game");
@@ -27,6 +32,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
   let pollingInterval = null;
   let previousLogs = [];
+  let currentJobId = null;
+  let currentVariants = {}; // Result file -> {framing: filename}
 
   // --- UI Interaction ---
 
@@ -73,28 +80,75 @@ document.addEventListener("DOMContentLoaded", () => {
     errorMessageDiv.classList.add("hidden");
     loadingIndicator.classList.remove("hidden");
     submitButton.disabled = true; // Disable button while loading
+    cancelButton.disabled = false;
   }
 
   // Show result
-  function showResult(message, filename) {
+  // Point the player and download link at one output file
+  function selectResultFile(filename) {
+    downloadLink.href = `/download/${filename}`; // Set download URL
+
+    // Set video player source
+    const videoPlayer = document.getElementById("result-video");
+    videoPlayer.src = `/video/${filename}`; // Inline stream supports range requests for seeking
+    videoPlayer.load(); // Important: load the new source
+
+    // Downloads for the extra framings (1:1, 16:9) of this video
+    variantLinks.innerHTML = "";
+    const variants = currentVariants[filename] || {};
+    Object.entries(variants).forEach(([framing, variantFile]) => {
+      const link = document.createElement("a");
+      link.href = `/download/${variantFile}`;
+      link.textContent = `Download ${framing}`;
+      link.className =
+        "ml-4 inline-block px-6 py-3 bg-green-800 hover:bg-green-700 text-white font-semibold rounded-lg shadow-md transition duration-200";
+      variantLinks.appendChild(link);
+    });
+    variantLinks.classList.toggle("hidden", Object.keys(variants).length === 0);
+  }
+
+  function showResult(message, filename, jobId, renderProfile, allFiles, variants) {
+    currentVariants = variants || {};
     form.classList.add("hidden");
     submitButton.classList.add("hidden");
     loadingIndicator.classList.add("hidden");
     errorMessageDiv.classList.add("hidden");
     resultMessage.textContent = message;
-    downloadLink.href = `/download/${filename}`; // Set download URL
+    selectResultFile(filename);
+
+    // Long stories are split into parts; let the user switch between them
+    partLinks.innerHTML = "";
+    if (allFiles && allFiles.length > 1) {
+      allFiles.forEach((partFile, index) => {
+        const partButton = document.createElement("button");
+        partButton.type = "button";
+        partButton.textContent = `Part ${index + 1}`;
+        partButton.className =
+          "px-4 py-2 bg-gray-700 hover:bg-gray-600 text-white rounded-lg";
+        partButton.addEventListener("click", () => selectResultFile(partFile));
+        partLinks.appendChild(partButton);
+      });
+      partLinks.classList.remove("hidden");
+    } else {
+      partLinks.classList.add("hidden");
+    }
 
-    // Set video player source
-    const videoPlayer = document.getElementById("result-video");
-    videoPlayer.src = `/download/${filename}`; // Use the download URL as source
-    videoPlayer.load(); // Important: load the new source
+    // Drafts can be promoted to a final render that reuses narration and captions
+    currentJobId = jobId;
+    if (jobId && renderProfile === "draft") {
+      promoteButton.classList.remove("hidden");
+    } else {
+      promoteButton.classList.add("hidden");
+    }
 
     resultDiv.classList.remove("hidden");
     submitButton.disabled = false;
   }
 
-  // Show error
-  function showError(message) {
+  // Show error; a failed job can be resumed from its last finished stage
+  function showError(message, jobId) {
+    currentJobId = jobId || null;
+    resumeButton.classList.toggle("hidden", !jobId);
     form.classList.add("hidden");
     submitButton.classList.add("hidden");
     loadingIndicator.classList.add("hidden");
@@ -203,7 +257,7 @@ document.addEventListener("DOMContentLoaded", () => {
           const latestLog = progressData.logs[progressData.logs.length - 1];
 
           // Check for specific rendering steps in the log
-          if (latestLog.includes("Creating caption:")) {
+          if (latestLog.includes("Queued caption:") || latestLog.includes("Processing caption:")) {
             const captionText = latestLog.split("'")[1] || "caption";
             detailedStatus = `Captioning: "${captionText}"`;
           } else if (latestLog.includes("Writing final video")) {
@@ -286,6 +340,88 @@ document.addEventListener("DOMContentLoaded", () => {
 
   // --- Form Submission & API Interaction ---
 
+  // Error text for a job the server wouldn't start; a full admission queue says when to retry
+  function describeStartError(response, errorData) {
+    const message = errorData.message || response.statusText;
+    const retryAfter = response.headers.get("Retry-After");
+    return retryAfter ? `${message} Try again in about ${retryAfter}s.` : message;
+  }
+
+  promoteButton.addEventListener("click", async () => {
+    if (!currentJobId) return;
+    showLoading();
+    stopPolling();
+
+    const formData = new FormData();
+    formData.set("render_profile", "final");
+
+    try {
+      const response = await fetch(`/promote/${encodeURIComponent(currentJobId)}`, {
+        method: "POST",
+        body: formData,
+      });
+
+      if (response.ok && response.status === 202) {
+        console.log("Promotion started, polling status...");
+        startPolling();
+      } else {
+        const errorData = await response.json();
+        showError(
+          `Failed to start final render: ${describeStartError(response, errorData)}`
+        );
+      }
+    } catch (error) {
+      console.error("Error promoting draft:", error);
+      showError("Network error or server unavailable.");
+    }
+  });
+
+  resumeButton.addEventListener("click", async () => {
+    if (!currentJobId) return;
+    showLoading();
+    stopPolling();
+
+    try {
+      const response = await fetch(`/resume/${encodeURIComponent(currentJobId)}`, {
+        method: "POST",
+      });
+
+      if (response.ok && response.status === 202) {
+        console.log("Resume started, polling status...");
+        startPolling();
+      } else {
+        const errorData = await response.json();
+        showError(
+          `Failed to resume job: ${describeStartError(response, errorData)}`
+        );
+      }
+    } catch (error) {
+      console.error("Error resuming job:", error);
+      showError("Network error or server unavailable.");
+    }
+  });
+
+  // Cancelling stops the job on the server; polling then reports it as cancelled
+  cancelButton.addEventListener("click", async () => {
+    if (!currentJobId) return;
+    cancelButton.disabled = true;
+    currentStepText.textContent = "Cancelling...";
+
+    try {
+      const response = await fetch(`/cancel/${encodeURIComponent(currentJobId)}`, {
+        method: "POST",
+      });
+      if (!response.ok) {
+        const errorData = await response.json();
+        console.error("Cancel failed:", errorData.message || response.statusText);
+        cancelButton.disabled = false;
+      }
+    } catch (error) {
+      console.error("Error cancelling job:", error);
+      cancelButton.disabled = false;
+    }
+  });
+
   form.addEventListener("submit", async (event) => {
     event.preventDefault(); // Prevent default form submission
 
@@ -319,9 +455,7 @@ document.addEventListener("DOMContentLoaded", () => {
       } else {
         const errorData = await response.json();
         showError(
-          `Failed to start generation: ${
-            errorData.message || response.statusText
-          }`
+          `Failed to start generation: ${describeStartError(response, errorData)}`
         );
       }
     } catch (error) {
@@ -349,13 +483,31 @@ document.addEventListener("DOMContentLoaded", () => {
         if (data.progress) {
           updateProgressUI(data.progress);
         }
+        if (data.queue_position) {
+          // Admitted once running jobs free enough memory and cores
+          currentStepText.textContent = `Waiting for resources (queue position ${data.queue_position}, about ${data.retry_after}s)`;
+        }
+        if (data.in_progress && data.job_id) {
+          currentJobId = data.job_id; // Lets the Cancel button reach this job
+        }
 
         if (!data.in_progress) {
           stopPolling();
           if (data.result_file) {
-            showResult("Video generated successfully!", data.result_file);
+            showResult(
+              data.render_profile === "draft"
+                ? "Draft preview ready!"
+                : data.result_files && data.result_files.length > 1
+                ? `Story split into ${data.result_files.length} parts!`
+                : "Video generated successfully!",
+              data.result_file,
+              data.job_id,
+              data.render_profile,
+              data.result_files,
+              data.result_variants
+            );
           } else if (data.error) {
-            showError(`Generation failed: ${data.error}`);
+            showError(`Generation failed: ${data.error}`, data.job_id);
           } else {
             showError(
               "Generation finished but no result or error was reported."
@@ -1,9 +1,53 @@
 import moviepy.editor as mp
 import os
 import math
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import textwrap
 import re
+import subprocess
+import proglog
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+from font_registry import (get_font, CAPTION_FONT_PATH, CAPTION_FONT_SIZE,
+                           TITLE_FONT_PATH, TITLE_MAX_FONT_SIZE, TITLE_MIN_FONT_SIZE,
+                           TITLE_FONT_SIZE_STEP)
+from audio_mixer import create_mixed_track, decode_audio, MIX_SAMPLE_RATE
+from scratch import create_scratch_dir, remove_scratch_dir
+from render_plan import plan_render, resolve_plan_path, estimate_title_duration
+from frame_sink import FrameSink, Overlay
+from caption_rasterizer import draw_caption, rasterize_captions
+from encoder_tuning import choose_encoder_settings
+from cancellation import JobCancelled
+
+# --- Render Profiles ---
+# Layout (title card, caption placement) is designed at LAYOUT_WIDTH x LAYOUT_HEIGHT
+# and scaled to each profile's output size.
+LAYOUT_WIDTH = 1080
+LAYOUT_HEIGHT = 1920
+RENDER_PROFILES = {
+    "final": {"width": 1080, "height": 1920, "max_fps": None, "preset": "medium", "crf": 23},
+    "draft": {"width": 540, "height": 960, "max_fps": 15, "preset": "ultrafast", "crf": 30},
+}
+DEFAULT_RENDER_PROFILE = "final"
+
+# --- Output Framings ---
+# Every framing is cut from the same composited 9:16 frame, so the background is decoded and
+# the captions laid out once. "crop" takes a centered square; "pillarbox" fits the frame
+# between blurred side panels.
+PRIMARY_FRAMING = "9:16"
+OUTPUT_FRAMINGS = {
+    "9:16": "full",
+    "1:1": "crop",
+    "16:9": "pillarbox",
+}
+PILLARBOX_BLUR_DOWNSCALE = 8 # Side panels are blurred at 1/8 size, which keeps the blur cheap
+
+# --- Render Backend ---
+# "frame_sink": background decoded by ffmpeg straight into one reusable frame buffer, title and
+#   captions blended in place, buffer streamed to the encoder (see frame_sink.py).
+# "moviepy": MoviePy compositing (allocates new arrays for every layer of every frame).
+RENDER_BACKEND = "frame_sink"
 
 # --- Helper Functions ---
 
@@ -21,10 +65,125 @@ def split_text(text, max_words_per_chunk=5):
         chunks.append(" ".join(current_chunk))
     return chunks
 
+def framing_output_path(output_path, framing):
+    """Returns where a framing's copy of `output_path` is written (e.g. video_1x1.mp4 for "1:1")."""
+    if framing == PRIMARY_FRAMING:
+        return output_path
+    root, extension = os.path.splitext(output_path)
+    return f"{root}_{framing.replace(':', 'x')}{extension}"
+
+def _framing_filter(framing, width, height):
+    """Builds the ffmpeg filter chain that cuts one framing from a width x height 9:16 frame."""
+    mode = OUTPUT_FRAMINGS[framing]
+    if mode == "full":
+        return "null"
+    if mode == "crop":
+        return f"crop={width}:{width}:0:{(height - width) // 2}"
+    # pillarbox: output is as tall as the 9:16 frame is wide, e.g. 1920x1080 from 1080x1920
+    out_height = width
+    out_width = (out_height * 16 // 9) // 2 * 2
+    small_w, small_h = out_width // PILLARBOX_BLUR_DOWNSCALE, out_height // PILLARBOX_BLUR_DOWNSCALE
+    return (f"split[fg][bg];"
+            f"[bg]scale={small_w}:{small_h}:force_original_aspect_ratio=increase,crop={small_w}:{small_h},"
+            f"boxblur=4,scale={out_width}:{out_height}[blurred];"
+            f"[fg]scale=-2:{out_height}[fitted];"
+            f"[blurred][fitted]overlay=(W-w)/2:0")
+
+def encoder_command(width, height, fps, audio_path, output_paths, encoder_settings):
+    """Builds the ffmpeg command that encodes rgb24 frames from stdin into every requested framing.
+
+    A single framing maps the input straight to its encoder; several framings split the input
+    in one filter graph, one branch per framing. Each output gets the same pre-mixed audio
+    track (copied, not re-encoded).
+
+    Args:
+        width (int): Frame width.
+        height (int): Frame height.
+        fps (float): Output frame rate.
+        audio_path (str): Pre-mixed audio track to mux into every output.
+        output_paths (dict): {framing: output path}, framings from OUTPUT_FRAMINGS.
+        encoder_settings (dict): x264 "preset", "crf" and "threads" (see choose_encoder_settings).
+
+    Returns:
+        list: The ffmpeg command.
+    """
+    framings = list(output_paths)
+    cmd = [get_setting("FFMPEG_BINARY"), "-nostdin", "-v", "error", "-y",
+           "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", f"{fps:g}", "-i", "-",
+           "-i", audio_path]
+    if framings == [PRIMARY_FRAMING]:
+        video_maps = ["0:v"]
+    else:
+        filter_graph = [f"[0:v]split={len(framings)}" + "".join(f"[in{i}]" for i in range(len(framings)))]
+        for i, framing in enumerate(framings):
+            filter_graph.append(f"[in{i}]{_framing_filter(framing, width, height)}[out{i}]")
+        cmd += ["-filter_complex", ";".join(filter_graph)]
+        video_maps = [f"[out{i}]" for i in range(len(framings))]
+    for video_map, framing in zip(video_maps, framings):
+        cmd += ["-map", video_map, "-map", "1:a", "-c:v", "libx264", "-preset", encoder_settings["preset"],
+                "-crf", str(encoder_settings["crf"]), "-threads", str(encoder_settings["threads"]), "-pix_fmt", "yuv420p", "-c:a", "copy", "-shortest",
+                "-movflags", "+faststart", output_paths[framing]]
+    return cmd
+
+def write_framings(clip, fps, audio_path, output_paths, encoder_settings, cancel_token=None):
+    """Encodes several framings of a composited clip from one pass over its frames.
+
+    Frames are rendered once and piped to a single ffmpeg process whose filter graph splits
+    them into one branch per framing; each branch is encoded to its own MP4 concurrently
+    and gets the same pre-mixed audio track (copied, not re-encoded).
+
+    Args:
+        clip (VideoClip): The composited 9:16 clip.
+        fps (float): Output frame rate.
+        audio_path (str): Pre-mixed audio track to mux into every output.
+        output_paths (dict): {framing: output path}, framings from OUTPUT_FRAMINGS.
+        encoder_settings (dict): x264 "preset", "crf" and "threads" (see choose_encoder_settings).
+        cancel_token (CancelToken or None): Checked every frame; cancelling it kills ffmpeg.
+    """
+    width, height = clip.size
+    framings = list(output_paths)
+    cmd = encoder_command(width, height, fps, audio_path, output_paths, encoder_settings)
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    if cancel_token is not None:
+        cancel_token.register_process(process)
+    try:
+        for frame in clip.iter_frames(fps=fps, dtype="uint8"):
+            if cancel_token is not None:
+                cancel_token.check()
+            process.stdin.write(frame.tobytes())
+        process.stdin.close()
+    except BrokenPipeError:
+        pass # ffmpeg exited early; its error is reported below
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        if cancel_token is not None:
+            cancel_token.unregister_process(process)
+    stderr = process.stderr.read()
+    returncode = process.wait()
+    if cancel_token is not None:
+        cancel_token.check()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to encode {', '.join(framings)}: {stderr.decode(errors='ignore').strip()}")
+
+class CancellableBarLogger(proglog.TqdmProgressBarLogger):
+    """MoviePy's progress bar, which also stops write_videofile() once the job is cancelled."""
+
+    def __init__(self, cancel_token):
+        super().__init__()
+        self.cancel_token = cancel_token
+
+    def bars_callback(self, bar, attr, value, old_value):
+        self.cancel_token.check()
+        super().bars_callback(bar, attr, value, old_value)
+
 # Added function to draw title onto the template
 def draw_title_on_template(template_path, title_text, output_path,
-                           font_path='src/assets/Inter-Bold.ttf', 
-                           max_font_size=48, min_font_size=36, 
+                           font_path=TITLE_FONT_PATH, 
+                           max_font_size=TITLE_MAX_FONT_SIZE, min_font_size=TITLE_MIN_FONT_SIZE, 
                            text_color=(0, 0, 0), 
                            boundary_x=150, boundary_y=910, 
                            boundary_width=780, boundary_max_height=160,
@@ -57,20 +216,9 @@ def draw_title_on_template(template_path, title_text, output_path,
         final_font_size = max_font_size
 
         # --- Find optimal font size --- 
-        for current_font_size in range(max_font_size, min_font_size - 1, -2): 
-            try:
-                current_font = ImageFont.truetype(font_path, current_font_size)
-            except IOError:
-                if current_font_size <= min_font_size:
-                    print(f"Warning: Font '{font_path}' not found in assets. Trying default Arial...")
-                    try: font = ImageFont.truetype('C:/Windows/Fonts/arial.ttf', max_font_size)
-                    except IOError: 
-                        print("Warning: Arial not found. Using default Pillow font.")
-                        font = ImageFont.load_default()
-                    final_font_size = max_font_size
-                    break
-                else:
-                    continue
+        for current_font_size in range(max_font_size, min_font_size - 1, -TITLE_FONT_SIZE_STEP): 
+            # Fonts (and the fallback chain) come from the shared registry
+            current_font = get_font(font_path, current_font_size)
             
             # Wrap text based on BOUNDARY width
             avg_char_width = current_font_size / 1.7  # Slightly reduced for better wrapping
@@ -129,62 +277,16 @@ def draw_title_on_template(template_path, title_text, output_path,
 
 # Updated function to create subtitle images using Pillow (No wrapping)
 def create_subtitle_image(text, output_path, width, # width param might become less relevant now
-                          font_path='src/assets/Montserrat-Black.ttf', 
-                          font_size=90, text_color=(255, 255, 255),
+                          font_path=CAPTION_FONT_PATH, 
+                          font_size=CAPTION_FONT_SIZE, text_color=(255, 255, 255),
                           padding=20, 
                           outline_color=(0, 0, 0), outline_width=2):
     """Creates a transparent PNG image for a subtitle chunk (single line).
-    Features white text with a black outline.
+    Features white text with a black outline (drawn by caption_rasterizer.draw_caption).
     """
     try:
-        try:
-            font = ImageFont.truetype(font_path, font_size)
-        except IOError:
-            print(f"Warning: Subtitle Font '{font_path}' not found in assets. Trying default Arial...")
-            try:
-                 font = ImageFont.truetype('C:/Windows/Fonts/arial.ttf', font_size)
-            except IOError:
-                print("Warning: Arial font not found either. Using default Pillow font for subtitles.")
-                font = ImageFont.load_default()
-
-        # --- Remove Text wrapping --- 
-        # avg_char_width = font_size / 1.8
-        # max_chars_per_line = math.floor((width - 2 * padding) / avg_char_width)
-        # if max_chars_per_line <= 0: max_chars_per_line = 10
-        # wrapped_text = textwrap.fill(text, width=max_chars_per_line)
-        # Use the raw text chunk directly
-        unwrapped_text = text 
-
-        # Determine text bounding box using the unwrapped text
-        text_bbox = font.getbbox(unwrapped_text) 
-        text_width = text_bbox[2] - text_bbox[0]
-        text_height = text_bbox[3] - text_bbox[1] 
-
-        # Add padding for outline and spacing
-        effective_padding_x = padding + outline_width
-        effective_padding_y = padding + outline_width + int(font_size * 0.1) # Extra bottom padding
-        img_width = text_width + 2 * effective_padding_x
-        img_height = text_height + 2 * effective_padding_y
-        
-        # Create TRANSPARENT image 
-        img = Image.new('RGBA', (img_width, img_height), color=(0, 0, 0, 0)) 
-        draw = ImageDraw.Draw(img)
-
-        # --- Draw Outline --- 
-        draw_x = effective_padding_x
-        draw_y = effective_padding_y - text_bbox[1] # Adjust y by the bbox top offset
-        for x_offset in range(-outline_width, outline_width + 1):
-            for y_offset in range(-outline_width, outline_width + 1):
-                if x_offset == 0 and y_offset == 0:
-                    continue
-                # Draw outline using unwrapped text
-                draw.text((draw_x + x_offset, draw_y + y_offset), 
-                          unwrapped_text, font=font, fill=outline_color, align="left") # Align doesn't matter much for single line
-
-        # --- Draw Main Text (Centered horizontally by drawing coords) --- 
-        # Draw main text using unwrapped text
-        draw.text((draw_x, draw_y), 
-                  unwrapped_text, font=font, fill=text_color, align="left") # Align doesn't matter much for single line
+        img = draw_caption(text, font_path=font_path, font_size=font_size, text_color=text_color,
+                           padding=padding, outline_color=outline_color, outline_width=outline_width)
 
         # Ensure output directory exists
         output_dir = os.path.dirname(output_path)
@@ -199,217 +301,219 @@ def create_subtitle_image(text, output_path, width, # width param might become l
         print(f"Error creating subtitle image for '{text[:20]}...': {e}")
         return False, None
 
-# --- Main Video Creation Function ---
+def _rendered_captions(caption_rasters, caption_timings):
+    """Pairs streamed caption rasters with their timings, skipping captions that failed to draw."""
+    for raster, (chunk_text, chunk_start_time, chunk_duration) in zip(caption_rasters, caption_timings):
+        if raster is None:
+            print(f"    Skipping caption '{chunk_text}' due to image error.")
+            continue
+        yield raster, chunk_start_time, chunk_duration
+
+# --- Main Video Creation Functions ---
+
+def render_video(plan, output_path, render_profile=None, background_video_path=None, scratch_dir=None,
+                 plan_root=None, narration_pcm=None, concurrency=1, cancel_token=None):
+    """Renders a render plan (see render_plan.py): mixes the audio, draws the title card and
+    captions, composites them over the background and encodes. Decides nothing about timing.
 
-def create_video(audio_path, background_video_path, title_text, story_text, 
-                 word_timestamps, music_path, output_path, 
-                 target_aspect_ratio=9/16, music_volume=0.15):
-    """Combines narration, background video, title card, captions, and background music.
-    
     Args:
-        audio_path (str): Path to the narration audio file.
-        background_video_path (str): Path to the background video file.
-        title_text (str): Original title text for visual card.
-        story_text (str): Original story text (used for reference, not timing).
-        word_timestamps (list): List of {'word', 'start', 'end'} dicts from Whisper.
-        music_path (str or None): Path to the background music file, or None.
+        plan (dict): Render plan from render_plan.plan_render (or loaded with load_render_plan).
         output_path (str): Path to save the output video file.
-        target_aspect_ratio (float): Target aspect ratio for the video.
-        music_volume (float): Volume multiplier for background music (0.0 to 1.0).
+        render_profile (str or None): Render with this profile instead of the plan's.
+        background_video_path (str or None): Render over this background instead of the plan's.
+        scratch_dir (str or None): Job scratch directory for intermediates (title card,
+            mixed audio). The caller owns and removes it. If None, a private one is created and removed.
+        plan_root (str or None): The root the plan was made with (see render_plan.plan_render);
+            the plan's narration and title card paths are relative to it.
+        narration_pcm (np.ndarray or None): Narration already decoded at MIX_SAMPLE_RATE (see
+            audio_mixer.decode_audio), so the plan's narration isn't decoded again.
+        concurrency (int): Renders running on this host at the same time (including this one);
+            the encoder gets its share of the cores.
+        cancel_token (CancelToken or None): The job's cancellation token. Once cancelled, the
+            encode stops within a frame, partial outputs are removed and JobCancelled is raised.
 
     Returns:
         bool: True if video creation was successful, False otherwise.
+
+    Raises:
+        JobCancelled: If `cancel_token` was cancelled.
     """
-    # Define fixed video dimensions for 9:16
-    target_width = 1080
-    target_height = 1920
+    # Output dimensions come from the render profile; layout is scaled to match
+    render_profile = render_profile or plan["profile"] or DEFAULT_RENDER_PROFILE
+    if render_profile not in RENDER_PROFILES:
+        print(f"Error: Unknown render profile '{render_profile}'. Valid options are: {', '.join(RENDER_PROFILES)}")
+        return False
+    profile = RENDER_PROFILES[render_profile]
+    unknown_framings = [framing for framing in plan["framings"] if framing not in OUTPUT_FRAMINGS]
+    if unknown_framings:
+        print(f"Error: Unknown output framing(s) {', '.join(unknown_framings)}. Valid options are: {', '.join(OUTPUT_FRAMINGS)}")
+        return False
+    target_width = profile["width"]
+    target_height = profile["height"]
+    layout_scale = target_width / LAYOUT_WIDTH
+    background_video_path = background_video_path or plan["background"]["path"]
+    audio = plan["audio"]
+    title = plan["title"]
     # Adjust default template path
     title_template_path = "src/assets/title_template.png"
-    temp_titled_card_path = os.path.join(os.path.dirname(output_path), "temp_titled_card.png")
+    # Every intermediate goes in the job's scratch directory; only the final MP4 goes to output_path
+    owns_scratch_dir = scratch_dir is None
+    if owns_scratch_dir:
+        scratch_dir = create_scratch_dir(os.path.splitext(os.path.basename(output_path))[0])
+    narration_path = resolve_plan_path(audio["narration_path"], plan_root)
+    title_card_path = resolve_plan_path(title["card_path"], plan_root)
+    temp_titled_card_path = title_card_path or os.path.join(scratch_dir, "titled_card.png")
+    mixed_audio_path = os.path.join(scratch_dir, "mixed_audio.m4a")
+    estimated_title_speak_duration = title["end"]
 
     # Initialize clips
-    narration_clip = None # Renamed from audio_clip for clarity
-    music_clip = None
-    composite_audio = None
+    background_clip = None
     video_clip = None
     title_card_clip = None
     subtitle_clips = []
-    temp_subtitle_files = []
+    caption_timings = [] # (text, start, duration) per caption
+    caption_rasters = iter(())
     final_clip = None
+    output_paths = {}
 
     try:
-        print(f"Starting video creation with background music...")
-
-        # 1. Load Narration Audio
-        if not os.path.exists(audio_path):
-            raise FileNotFoundError(f"Narration audio file not found: {audio_path}")
-        narration_clip = mp.AudioFileClip(audio_path)
-        narration_duration = narration_clip.duration # Use this as the main duration reference
-        print(f"Narration audio loaded. Duration: {narration_duration:.2f} seconds")
-
-        # 2. Load Background Music (if path provided)
-        if music_path and os.path.exists(music_path):
-            print(f"Loading background music from: {music_path}")
-            music_clip = mp.AudioFileClip(music_path)
-            print(f"  Original music duration: {music_clip.duration:.2f}s")
-            # Reduce volume
-            music_clip = music_clip.volumex(music_volume)
-            print(f"  Music volume adjusted to {music_volume*100}%")
-            # Loop if necessary
-            if music_clip.duration < narration_duration:
-                loops = int(narration_duration / music_clip.duration) + 1
-                music_clip = mp.concatenate_audioclips([music_clip] * loops)
-                print(f"  Music looped {loops} times.")
-            # Trim to narration duration
-            music_clip = music_clip.subclip(0, narration_duration)
-            print(f"  Music trimmed to narration duration: {music_clip.duration:.2f}s")
-            # Create composite audio
-            composite_audio = mp.CompositeAudioClip([narration_clip, music_clip])
-            print("Narration and background music combined.")
-        else:
-            if music_path:
-                print(f"Warning: Background music file not found at '{music_path}'. Skipping music.")
-            else:
-                print("No background music path provided. Skipping music.")
-            # Use only narration if no music
-            composite_audio = narration_clip 
-
-        # 3. Estimate Title Speak Duration (using word timestamps)
-        spoken_title_text = re.sub(r'\bAITA\b\??', 'Am I the asshole?', title_text, flags=re.IGNORECASE)
-        spoken_title_word_list = spoken_title_text.split()
-        title_word_count = len(spoken_title_word_list)
-        estimated_title_speak_duration = 0
-        if title_word_count > 0 and len(word_timestamps) >= title_word_count:
-            try:
-                 estimated_title_speak_duration = word_timestamps[title_word_count - 1]['end']
-            except IndexError:
-                 total_narration_word_count = len(word_timestamps)
-                 if total_narration_word_count > 0:
-                     estimated_title_speak_duration = (title_word_count / total_narration_word_count) * narration_duration
-                 else: 
-                     estimated_title_speak_duration = 3.0
-        else:
-             estimated_title_speak_duration = 3.0 
-        if estimated_title_speak_duration < 0.1: estimated_title_speak_duration = 0.5
+        print(f"Starting video creation with background music (profile: {render_profile}, {target_width}x{target_height})...")
+
+        # 1-2. Mix Narration and Background Music into the final audio track
+        success, mixed_audio_path, narration_duration = create_mixed_track(
+            narration_path, audio["music_path"], mixed_audio_path, music_volume=audio["music_volume"],
+            duck_amount=audio["duck_amount"], narration_pcm=narration_pcm)
+        if not success: raise RuntimeError("Failed to create mixed audio track.")
+
+        # 3. Title end time comes from the plan
         print(f"  Estimated title end time from Whisper: {estimated_title_speak_duration:.2f}s")
 
-        # 4. Create Dynamic Title Card Image
-        success, final_title_card_path = draw_title_on_template(
-            title_template_path, 
-            title_text, 
-            temp_titled_card_path,
-            max_font_size=48,
-            min_font_size=36,
-            boundary_x=150,
-            boundary_y=910,
-            boundary_width=780,
-            boundary_max_height=160,
-            debug_boundary=False  # Turn off debugging for production
-        )
+        # 4. Create Dynamic Title Card Image (reused if a previous attempt already drew it)
+        if title_card_path and os.path.exists(title_card_path):
+            success, final_title_card_path = True, title_card_path
+            print(f"  Reusing title card: {title_card_path}")
+        else:
+            success, final_title_card_path = draw_title_on_template(
+                title_template_path, 
+                title["text"], 
+                temp_titled_card_path,
+                max_font_size=TITLE_MAX_FONT_SIZE,
+                min_font_size=TITLE_MIN_FONT_SIZE,
+                boundary_x=150,
+                boundary_y=910,
+                boundary_width=780,
+                boundary_max_height=160,
+                debug_boundary=False  # Turn off debugging for production
+            )
         if not success: raise RuntimeError("Failed to create dynamic title card image.")
-        title_card_clip = mp.ImageClip(final_title_card_path)
-        title_card_clip = title_card_clip.set_duration(estimated_title_speak_duration) 
-        title_card_clip = title_card_clip.set_position(('center', 'center'))
-        title_card_clip = title_card_clip.set_start(0)
         print(f"Dynamic title card configured for duration: {estimated_title_speak_duration:.2f}s.")
+        if cancel_token is not None: cancel_token.check()
 
-        # 5. Load and Prepare Background Video (using narration_duration)
+        # 5. Check the Background Video and pick the output frame rate
         if not os.path.exists(background_video_path): raise FileNotFoundError(f"BG video not found: {background_video_path}")
-        video_clip = mp.VideoFileClip(background_video_path)
-        if video_clip.duration < narration_duration:
-            num_loops = int(narration_duration // video_clip.duration) + 1
+        background_infos = ffmpeg_parse_infos(background_video_path)
+        output_fps = background_infos["video_fps"]
+        if profile["max_fps"] and output_fps > profile["max_fps"]:
+            output_fps = profile["max_fps"]
+        # The background loops, so an offset past its end wraps around
+        background_offset = plan["background"]["offset"] % background_infos["duration"] if background_infos.get("duration") else 0.0
+
+        # Encoder preset and threads for this host, this job's length and the renders running beside it
+        encoder_settings = choose_encoder_settings(profile, narration_duration, concurrency=concurrency, fps=output_fps)
+        encoder_description = (f"preset {encoder_settings['preset']}, crf {encoder_settings['crf']}, "
+                               f"threads {encoder_settings['threads']}")
+        if encoder_settings["estimated_seconds"] is not None:
+            encoder_description += f", ~{encoder_settings['estimated_seconds']:.0f}s encode"
+
+        # 6. Rasterize the planned captions: a worker pool draws them in order, and they are
+        # consumed as they arrive, so compositing starts while later captions are still drawn
+        print("Generating subtitle images using Whisper timestamps...")
+        output_dir = os.path.dirname(output_path)
+        captions = plan["captions"]
+        if len(captions["start"]) == 0:
+            print("Warning: No word timestamps remaining after skipping estimated title words.")
+        else:
+            print(f"  Starting first story caption around: {captions['start'][0]:.2f}s")
+            caption_timings = list(zip(captions["text"], captions["start"], captions["duration"]))
+            for chunk_text, chunk_start_time, chunk_duration in caption_timings:
+                print(f"    Queued caption: '{chunk_text}' @ {chunk_start_time:.2f}s (Duration: {chunk_duration:.2f}s)")
+            caption_rasters = rasterize_captions(captions["text"], layout_scale)
+
+        # 7. Write Final Video
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        extra_framings = [framing for framing in dict.fromkeys(plan["framings"]) if framing != PRIMARY_FRAMING]
+        output_paths = {framing: framing_output_path(output_path, framing)
+                        for framing in [PRIMARY_FRAMING] + extra_framings}
+        if RENDER_BACKEND == "frame_sink":
+            sink = FrameSink(target_width, target_height, output_fps, narration_duration)
+            sink.add_overlay(Overlay.from_image(final_title_card_path, layout_scale, 0, estimated_title_speak_duration,
+                                                target_width, target_height))
+            caption_overlays = (Overlay.centered(raster, chunk_start_time, chunk_duration, target_width, target_height)
+                                for raster, chunk_start_time, chunk_duration in
+                                _rendered_captions(caption_rasters, caption_timings))
+            print(f"Writing final video to {output_path} ({output_fps:g} fps, {encoder_description})...")
+            if extra_framings:
+                print(f"  Also writing {', '.join(extra_framings)} framings in the same pass.")
+            sink.render(background_video_path,
+                        encoder_command(target_width, target_height, output_fps, mixed_audio_path, output_paths, encoder_settings),
+                        overlay_stream=caption_overlays, cancel_token=cancel_token, background_offset=background_offset)
+            sink.report()
+            print(f"Video created successfully: {output_path}")
+            return True
+
+        print("Compositing final video...")
+        background_clip = mp.VideoFileClip(background_video_path)
+        video_clip = background_clip
+        if video_clip.duration < background_offset + narration_duration:
+            num_loops = int((background_offset + narration_duration) // video_clip.duration) + 1
             video_clip = mp.concatenate_videoclips([video_clip] * num_loops)
-        video_clip = video_clip.subclip(0, narration_duration)
+        video_clip = video_clip.subclip(background_offset, background_offset + narration_duration)
         video_clip = video_clip.resize(height=target_height)
         crop_width_bg = target_width
         x_center_bg = video_clip.w / 2
         x1_bg = x_center_bg - crop_width_bg / 2
         video_clip = video_clip.crop(x1=x1_bg, width=crop_width_bg)
-
-        # 6. Generate Subtitle Images and Clips using Whisper Timestamps
-        print("Generating subtitle images and clips using Whisper timestamps...")
-        MAX_WORDS_PER_CAPTION = 2 # Reduced words per chunk
-        MIN_GAP_BETWEEN_CAPTIONS = 0.1 
-        output_dir = os.path.dirname(output_path)
-        base_filename = os.path.splitext(os.path.basename(output_path))[0]
-        current_chunk_words = []
-        chunk_start_time = -1
-        last_word_end_time = 0
-        story_word_timestamps = word_timestamps[title_word_count:]
-        if not story_word_timestamps:
-            print("Warning: No word timestamps remaining after skipping estimated title words.")
-        else:
-             chunk_start_time = story_word_timestamps[0]['start'] 
-             print(f"  Starting first story caption around: {chunk_start_time:.2f}s")
-             for i, word_info in enumerate(story_word_timestamps):
-                 word_text = word_info['word']
-                 start_time = word_info['start']
-                 end_time = word_info['end']
-                 is_new_chunk = False
-                 if not current_chunk_words: is_new_chunk = True
-                 elif len(current_chunk_words) >= MAX_WORDS_PER_CAPTION: is_new_chunk = True
-                 elif (start_time - last_word_end_time) >= MIN_GAP_BETWEEN_CAPTIONS: is_new_chunk = True
-                 if is_new_chunk and current_chunk_words:
-                     chunk_text = " ".join(current_chunk_words)
-                     chunk_end_time = last_word_end_time
-                     chunk_duration = chunk_end_time - chunk_start_time
-                     if chunk_duration <= 0.05: chunk_duration = 0.1
-                     temp_img_path = os.path.join(output_dir, f"{base_filename}_temp_sub_{len(subtitle_clips)}.png")
-                     success, img_path = create_subtitle_image(chunk_text, temp_img_path, width=target_width - 100)
-                     if success:
-                         temp_subtitle_files.append(img_path)
-                         img_clip = mp.ImageClip(img_path, ismask=False, transparent=True)
-                         img_clip = img_clip.set_start(chunk_start_time)
-                         img_clip = img_clip.set_duration(chunk_duration)
-                         img_clip = img_clip.set_position(('center', 'center'))
-                         subtitle_clips.append(img_clip)
-                         print(f"    Created caption: '{chunk_text}' @ {chunk_start_time:.2f}s (Duration: {chunk_duration:.2f}s)")
-                     else: print(f"    Skipping caption '{chunk_text}' due to image error.")
-                     current_chunk_words = [word_text]
-                     chunk_start_time = start_time
-                 else:
-                     current_chunk_words.append(word_text)
-                     if len(current_chunk_words) == 1: chunk_start_time = start_time
-                 last_word_end_time = end_time
-             if current_chunk_words:
-                 chunk_text = " ".join(current_chunk_words)
-                 chunk_end_time = last_word_end_time
-                 chunk_duration = chunk_end_time - chunk_start_time
-                 if chunk_duration <= 0.05: chunk_duration = 0.1
-                 temp_img_path = os.path.join(output_dir, f"{base_filename}_temp_sub_{len(subtitle_clips)}.png")
-                 success, img_path = create_subtitle_image(chunk_text, temp_img_path, width=target_width - 100)
-                 if success:
-                     temp_subtitle_files.append(img_path)
-                     img_clip = mp.ImageClip(img_path, ismask=False, transparent=True)
-                     img_clip = img_clip.set_start(chunk_start_time)
-                     img_clip = img_clip.set_duration(chunk_duration)
-                     img_clip = img_clip.set_position(('center', 'center'))
-                     subtitle_clips.append(img_clip)
-                     print(f"    Created final caption: '{chunk_text}' @ {chunk_start_time:.2f}s (Duration: {chunk_duration:.2f}s)")
-                 else: print(f"    Skipping final caption '{chunk_text}' due to image error.")
-
-        # 7. Composite Video
-        print("Compositing final video...")
+        title_card_clip = mp.ImageClip(final_title_card_path)
+        if layout_scale != 1: title_card_clip = title_card_clip.resize(layout_scale)
+        title_card_clip = title_card_clip.set_duration(estimated_title_speak_duration) 
+        title_card_clip = title_card_clip.set_position(('center', 'center'))
+        title_card_clip = title_card_clip.set_start(0)
+        # Rasters are already at output scale
+        for raster, chunk_start_time, chunk_duration in _rendered_captions(caption_rasters, caption_timings):
+            img_clip = mp.ImageClip(raster, ismask=False, transparent=True)
+            img_clip = img_clip.set_start(chunk_start_time)
+            img_clip = img_clip.set_duration(chunk_duration)
+            img_clip = img_clip.set_position(('center', 'center'))
+            subtitle_clips.append(img_clip)
         clips_to_composite = [video_clip, title_card_clip] + subtitle_clips
         final_clip = mp.CompositeVideoClip(clips_to_composite, size=(target_width, target_height))
-        
-        # Set the COMPOSITE audio (narration + music)
-        final_clip = final_clip.set_audio(composite_audio) 
-        print("Video layers composited and final audio attached.")
-
-        # 8. Write Final Video
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        print(f"Writing final video to {output_path}...")
-        final_clip.write_videofile(
-            output_path, codec='libx264', audio_codec='aac',
-            temp_audiofile='temp-audio.m4a', remove_temp=True,
-            preset='medium', ffmpeg_params=["-crf", "23"], threads=4
-        )
+        print("Video layers composited; mixed audio track will be muxed in.")
+        print(f"Writing final video to {output_path} ({output_fps:g} fps, {encoder_description})...")
+        if extra_framings:
+            # One frame loop feeds every framing; ffmpeg encodes the variants side by side
+            print(f"  Also writing {', '.join(extra_framings)} framings in the same pass.")
+            write_framings(final_clip, output_fps, mixed_audio_path, output_paths, encoder_settings, cancel_token)
+        else:
+            # Passing the pre-mixed track as a filename makes ffmpeg copy it in as-is
+            final_clip.write_videofile(
+                output_path, fps=output_fps, codec='libx264', audio=mixed_audio_path,
+                preset=encoder_settings["preset"], threads=encoder_settings["threads"],
+                # faststart moves the moov atom to the front so players can start before the download finishes
+                ffmpeg_params=["-crf", str(encoder_settings["crf"]), "-movflags", "+faststart"],
+                logger=CancellableBarLogger(cancel_token) if cancel_token is not None else "bar"
+            )
 
         print(f"Video created successfully: {output_path}")
         return True
 
+    except JobCancelled:
+        print("Video creation cancelled; removing partial output.")
+        for path in output_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
     except Exception as e:
         print(f"An error occurred during video creation: {e}")
         import traceback
@@ -418,27 +522,76 @@ def create_video(audio_path, background_video_path, title_text, story_text,
     
     finally:
         print("Cleaning up resources...")
+        # Stop rasterizing captions nobody will draw (after an error)
+        if hasattr(caption_rasters, 'close'): caption_rasters.close()
         # Close all clips
-        if narration_clip: narration_clip.close()
-        if music_clip: music_clip.close()
-        # CompositeAudioClip doesn't have explicit close, components closed above/below
         if video_clip: video_clip.close()
+        # Looping replaces video_clip, so close the source's ffmpeg reader explicitly
+        if background_clip: background_clip.close()
         if title_card_clip: title_card_clip.close()
         for clip in subtitle_clips: 
             if hasattr(clip, 'reader'): clip.close()
             elif hasattr(clip, 'close'): clip.close()
         if final_clip and hasattr(final_clip, 'close'): final_clip.close()
-        # Remove temp files
-        print(f"Cleaning up {len(temp_subtitle_files)} temporary subtitle images...")
-        for temp_file in temp_subtitle_files:
-            if os.path.exists(temp_file):
-                try: os.remove(temp_file)
-                except OSError as e: print(f"Error removing temp subtitle file {temp_file}: {e}")
-        if os.path.exists(temp_titled_card_path):
-            try: 
-                os.remove(temp_titled_card_path)
-                print(f"Removed temp dynamic title card: {temp_titled_card_path}")
-            except OSError as e: print(f"Error removing temp dynamic title card {temp_titled_card_path}: {e}")
+        # Intermediates go with the scratch directory
+        if owns_scratch_dir:
+            remove_scratch_dir(scratch_dir)
+
+def create_video(audio_path, background_video_path, title_text, story_text, 
+                 word_timestamps, music_path, output_path, 
+                 target_aspect_ratio=9/16, music_volume=0.15, duck_amount=0.0,
+                 render_profile=DEFAULT_RENDER_PROFILE, caption_plan=None, scratch_dir=None,
+                 narration_pcm=None, extra_framings=(), concurrency=1, title_card_path=None,
+                 cancel_token=None):
+    """Combines narration, background video, title card, captions, and background music.
+
+    Plans the video (render_plan.plan_render) and renders the plan (render_video) in one go.
+    
+    Args:
+        audio_path (str): Path to the narration audio file.
+        background_video_path (str): Path to the background video file.
+        title_text (str): Original title text for visual card.
+        story_text (str): Original story text (used for reference, not timing).
+        word_timestamps (list): List of {'word', 'start', 'end'} dicts from Whisper.
+        music_path (str or None): Path to the background music file, or None.
+        output_path (str): Path to save the output video file.
+        target_aspect_ratio (float): Target aspect ratio for the video.
+        music_volume (float): Volume multiplier for background music (0.0 to 1.0).
+        duck_amount (float): How much to lower the music while narration is speaking (0.0 to 1.0).
+        render_profile (str): Name of a profile in RENDER_PROFILES ("final" or "draft").
+        caption_plan (CaptionPlan or None): Precomputed plan over `word_timestamps`. Planned here if None.
+        scratch_dir (str or None): Job scratch directory for intermediates (title card,
+            mixed audio). The caller owns and removes it. If None, a private one is created and removed.
+        narration_pcm (np.ndarray or None): Narration already decoded at MIX_SAMPLE_RATE (see
+            audio_mixer.decode_audio), so `audio_path` isn't decoded again.
+        extra_framings (iterable): Additional framings from OUTPUT_FRAMINGS (e.g. "1:1", "16:9")
+            encoded in the same pass; each is written to framing_output_path(output_path, framing).
+        concurrency (int): Renders running on this host at the same time (including this one);
+            the encoder gets its share of the cores.
+        title_card_path (str or None): Where the drawn title card is kept. If the file already
+            exists (a resumed job), it is reused instead of drawn again. Defaults to the scratch directory.
+        cancel_token (CancelToken or None): The job's cancellation token. Once cancelled, the
+            encode stops within a frame, partial outputs are removed and JobCancelled is raised.
+
+    Returns:
+        bool: True if video creation was successful, False otherwise.
+
+    Raises:
+        JobCancelled: If `cancel_token` was cancelled.
+    """
+    try:
+        # The plan needs the narration's length; decode it once and hand the samples to the mix
+        if narration_pcm is None:
+            narration_pcm = decode_audio(audio_path, channels=1)
+        plan = plan_render(title_text, word_timestamps, audio_path, background_video_path,
+                           music_path=music_path, music_volume=music_volume, duck_amount=duck_amount,
+                           render_profile=render_profile, extra_framings=extra_framings, caption_plan=caption_plan,
+                           narration_duration=narration_pcm.shape[0] / MIX_SAMPLE_RATE, title_card_path=title_card_path)
+    except Exception as e:
+        print(f"An error occurred while planning the video: {e}")
+        return False
+    return render_video(plan, output_path, scratch_dir=scratch_dir, narration_pcm=narration_pcm,
+                        concurrency=concurrency, cancel_token=cancel_token)
 
 # --- Example Usage Update --- 
 if __name__ == '__main__':
@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Add the src directory to the Python path to allow importing main
+src_dir = os.path.dirname(os.path.abspath(__file__))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from main import run_pipeline, render_job, resume_job
+from cancellation import cancel_job, JobCancelled
+from video_creator import OUTPUT_FRAMINGS, PRIMARY_FRAMING, framing_output_path
+from font_registry import prewarm_fonts
+
+# --- Worker Settings ---
+DEFAULT_SERVER_URL = os.getenv("REELIT_SERVER_URL", "http://127.0.0.1:5000")
+WORKER_TOKEN = os.getenv("REELIT_WORKER_TOKEN", "") # Must match the web tier's token, if it sets one
+POLL_SECONDS = 2 # Wait between lease attempts while the queue is empty
+REQUEST_TIMEOUT_SECONDS = 30
+UPLOAD_TIMEOUT_SECONDS = 600
+
+class LeaseLost(Exception):
+    """The web tier re-queued the job (this worker's lease expired)."""
+
+class WorkerClient:
+    """Minimal JSON-over-HTTP client for the web tier's /workers API."""
+
+    def __init__(self, server_url, token=WORKER_TOKEN):
+        self.server_url = server_url.rstrip("/")
+        self.token = token
+        self.worker_id = None
+
+    def _request(self, method, path, payload=None, data=None, headers=None, timeout=REQUEST_TIMEOUT_SECONDS):
+        headers = dict(headers or {})
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        if self.token:
+            headers["X-Reelit-Worker-Token"] = self.token
+        request = urllib.request.Request(self.server_url + path, data=data, method=method, headers=headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            return response.status, (json.loads(body) if body else None)
+
+    def register(self, name, shared_output):
+        status, reply = self._request("POST", "/workers/register", {"name": name, "shared_output": shared_output})
+        self.worker_id = reply["worker_id"]
+        return reply
+
+    def lease(self):
+        status, reply = self._request("POST", f"/workers/{self.worker_id}/lease", {})
+        return reply["job"] if status == 200 else None
+
+    def heartbeat(self, job_id=None, logs=()):
+        """Returns {"lease_held", "cancelled"}."""
+        status, reply = self._request("POST", f"/workers/{self.worker_id}/heartbeat",
+                                      {"job_id": job_id, "logs": list(logs)})
+        return reply
+
+    def upload(self, job_id, path, filename=None):
+        """Streams a finished file to the web tier's output directory (as `filename`, if given)."""
+        filename = urllib.parse.quote(filename or os.path.basename(path))
+        with open(path, "rb") as f:
+            self._request("PUT", f"/workers/{self.worker_id}/jobs/{job_id}/files/{filename}", data=f,
+                          headers={"Content-Type": "video/mp4", "Content-Length": str(os.path.getsize(path))},
+                          timeout=UPLOAD_TIMEOUT_SECONDS)
+
+    def complete(self, job_id, result_files):
+        self._request("POST", f"/workers/{self.worker_id}/jobs/{job_id}/complete", {"result_files": result_files})
+
+    def fail(self, job_id, error):
+        self._request("POST", f"/workers/{self.worker_id}/jobs/{job_id}/fail", {"error": error})
+
+class LogForwarder:
+    """Tees stdout and buffers lines for the next heartbeat."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._lines = []
+
+    def write(self, message):
+        self.stream.write(message)
+        lines = [line.strip() for line in message.splitlines() if line.strip()]
+        if lines:
+            with self._lock:
+                self._lines.extend(lines)
+
+    def flush(self):
+        self.stream.flush()
+
+    def drain(self):
+        with self._lock:
+            lines, self._lines = self._lines, []
+        return lines
+
+def _heartbeat_loop(client, job_id, forwarder, interval, stop_event, lease_lost, cancelled):
+    """Renews the lease and forwards logs until the job finishes.
+
+    If the lease is gone (expired, or the job was cancelled on the web tier), the job's
+    in-flight work is cancelled so the worker is free for the next lease within seconds.
+    """
+    while not stop_event.wait(interval):
+        try:
+            reply = client.heartbeat(job_id, forwarder.drain())
+            if not reply["lease_held"]:
+                if reply.get("cancelled"):
+                    cancelled.set()
+                lease_lost.set()
+                cancel_job(job_id)
+                return
+        except (urllib.error.URLError, OSError) as e:
+            # Keep rendering; the lease survives a few missed heartbeats
+            print(f"Heartbeat failed: {e}", file=forwarder.stream)
+
+def _result_paths(result):
+    """Every file a pipeline result produced: each video and its extra framings."""
+    videos = result if isinstance(result, list) else [result]
+    paths = []
+    for video in videos:
+        for framing in OUTPUT_FRAMINGS:
+            path = framing_output_path(video, framing)
+            if framing == PRIMARY_FRAMING or os.path.exists(path):
+                paths.append(path)
+    return videos, paths
+
+def _upload_name(job_id, path):
+    """Name a result file is uploaded under. The web tier only accepts outputs named after their
+    job, so a file reused from another job's render (a render cache hit) gets this job's id in front."""
+    filename = os.path.basename(path)
+    return filename if filename.startswith(job_id) else f"{job_id}_{filename}"
+
+def run_leased_job(client, job, shared_output, heartbeat_seconds):
+    """Runs one leased job, then uploads (or just reports) its outputs."""
+    job_id = job["job_id"]
+    forwarder = LogForwarder(sys.stdout)
+    stop_event = threading.Event()
+    lease_lost = threading.Event()
+    cancelled = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, daemon=True,
+                                 args=(client, job_id, forwarder, heartbeat_seconds, stop_event, lease_lost, cancelled))
+    heartbeat.start()
+    original_stdout = sys.stdout
+    sys.stdout = forwarder
+    error = None
+    try:
+        print(f"Worker running {job['kind']} job {job_id}")
+        if job["kind"] == "promote":
+            result = render_job(job_id, **job["params"])
+        elif job["kind"] == "resume":
+            result = resume_job(job_id)
+        else:
+            result = run_pipeline(job_id=job_id, **job["params"])
+        if lease_lost.is_set():
+            raise LeaseLost()
+        if not result:
+            raise RuntimeError("Generation completed but no result file was produced.")
+        videos, paths = _result_paths(result)
+        result_files = [os.path.basename(video) for video in videos]
+        if not shared_output:
+            for path in paths:
+                print(f"Uploading {_upload_name(job_id, path)}...")
+                client.upload(job_id, path, _upload_name(job_id, path))
+            result_files = [_upload_name(job_id, video) for video in videos]
+    except LeaseLost:
+        error = "lease lost"
+    except JobCancelled:
+        error = "cancelled"
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        print(f"Job {job_id} failed: {error}")
+    finally:
+        stop_event.set()
+        sys.stdout = original_stdout
+        heartbeat.join()
+
+    if cancelled.is_set():
+        print(f"Job {job_id} was cancelled; discarding its work.")
+        return
+    if lease_lost.is_set():
+        print(f"Lease on job {job_id} was lost; discarding its result.")
+        return
+    client.heartbeat(job_id, forwarder.drain())
+    if error:
+        client.fail(job_id, error)
+        return
+    client.complete(job_id, result_files)
+    print(f"Job {job_id} completed.")
+
+def run_worker(server_url, name, shared_output):
+    """Registers with the web tier and renders leased jobs until interrupted."""
+    client = WorkerClient(server_url)
+    prewarm_fonts()
+    heartbeat_seconds = None
+    while True:
+        try:
+            if client.worker_id is None:
+                reply = client.register(name, shared_output)
+                heartbeat_seconds = reply["heartbeat_seconds"]
+                print(f"Registered with {server_url} as {client.worker_id}.")
+            job = client.lease()
+            if job is None:
+                client.heartbeat()
+                time.sleep(POLL_SECONDS)
+                continue
+            run_leased_job(client, job, shared_output, heartbeat_seconds)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                # The web tier restarted or dropped us after missed heartbeats
+                print("Worker is no longer registered; registering again.")
+                client.worker_id = None
+            else:
+                print(f"Web tier returned HTTP {e.code}: {e.read().decode(errors='ignore')[:200]}")
+                time.sleep(POLL_SECONDS)
+        except (urllib.error.URLError, OSError) as e:
+            print(f"Cannot reach {server_url}: {e}. Retrying in {POLL_SECONDS}s.")
+            time.sleep(POLL_SECONDS)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Render jobs queued by the Reelit web tier.")
+    parser.add_argument("--server", default=DEFAULT_SERVER_URL, help=f"Web tier URL (default: {DEFAULT_SERVER_URL})")
+    parser.add_argument("--name", default=f"{socket.gethostname()}-{os.getpid()}", help="Name shown in the web tier")
+    parser.add_argument("--shared-output", action="store_true",
+                        help="src/output is the web tier's own output directory (same host or shared "
+                             "mount): report results instead of uploading them, and accept promotions")
+    args = parser.parse_args()
+    try:
+        run_worker(args.server, args.name, args.shared_output)
+    except KeyboardInterrupt:
+        print("Worker stopped.")
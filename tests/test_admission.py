@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import admission
+from admission import AdmissionController, estimate_job_cost
+
+GB = 1024 ** 3
+
+def _cost(memory_gb, cores=2.0, seconds=60):
+    return {"memory_bytes": int(memory_gb * GB), "cpu_cores": cores, "seconds": seconds}
+
+@pytest.fixture(autouse=True)
+def unknown_free_memory(monkeypatch):
+    # Only the reservation budgets apply, whatever this host has free
+    monkeypatch.setattr(admission, "available_memory_bytes", lambda: None)
+
+def test_jobs_are_admitted_while_they_fit_and_queued_after():
+    controller = AdmissionController(memory_budget_bytes=4 * GB, cpu_budget=4)
+    assert controller.submit("a", _cost(1.5))["decision"] == "admitted"
+    assert controller.submit("b", _cost(1.5))["decision"] == "admitted"
+    queued = controller.submit("c", _cost(1.5))
+    assert queued["decision"] == "queued" and queued["queue_position"] == 1
+    assert queued["retry_after"] >= 1
+    controller.release("a")
+    assert controller.status("c")["state"] == "running"
+    assert controller.snapshot()["running"] == ["b", "c"]
+
+def test_queue_is_first_in_first_out():
+    controller = AdmissionController(memory_budget_bytes=4 * GB, cpu_budget=8)
+    controller.submit("big", _cost(3))
+    assert controller.submit("large", _cost(2))["decision"] == "queued"
+    # Would fit now, but must not jump ahead of the job already waiting
+    assert controller.submit("small", _cost(0.5))["decision"] == "queued"
+    controller.release("big")
+    assert controller.snapshot()["running"] == ["large", "small"]
+
+def test_cpu_budget_limits_concurrency():
+    controller = AdmissionController(memory_budget_bytes=None, cpu_budget=4)
+    assert controller.submit("a", _cost(1, cores=3))["decision"] == "admitted"
+    assert controller.submit("b", _cost(1, cores=2))["decision"] == "queued"
+
+def test_rejects_jobs_that_can_never_fit_or_overflow_the_queue():
+    controller = AdmissionController(memory_budget_bytes=4 * GB, cpu_budget=2, max_queued=1)
+    rejected = controller.submit("huge", _cost(5))
+    assert rejected["decision"] == "rejected" and rejected["retry_after"] is None
+    controller.submit("a", _cost(1))
+    controller.submit("b", _cost(1))
+    full = controller.submit("c", _cost(1))
+    assert full["decision"] == "rejected" and full["retry_after"] >= 1
+
+def test_a_lone_job_within_budget_is_always_admitted():
+    controller = AdmissionController(memory_budget_bytes=4 * GB, cpu_budget=1)
+    assert controller.submit("a", _cost(3.5, cores=8))["decision"] == "admitted"
+
+def test_withdrawn_jobs_stop_waiting():
+    controller = AdmissionController(memory_budget_bytes=None, cpu_budget=2)
+    controller.submit("a", _cost(1))
+    controller.submit("b", _cost(1))
+    assert controller.withdraw("b")
+    assert controller.wait("b", timeout=0.1) is False
+    assert controller.status("b") is None
+
+def test_cost_grows_with_parallel_parts_and_framings():
+    profile = {"width": 720, "height": 1280}
+    single = estimate_job_cost(60, profile)
+    assert estimate_job_cost(60, profile, framings=3)["memory_bytes"] > single["memory_bytes"]
+    parallel = estimate_job_cost(60, profile, parts=4, parallel_parts=2)
+    assert parallel["memory_bytes"] > 2 * single["memory_bytes"] # Each part process also loads the models
+    assert parallel["seconds"] == pytest.approx(2 * single["seconds"])
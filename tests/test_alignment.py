@@ -0,0 +1,62 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import alignment
+
+class ThreadPool(ThreadPoolExecutor):
+    """Stands in for the process pool: same constructor arguments, no model loading."""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers)
+        self.size = (max_workers, initargs[1])
+
+@pytest.fixture
+def pools(monkeypatch):
+    monkeypatch.setattr(alignment, "_pools", {})
+    monkeypatch.setattr(alignment, "ProcessPoolExecutor", ThreadPool)
+    monkeypatch.setattr(alignment, "MAX_ALIGNMENT_WORKERS", 4)
+    monkeypatch.setattr(alignment.os, "cpu_count", lambda: 8)
+
+    def transcribe_chunk(task):
+        chunk, offset_seconds, model_name = task
+        time.sleep(0.05)
+        return [{'word': model_name, 'start': offset_seconds, 'end': offset_seconds + 0.1}]
+    monkeypatch.setattr(alignment, "_transcribe_chunk", transcribe_chunk)
+    yield alignment._pools
+    for pool, _, _ in alignment._pools.values():
+        pool.shutdown()
+
+@pytest.mark.parametrize("concurrency, size", [(1, (4, 2)), (2, (2, 2)), (4, (1, 2)), (8, (1, 1))])
+def test_pool_shares_the_cores_with_the_renders_beside_it(monkeypatch, concurrency, size):
+    monkeypatch.setattr(alignment, "MAX_ALIGNMENT_WORKERS", 4)
+    monkeypatch.setattr(alignment.os, "cpu_count", lambda: 8)
+    assert alignment._alignment_pool_size(concurrency) == size
+
+def test_concurrent_jobs_with_different_models_keep_their_own_pools(pools):
+    tasks = [(np.zeros(10, dtype=np.float32), float(i), None) for i in range(6)]
+    results, errors = {}, []
+
+    def align(model_name, concurrency):
+        try:
+            futures = alignment._submit_alignment_tasks(model_name, [t[:2] + (model_name,) for t in tasks],
+                                                        concurrency)
+            results[(model_name, concurrency)] = [future.result()[0]['word'] for future in futures]
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=align, args=args)
+               for args in [("tiny.en", 1), ("base.en", 1), ("tiny.en", 2), ("base.en", 1)]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(words == [model_name] * len(tasks) for (model_name, _), words in results.items())
+    assert set(pools) == {"tiny.en", "base.en"}
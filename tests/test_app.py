@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import app
+
+def test_import_builds_no_server_state():
+    # Spawned pool processes re-import the main module; importing must not build the server
+    assert app.ARTIFACT_STORE is None and app.JOB_QUEUE is None and app.ADMISSION is None
+    assert not isinstance(sys.stdout, app.JobLogRouter)
+
+def test_init_app_builds_server_state_once(monkeypatch, tmp_path):
+    for name in ("ARTIFACT_STORE", "JOB_QUEUE", "ADMISSION", "LOG_ROUTER"):
+        monkeypatch.setattr(app, name, None)
+    monkeypatch.setattr(app, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    assert app.init_app() is app.app
+    state = (app.ARTIFACT_STORE, app.JOB_QUEUE, app.ADMISSION, app.LOG_ROUTER)
+    assert all(state) and sys.stdout is app.LOG_ROUTER
+    app.init_app()
+    assert (app.ARTIFACT_STORE, app.JOB_QUEUE, app.ADMISSION, app.LOG_ROUTER) == state
+    assert not isinstance(app.LOG_ROUTER.stream, app.JobLogRouter) # stdout is wrapped once, not twice
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from artifact_store import ArtifactStore, INDEX_FILENAME
+
+DAY = 24 * 3600
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "output"), max_age_seconds=DAY, job_dir_root=str(tmp_path / "jobs"))
+
+def _job_dir(store, job_id, age_seconds, file_age_seconds=None):
+    """Creates a job directory holding one file, with the given ages."""
+    job_dir = os.path.join(store.job_dir_root, job_id)
+    os.makedirs(job_dir)
+    path = os.path.join(job_dir, "narration.mp3")
+    open(path, "wb").close()
+    now = time.time()
+    file_time = now - (age_seconds if file_age_seconds is None else file_age_seconds)
+    os.utime(path, (file_time, file_time))
+    os.utime(job_dir, (now - age_seconds, now - age_seconds))
+    return job_dir
+
+def test_expired_job_dirs_are_swept(store):
+    old = _job_dir(store, "old", 2 * DAY)
+    new = _job_dir(store, "new", 60)
+    store.sweep()
+    assert not os.path.exists(old) and os.path.exists(new)
+
+def test_parts_of_a_pinned_job_are_kept(store):
+    part_dirs = [_job_dir(store, f"story_part{n}", 2 * DAY) for n in (1, 2)]
+    other = _job_dir(store, "story2_part1", 2 * DAY)
+    store.pin("story")
+    store.sweep()
+    assert all(os.path.exists(path) for path in part_dirs)
+    assert not os.path.exists(other)
+    store.unpin("story")
+    store.sweep()
+    assert not any(os.path.exists(path) for path in part_dirs)
+
+def test_a_recently_rewritten_file_keeps_its_job_dir(store):
+    # Rewriting a file in place doesn't change the directory's own mtime
+    job_dir = _job_dir(store, "busy", 2 * DAY, file_age_seconds=60)
+    store.sweep()
+    assert os.path.exists(job_dir)
+
+def test_index_saves_leave_no_temp_files(store):
+    open(os.path.join(store.directory, "job_draft.mp4"), "wb").close()
+    store.register("job_draft.mp4", job_id="job")
+    store.touch("job_draft.mp4")
+    assert sorted(os.listdir(store.directory)) == [INDEX_FILENAME, "job_draft.mp4"]
+    assert "job_draft.mp4" in ArtifactStore(store.directory)._artifacts
@@ -0,0 +1,86 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from caption_planner import (plan_captions, plan_story_captions, caption_texts, timestamps_to_arrays,
+                             plan_to_dict, plan_from_dict, _plan_captions_reference,
+                             FALLBACK_CAPTION_DURATION)
+
+def _words(*timings):
+    """Builds word timestamps from (word, start, end) tuples."""
+    return [{'word': word, 'start': start, 'end': end} for word, start, end in timings]
+
+def _planned(word_timestamps, **kwargs):
+    """Runs the vectorized planner and returns (text, start, duration) per caption."""
+    starts, ends, indices = timestamps_to_arrays(word_timestamps)
+    plan = plan_captions(starts, ends, indices, **kwargs)
+    return list(zip(caption_texts(plan, [w['word'] for w in word_timestamps]),
+                    plan.start.tolist(), plan.duration.tolist()))
+
+def test_empty_words():
+    plan = plan_story_captions([])
+    assert all(len(field) == 0 for field in plan)
+    assert plan.word_begin.dtype == np.int32 and plan.start.dtype == np.float64
+    assert _planned([]) == _plan_captions_reference([]) == []
+
+def test_single_word():
+    words = _words(("Hello", 0.5, 0.9))
+    assert _planned(words) == [("Hello", 0.5, pytest.approx(0.4))]
+    assert _planned(words) == _plan_captions_reference(words)
+
+def test_zero_duration_word_gets_fallback_duration():
+    words = _words(("Hi", 1.0, 1.0), ("there", 2.0, 2.3))
+    assert _planned(words) == [("Hi", 1.0, FALLBACK_CAPTION_DURATION), ("there", 2.0, pytest.approx(0.3))]
+    assert _planned(words) == _plan_captions_reference(words)
+
+def test_count_and_gap_rules():
+    # Two words per caption; the 0.5s pause before "four" restarts the count
+    words = _words(("one", 0.0, 0.2), ("two", 0.2, 0.4), ("three", 0.4, 0.6),
+                   ("four", 1.1, 1.3), ("five", 1.3, 1.5))
+    assert _planned(words) == [("one two", 0.0, pytest.approx(0.4)), ("three", 0.4, pytest.approx(0.2)),
+                               ("four five", 1.1, pytest.approx(0.4))]
+    assert _planned(words) == _plan_captions_reference(words)
+
+def test_punctuation_does_not_break_captions():
+    # Only pauses and the word count break captions; punctuation stays attached to its word
+    words = _words(("Wait,", 0.0, 0.3), ("what?", 0.3, 0.6), ("No.", 0.6, 0.8), ("Really!", 0.8, 1.0))
+    assert _planned(words) == [("Wait, what?", 0.0, pytest.approx(0.6)), ("No. Really!", 0.6, pytest.approx(0.4))]
+    assert _planned(words) == _plan_captions_reference(words)
+
+def test_punctuation_followed_by_pause_breaks_captions():
+    words = _words(("Stop.", 0.0, 0.3), ("Then", 0.6, 0.8), ("go.", 0.8, 1.0))
+    assert _planned(words) == [("Stop.", 0.0, pytest.approx(0.3)), ("Then go.", 0.6, pytest.approx(0.4))]
+    assert _planned(words) == _plan_captions_reference(words)
+
+def test_skipped_title_words_keep_full_list_indices():
+    words = _words(("AITA", 0.0, 0.3), ("story", 1.0, 1.2), ("time", 1.2, 1.4))
+    plan = plan_story_captions(words, skip_words=1)
+    assert plan.word_begin.tolist() == [1]
+    assert plan.word_end.tolist() == [3]
+    assert caption_texts(plan, [w['word'] for w in words]) == ["story time"]
+
+def test_plan_round_trips_through_dict():
+    words = _words(("a", 0.0, 0.1), ("b", 0.3, 0.5), ("c", 0.5, 0.7))
+    plan = plan_story_captions(words)
+    restored = plan_from_dict(plan_to_dict(plan))
+    for field, value in zip(plan._fields, restored):
+        assert np.array_equal(getattr(plan, field), value)
+        assert getattr(plan, field).dtype == value.dtype
+
+@pytest.mark.parametrize("max_words", [1, 2, 3])
+@pytest.mark.parametrize("word_count", [7, 500, 5000])
+def test_matches_reference_on_random_timings(word_count, max_words):
+    rng = random.Random(1234 + word_count)
+    words = []
+    t = 0.0
+    for i in range(word_count):
+        t += rng.choice([0.0, 0.02, 0.1, 0.3])
+        length = rng.choice([0.0, rng.uniform(0.01, 0.4)])
+        words.append({'word': f"w{i}", 'start': t, 'end': t + length})
+        t += length
+    assert _planned(words, max_words=max_words) == _plan_captions_reference(words, max_words=max_words)
@@ -0,0 +1,29 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from font_registry import get_font, CAPTION_FONT_PATH, CAPTION_FONT_SIZE
+
+def test_fonts_are_cached_per_thread():
+    first = get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE)
+    assert get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE) is first
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other = executor.submit(get_font, CAPTION_FONT_PATH, CAPTION_FONT_SIZE).result()
+    assert other is not first
+
+def test_threads_draw_with_their_own_fonts():
+    def draw(text):
+        font = get_font(CAPTION_FONT_PATH, CAPTION_FONT_SIZE)
+        image = Image.new("L", (600, 120))
+        for _ in range(20):
+            ImageDraw.Draw(image).text((0, 0), text, font=font, fill=255)
+        return image.tobytes()
+    texts = ["HELLO", "WORLD", "HELLO", "WORLD"] * 4
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(draw, texts))
+    expected = {text: draw(text) for text in set(texts)}
+    assert all(pixels == expected[text] for text, pixels in zip(texts, results))
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from frame_sink import Overlay
+
+WIDTH, HEIGHT = 64, 48
+
+def _scratch():
+    return np.empty((HEIGHT, WIDTH, 3), np.uint16), np.empty((HEIGHT, WIDTH, 3), np.uint16)
+
+def _reference(frame, rgba, x, y):
+    """Float alpha blend of an RGBA raster placed at (x, y), clipped to the frame."""
+    out = frame.astype(np.float64)
+    for row in range(rgba.shape[0]):
+        for col in range(rgba.shape[1]):
+            fy, fx = y + row, x + col
+            if 0 <= fy < HEIGHT and 0 <= fx < WIDTH:
+                alpha = rgba[row, col, 3] / 255.0
+                out[fy, fx] = out[fy, fx] * (1 - alpha) + rgba[row, col, :3] * alpha
+    return np.floor(out + 0.5).astype(np.uint8)
+
+def test_blend_matches_the_rounded_float_blend():
+    rng = np.random.default_rng(7)
+    frame = rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    rgba = rng.integers(0, 256, (20, 30, 4), dtype=np.uint8)
+    rgba[0] = 0 # Transparent border rows/cols are cropped away
+    rgba[:, -1, 3] = 0
+    expected = _reference(frame, rgba, 10, 5)
+    blended = Overlay(rgba, 10, 5, 0.0, 1.0, WIDTH, HEIGHT).blend(frame, *_scratch())
+    assert np.array_equal(frame, expected)
+    assert blended == 19 * 29 * 3
+
+def test_blend_clips_to_the_frame():
+    rng = np.random.default_rng(8)
+    frame = rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    rgba = rng.integers(1, 256, (30, 40, 4), dtype=np.uint8)
+    expected = _reference(frame, rgba, -10, 30)
+    Overlay(rgba, -10, 30, 0.0, 1.0, WIDTH, HEIGHT).blend(frame, *_scratch())
+    assert np.array_equal(frame, expected)
+
+def test_opaque_and_transparent_pixels():
+    frame = np.full((HEIGHT, WIDTH, 3), 100, np.uint8)
+    rgba = np.zeros((4, 4, 4), np.uint8)
+    rgba[:2] = (200, 50, 0, 255)
+    Overlay(rgba, 0, 0, 0.0, 1.0, WIDTH, HEIGHT).blend(frame, *_scratch())
+    assert (frame[:2, :4] == (200, 50, 0)).all()
+    assert (frame[2:] == 100).all() and (frame[:, 4:] == 100).all()
+    assert Overlay(np.zeros((4, 4, 4), np.uint8), 0, 0, 0.0, 1.0, WIDTH, HEIGHT).blend(frame, *_scratch()) == 0
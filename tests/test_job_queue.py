@@ -0,0 +1,52 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import job_queue
+from job_queue import JobQueue
+
+def _finish(queue, worker_id, job_id, finished):
+    queue.enqueue(job_id, "generate", {})
+    assert queue.lease(worker_id)["job_id"] == job_id
+    assert queue.complete(worker_id, job_id, [f"{job_id}_draft.mp4"])
+    queue._jobs[job_id]["finished"] = finished
+
+def test_lease_complete_and_cancel():
+    queue = JobQueue()
+    worker_id = queue.register_worker("w1")
+    queue.enqueue("job1", "generate", {"render_profile": "draft"})
+    queue.enqueue("job2", "generate", {})
+    assert queue.get("job2")["queue_position"] == 2
+    assert queue.lease(worker_id) == {"job_id": "job1", "kind": "generate", "params": {"render_profile": "draft"}}
+    assert queue.heartbeat(worker_id, "job1", ["rendering"])
+    assert queue.cancel("job1")
+    # The worker's next heartbeat finds the lease gone, and its result is refused
+    assert not queue.heartbeat(worker_id, "job1")
+    assert queue.is_cancelled("job1")
+    assert not queue.complete(worker_id, "job1", ["job1_draft.mp4"])
+    assert queue.lease(worker_id)["job_id"] == "job2"
+    assert queue.complete(worker_id, "job2", ["job2_draft.mp4"])
+    assert queue.get("job2")["status"] == "done"
+
+def test_finished_jobs_are_pruned_after_the_ttl():
+    queue = JobQueue(finished_ttl_seconds=60)
+    worker_id = queue.register_worker("w1")
+    now = job_queue.time.time()
+    _finish(queue, worker_id, "old", now - 120)
+    _finish(queue, worker_id, "recent", now - 10)
+    queue.enqueue("waiting", "generate", {})
+    queue.reap()
+    assert queue.get("old") is None
+    assert queue.get("recent")["status"] == "done"
+    assert queue.get("waiting")["status"] == "queued"
+
+def test_finished_jobs_beyond_the_cap_are_pruned_oldest_first():
+    queue = JobQueue(max_finished=2)
+    worker_id = queue.register_worker("w1")
+    now = job_queue.time.time()
+    for age, job_id in enumerate(["c", "b", "a"]):
+        _finish(queue, worker_id, job_id, now - age)
+    queue.enqueue("next", "generate", {})
+    assert queue.get("a") is None
+    assert queue.get("b") and queue.get("c") and queue.get("next")
@@ -0,0 +1,105 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import render_cache
+from render_cache import RenderCache
+from cancellation import cancel_scope, cancel_job, JobCancelled
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(str(tmp_path / "render_cache.json"))
+
+@pytest.fixture
+def output(tmp_path):
+    """Returns a render function that writes (and returns) an output file."""
+    def make(name):
+        def render():
+            path = str(tmp_path / name)
+            open(path, "wb").close()
+            return path
+        return render
+    return make
+
+def _start_owner(cache, key, job_id, render):
+    """Starts a render on another thread and waits until it owns the key."""
+    thread = threading.Thread(target=lambda: _swallow(cache.get_or_render, key, job_id, render), daemon=True)
+    thread.start()
+    while key not in cache._in_flight:
+        time.sleep(0.01)
+    return thread
+
+def _swallow(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        pass
+
+def test_hit_reuses_the_first_render(cache, output):
+    assert cache.get_or_render("k", "job1", output("job1.mp4")) == (output("job1.mp4")(), "job1")
+    assert cache.get_or_render("k", "job2", lambda: pytest.fail("rendered again")) == (output("job1.mp4")(), "job1")
+
+def test_entry_is_dropped_once_an_output_is_gone(cache, output):
+    path, _ = cache.get_or_render("k", "job1", output("job1.mp4"))
+    os.remove(path)
+    assert cache.lookup("k") is None
+    assert cache.get_or_render("k", "job2", output("job2.mp4")) == (output("job2.mp4")(), "job2")
+
+def test_failed_render_is_not_cached(cache, output):
+    assert cache.get_or_render("k", "job1", lambda: None) == (None, "job1")
+    assert cache.lookup("k") is None
+
+def test_caches_sharing_an_index_see_and_keep_each_others_entries(tmp_path, output):
+    # Like the app and a part process: each has its own RenderCache over the same index file
+    first = RenderCache(str(tmp_path / "render_cache.json"))
+    second = RenderCache(str(tmp_path / "render_cache.json"))
+    first.get_or_render("a", "job1", output("job1.mp4"))
+    second.get_or_render("b", "job2", output("job2.mp4"))
+    assert second.lookup("a")["job_id"] == "job1"
+    assert first.lookup("b")["job_id"] == "job2"
+    assert set(RenderCache(str(tmp_path / "render_cache.json"))._entries) == {"a", "b"}
+
+def test_waiter_shares_the_owners_render(cache, output):
+    release = threading.Event()
+    render = output("job1.mp4")
+    owner = _start_owner(cache, "k", "job1", lambda: release.wait() and render())
+    threading.Timer(0.2, release.set).start()
+    assert cache.get_or_render("k", "job2", lambda: pytest.fail("rendered twice")) == (render(), "job1")
+    owner.join()
+
+@pytest.mark.parametrize("outcome", ["fails", "raises"])
+def test_waiter_renders_itself_when_the_owner_does_not_finish(cache, output, outcome):
+    release = threading.Event()
+    def owner_render():
+        release.wait()
+        if outcome == "raises":
+            raise JobCancelled("Job job1 was cancelled.")
+        return None
+    owner = _start_owner(cache, "k", "job1", owner_render)
+    threading.Timer(0.2, release.set).start()
+    assert cache.get_or_render("k", "job2", output("job2.mp4")) == (output("job2.mp4")(), "job2")
+    owner.join()
+    assert cache.lookup("k")["job_id"] == "job2"
+
+def test_cancelling_a_waiter_stops_its_wait(cache):
+    release = threading.Event()
+    owner = _start_owner(cache, "k", "job1", lambda: release.wait(5) and None)
+    threading.Timer(0.2, cancel_job, args=("job2",)).start()
+    began = time.monotonic()
+    with pytest.raises(JobCancelled):
+        with cancel_scope("job2"):
+            cache.get_or_render("k", "job2", lambda: pytest.fail("the waiter rendered"))
+    assert time.monotonic() - began < 2
+    release.set()
+    owner.join()
+
+def test_code_version_covers_planning_and_encoder_choice():
+    src_dir = os.path.dirname(os.path.abspath(render_cache.__file__))
+    for name in ("render_plan.py", "encoder_tuning.py"):
+        assert name in render_cache.CODE_VERSION_FILES
+    assert all(os.path.exists(os.path.join(src_dir, name)) for name in render_cache.CODE_VERSION_FILES)
@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+import wave
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from moviepy.config import get_setting
+
+import job_store
+import main
+from render_cache import RenderCache
+from render_plan import (plan_render, save_render_plan, load_render_plan, resolve_plan_path,
+                         RENDER_PLAN_VERSION)
+
+WORDS = [{'word': f"w{i}", 'start': i * 0.1, 'end': i * 0.1 + 0.08} for i in range(14)]
+
+def _write_narration(path, seconds=1.5, sample_rate=16000):
+    """Writes a quiet tone as WAV data (ffmpeg reads it whatever the extension)."""
+    samples = (np.sin(np.arange(int(seconds * sample_rate)) * 0.05) * 3000).astype(np.int16)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return True
+
+@pytest.fixture(scope="module")
+def background_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("assets") / "background.mp4")
+    subprocess.run([get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", "color=c=black:s=64x64:d=4:r=10", "-c:v", "mpeg4", path], check=True)
+    return path
+
+def test_plan_stores_job_files_relative_to_root_and_round_trips(tmp_path, background_path):
+    job_dir = tmp_path / "jobs" / "job1"
+    job_dir.mkdir(parents=True)
+    narration_path = str(job_dir / "narration.mp3")
+    title_card_path = str(job_dir / "titled_card.png")
+    plan = plan_render("AITA for testing?", WORDS, narration_path, background_path,
+                       narration_duration=1.5, title_card_path=title_card_path, plan_root=str(job_dir))
+    assert plan["version"] == RENDER_PLAN_VERSION
+    assert plan["audio"]["narration_path"] == "narration.mp3"
+    assert plan["title"]["card_path"] == "titled_card.png"
+    assert plan["background"]["path"] == background_path
+
+    save_render_plan(plan, str(tmp_path / "plan.json"))
+    loaded = load_render_plan(str(tmp_path / "plan.json"))
+    assert loaded == plan
+    assert resolve_plan_path(loaded["audio"]["narration_path"], str(job_dir)) == narration_path
+    assert resolve_plan_path(loaded["title"]["card_path"], str(job_dir)) == title_card_path
+    assert resolve_plan_path(None, str(job_dir)) is None
+
+def test_load_rejects_other_versions(tmp_path):
+    save_render_plan({"version": RENDER_PLAN_VERSION - 1}, str(tmp_path / "old.json"))
+    with pytest.raises(ValueError):
+        load_render_plan(str(tmp_path / "old.json"))
+
+def test_background_offset_leaves_room_for_the_narration(background_path):
+    for _ in range(20):
+        plan = plan_render("AITA?", WORDS, "narration.mp3", background_path, narration_duration=1.5)
+        assert 0.0 <= plan["background"]["offset"] <= 4.0 - 1.5
+    # A background no longer than the narration starts at its beginning and loops
+    plan = plan_render("AITA?", WORDS, "narration.mp3", background_path, narration_duration=10.0)
+    assert plan["background"]["offset"] == 0.0
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Runs main's pipeline against a temporary job store, with fetching, TTS, alignment and
+    the renderer replaced. Returns the list of (plan, output_path, plan_root) renders."""
+    monkeypatch.setattr(job_store, "JOB_DB_PATH", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(job_store, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(main, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "RENDER_CACHE", RenderCache(str(tmp_path / "render_cache.json")))
+    monkeypatch.setattr(main, "_fetch_story", lambda subreddit, post_url=None: (
+        "AITA for testing?", "A short story.", "https://www.reddit.com/r/AmItheAsshole/comments/abc123/x/"))
+    monkeypatch.setattr(main, "create_narration", lambda text, path: _write_narration(path))
+    monkeypatch.setattr(main, "get_word_timestamps", lambda audio, **kwargs: WORDS)
+    renders = []
+
+    def render_video(plan, output_path, plan_root=None, **kwargs):
+        narration_path = resolve_plan_path(plan["audio"]["narration_path"], plan_root)
+        title_card_path = resolve_plan_path(plan["title"]["card_path"], plan_root)
+        renders.append((plan, output_path, plan_root))
+        if not os.path.exists(narration_path):
+            return False
+        if not os.path.exists(title_card_path):
+            open(title_card_path, "wb").close() # Drawn by the first render, reused by promotions
+        open(output_path, "wb").close()
+        return True
+    monkeypatch.setattr(main, "render_video", render_video)
+    return renders
+
+def test_promoting_a_render_cache_hit_draft_uses_the_source_jobs_files(pipeline, background_path, tmp_path):
+    params = dict(background_video_path=background_path, background_music_path=str(tmp_path / "no_music.mp3"),
+                  render_profile="draft")
+    assert main.run_pipeline(job_id="source", **params)
+    assert main.run_pipeline(job_id="copy", **params) # Cache hit: nothing is rendered
+    assert len(pipeline) == 1
+    assert job_store.load_job("copy")["plan_job_id"] == "source"
+
+    promoted = main.render_job("copy", render_profile="final", background_video_path=background_path)
+    assert promoted == os.path.join(str(tmp_path), "copy_final.mp4")
+    plan, output_path, plan_root = pipeline[-1]
+    assert plan_root == job_store.get_job_dir("source")
+    assert os.path.exists(output_path)
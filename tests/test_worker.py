@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import worker
+
+class FakeClient:
+    """Records what run_leased_job sends to the web tier."""
+
+    def __init__(self):
+        self.uploads = []
+        self.completed = None
+        self.failed = None
+
+    def heartbeat(self, job_id=None, logs=()):
+        return {"lease_held": True, "cancelled": False}
+
+    def upload(self, job_id, path, filename=None):
+        assert os.path.exists(path)
+        self.uploads.append((job_id, filename or os.path.basename(path)))
+
+    def complete(self, job_id, result_files):
+        self.completed = (job_id, result_files)
+
+    def fail(self, job_id, error):
+        self.failed = (job_id, error)
+
+@pytest.fixture
+def outputs(tmp_path):
+    """Creates output files named after `owner_id` and returns their paths."""
+    def create(owner_id, framings=False):
+        video = str(tmp_path / f"{owner_id}_draft.mp4")
+        paths = [video] + ([str(tmp_path / f"{owner_id}_draft_1x1.mp4")] if framings else [])
+        for path in paths:
+            open(path, "wb").close()
+        return video
+    return create
+
+def _run(monkeypatch, result, shared_output=False):
+    monkeypatch.setattr(worker, "run_pipeline", lambda job_id, **params: result)
+    client = FakeClient()
+    worker.run_leased_job(client, {"job_id": "job2", "kind": "generate", "params": {}}, shared_output, 60)
+    return client
+
+def test_uploads_own_outputs_under_their_names(monkeypatch, outputs):
+    client = _run(monkeypatch, outputs("job2", framings=True))
+    assert client.uploads == [("job2", "job2_draft.mp4"), ("job2", "job2_draft_1x1.mp4")]
+    assert client.completed == ("job2", ["job2_draft.mp4"])
+    assert client.failed is None
+
+def test_render_cache_hit_outputs_are_uploaded_under_this_jobs_id(monkeypatch, outputs):
+    # A cache hit returns the files another job rendered; the web tier only accepts names
+    # starting with the uploading job's id
+    client = _run(monkeypatch, [outputs("job1_part1"), outputs("job1_part2")])
+    assert client.uploads == [("job2", "job2_job1_part1_draft.mp4"), ("job2", "job2_job1_part2_draft.mp4")]
+    assert all(filename.startswith("job2") for _, filename in client.uploads)
+    assert client.completed == ("job2", ["job2_job1_part1_draft.mp4", "job2_job1_part2_draft.mp4"])
+
+def test_shared_output_reports_files_without_uploading(monkeypatch, outputs):
+    client = _run(monkeypatch, outputs("job1"), shared_output=True)
+    assert client.uploads == []
+    assert client.completed == ("job2", ["job1_draft.mp4"])
+
+def test_no_result_fails_the_job(monkeypatch):
+    client = _run(monkeypatch, None)
+    assert client.completed is None
+    assert client.failed == ("job2", "Generation completed but no result file was produced.")